@@ -2,40 +2,77 @@ import os
 import sys
 import json
 import traceback
-from groq import Groq
 from dotenv import load_dotenv
+from clients import get_groq_client
+from tracing import start_trace, span, capture
+from metrics import instrumented_completion
+from prompts import compile_prompt
+from session_store import (HASH_REUSE, STORE_ERRORS, open_session_store, open_optional_store, is_patch_request,
+                           resolve_patch_request, changed_entries, patch_response, entry_hash)
 
 # Load environment variables
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, "web", ".env")
 load_dotenv(dotenv_path=env_path)
 
+SEVERITIES = ("critical", "warning", "niceToHave")
+
+
+def _intro_inputs(resume):
+    return resume.get('profile', {}), [e.get('role') for e in resume.get('experience', [])]
+
+
+def _findings_by_hash(result, analyzed):
+    """Split a section result into per-entry findings (ids stripped), keyed by entry hash."""
+    hash_of = {item.get("id"): h for item, h in analyzed if item.get("id")}
+    out = {h: {severity: [] for severity in SEVERITIES} for h in hash_of.values()}
+    for severity in SEVERITIES:
+        for finding in result.get(severity) or []:
+            if isinstance(finding, dict) and finding.get("id") in hash_of:
+                out[hash_of[finding["id"]]][severity].append({k: v for k, v in finding.items() if k != "id"})
+    return out
+
+
 def analyze_resume(resume_json_str):
+    trace = start_trace("analyze")
+    store = None
     try:
         # Validate inputs
         if not resume_json_str:
-             print(json.dumps({"error": "No resume data provided"}))
-             return
-
-        # DEBUG: Print incoming resume structure to server logs
-        try:
-             debug_json = json.loads(resume_json_str)
-             print(f"DEBUG_ANALYZER_INPUT: Experience Count: {len(debug_json.get('experience', []))}", file=sys.stderr)
-             print(f"DEBUG_ANALYZER_INPUT: Projects Count: {len(debug_json.get('projects', []))}", file=sys.stderr)
-             print(f"DEBUG_ANALYZER_INPUT: Responsibilities Count: {len(debug_json.get('responsibilities', []))}", file=sys.stderr)
-             print(f"DEBUG_ANALYZER_INPUT: Full JSON Keys: {list(debug_json.keys())}", file=sys.stderr)
-        except:
-             print("DEBUG_ANALYZER_INPUT: Could not parse input JSON for debug", file=sys.stderr)
+             return {"error": "No resume data provided"}
+
+        # 1. Decode input
+        with span("decode_input", input_chars=len(resume_json_str)) as s:
+            parsed_data = json.loads(resume_json_str)
+            s.set(
+                keys=sorted(parsed_data.keys()),
+                experience=len(parsed_data.get('experience', [])),
+                projects=len(parsed_data.get('projects', [])),
+                responsibilities=len(parsed_data.get('responsibilities', [])),
+            )
+        capture("input", resume_json_str)
+
+        # Patch request: only entries changed since the last stored analysis are re-analyzed
+        session_id, only, prior_version, prior_result, prior_doc = None, None, None, None, None
+        if is_patch_request(parsed_data):
+            with span("session_resolve") as s:
+                store = open_session_store()
+                session_id, version, parsed_data, _ = resolve_patch_request(store, parsed_data)
+                prior = store.get_result(session_id, "analysis")
+                if prior:
+                    prior_version, prior_result = prior
+                    prior_doc = store.get(session_id, prior_version)[1]
+                    only = changed_entries(prior_doc, parsed_data)
+                s.set(version=version, prior_version=prior_version, changed=None if only is None else sorted(only))
+        if store is None and HASH_REUSE:
+            store = open_optional_store()
 
         # 2. Call Groq
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
-             print(json.dumps({"error": "GROQ_API_KEY missing"}))
-             return
+             return {"error": "GROQ_API_KEY missing"}
 
-        client = Groq(api_key=api_key)
-        
-        parsed_data = debug_json
+        client = get_groq_client(api_key)
 
         # 3. Analyze Sections Individually (Divide & Conquer)
         final_output = {
@@ -46,102 +83,127 @@ def analyze_resume(resume_json_str):
         }
 
         sections_to_analyze = [
-            ("experience", parsed_data.get("experience", [])),
-            ("project", parsed_data.get("projects", [])),
-            ("responsibility", parsed_data.get("responsibilities", [])) # Note: parser uses 'responsibilities', output uses 'responsibility' singular usuallly but strict json says 'responsibility'
+            ("experience", "e", parsed_data.get("experience", [])),
+            ("project", "p", parsed_data.get("projects", [])),
+            ("responsibility", "r", parsed_data.get("responsibilities", [])) # Note: parser uses 'responsibilities', output uses 'responsibility' singular usuallly but strict json says 'responsibility'
         ]
 
+        # Keep prior findings for entries that did not change (prefixes are the compact entry ids, see compact_rewrite.py)
+        if only is not None:
+            unchanged = {(name, item.get("id")) for name, prefix, items in sections_to_analyze
+                         for i, item in enumerate(items) if f"{prefix}{i}" not in only}
+            for severity in SEVERITIES:
+                final_output[severity] = [f for f in prior_result.get(severity, [])
+                                          if (f.get("section"), f.get("id")) in unchanged]
+
         # Shared client
-        client = Groq(api_key=api_key)
+        client = get_groq_client(api_key)
         
         # Function to analyze a specific list of items
         def analyze_section_items(section_name, items):
             if not items: return None
             
-            # Detailed prompt for focused analysis with all categories
-            prompt = f"""
-            You are an expert Resume Critic.
-            Analyze ONLY the following `{section_name}` items from a resume.
-            
-            ITEMS TO ANALYZE:
-            {json.dumps(items, indent=2)}
-
-            OUTPUT FORMAT (Strict JSON):
-            {{
-                "critical": [ {{"section": "{section_name}", "id": "uuid", "quote": "text", "bulletIndex": 0, "question": "...", "issue": "..."}} ],
-                "warning": [ {{"section": "{section_name}", "id": "uuid", "quote": "text", "bulletIndex": 0, "question": "...", "issue": "..."}} ],
-                "niceToHave": [ {{"section": "{section_name}", "id": "uuid", "quote": "text", "bulletIndex": 0, "question": "...", "issue": "..."}} ]
-            }}
-
-            CATEGORIES:
-            - **Critical**: Missing metrics, vague claims, grammar errors, weak impact.
-            - **Warning**: Passive voice, generic phrases ("Responsible for"), lack of context.
-            - **NiceToHave**: Suggestions to make it perfect (stronger verbs, better formatting).
-
-            RULES:
-            1. Analyze EVERY item in the list.
-            2. Return "id", "quote", "bulletIndex" exactly as in input.
-            3. "section" must be "{section_name}".
-            4. Provide a mix of Critical, Warning, and NiceToHave. Do not mark everything as Critical.
-            """
+            # Focused analysis with all categories (prompts/analyze_section.txt)
+            prompt = compile_prompt("analyze_section", site="analyze", section_name=section_name, items=items).text
 
+            capture(f"prompt_{section_name}", prompt)
             try:
-                msg = client.chat.completions.create(
-                    messages=[
-                        { "role": "system", "content": prompt },
-                        { "role": "user", "content": "Analyze these items." }
-                    ],
-                    model="llama-3.3-70b-versatile",
-                    temperature=0.1,
-                    stream=False,
-                )
-                txt = msg.choices[0].message.content.replace("```json", "").replace("```", "").strip()
-                # find brace
-                s = txt.find('{')
-                e = txt.rfind('}') + 1
-                return json.loads(txt[s:e])
+                with span("llm_call", section=section_name, items=len(items), prompt_chars=len(prompt)) as sp:
+                    msg = instrumented_completion(
+                        client, "analyze",
+                        messages=[
+                            { "role": "system", "content": prompt },
+                            { "role": "user", "content": "Analyze these items." }
+                        ],
+                        model="llama-3.3-70b-versatile",
+                        temperature=0.1,
+                        stream=False,
+                    )
+                    raw = msg.choices[0].message.content
+                    sp.set(response_chars=len(raw))
+                capture(f"response_{section_name}", raw)
+                with span("decode", section=section_name):
+                    txt = raw.replace("```json", "").replace("```", "").strip()
+                    # find brace
+                    s = txt.find('{')
+                    e = txt.rfind('}') + 1
+                    return json.loads(txt[s:e])
             except Exception as e:
-                print(f"DEBUG: Failed to analyze {section_name}: {e}", file=sys.stderr)
+                print(f"Failed to analyze {section_name}: {e}", file=sys.stderr)
                 return None
 
         # Execute analysis
-        for name, items in sections_to_analyze:
-            print(f"DEBUG: Analyzing section: {name} ({len(items)} items)", file=sys.stderr)
+        for name, prefix, items in sections_to_analyze:
+            if only is not None:
+                items = [item for i, item in enumerate(items) if f"{prefix}{i}" in only]
+            # Entries analysed before (this or any session) reuse their findings by content hash
+            analyzed = []
+            if store is not None and HASH_REUSE and items:
+                with span("hash_reuse", section=name) as sp:
+                    hashes = [entry_hash(item) for item in items]
+                    try:
+                        known = store.get_findings(hashes, name)
+                    except STORE_ERRORS as e:
+                        print(f"Findings lookup failed ({e}) - analyzing {name} in full", file=sys.stderr)
+                        known = {}
+                    for item, h in zip(items, hashes):
+                        for severity in SEVERITIES:
+                            final_output[severity].extend(dict(f, id=item.get("id")) for f in (known.get(h) or {}).get(severity, []))
+                    analyzed = [(item, h) for item, h in zip(items, hashes) if h not in known]
+                    items = [item for item, _ in analyzed]
+                    sp.set(reused=len(hashes) - len(items))
             res = analyze_section_items(name, items)
             if res:
                 final_output["critical"].extend(res.get("critical", []))
                 final_output["warning"].extend(res.get("warning", []))
                 final_output["niceToHave"].extend(res.get("niceToHave", []))
+                if analyzed:
+                    try:
+                        store.save_findings(name, _findings_by_hash(res, analyzed))
+                    except STORE_ERRORS as e:
+                        print(f"Findings not saved: {e}", file=sys.stderr)
 
         # Generate Intro (Separate quick call or just generic)
-        try:
-            intro_prompt = f"""
-            Based on this resume profile, write a 1-sentence summary of its strength.
-            Profile: {json.dumps(parsed_data.get('profile', {}))}
-            Experience Titles: {[e.get('role') for e in parsed_data.get('experience', [])]}
-            """
-            intro_msg = client.chat.completions.create(
-                messages=[{"role": "user", "content": intro_prompt}],
-                model="llama-3.3-70b-versatile",
-                temperature=0.3
-            )
-            final_output["intro"] = intro_msg.choices[0].message.content.strip()
-        except:
-            final_output["intro"] = "Here is the analysis of your resume."
-
-        # Output to stdout
-        print(json.dumps(final_output))
+        if prior_result and _intro_inputs(prior_doc) == _intro_inputs(parsed_data):
+            final_output["intro"] = prior_result.get("intro", "")
+        else:
+            try:
+                profile, titles = _intro_inputs(parsed_data)
+                intro_prompt = compile_prompt("analyze_intro", site="intro", profile=profile, titles=titles).text
+                with span("llm_call", section="intro", prompt_chars=len(intro_prompt)):
+                    intro_msg = instrumented_completion(
+                        client, "intro",
+                        messages=[{"role": "user", "content": intro_prompt}],
+                        model="llama-3.3-70b-versatile",
+                        temperature=0.3
+                    )
+                final_output["intro"] = intro_msg.choices[0].message.content.strip()
+            except:
+                final_output["intro"] = "Here is the analysis of your resume."
+
+        if session_id:
+            # Answer with a patch against the previous analysis the client holds
+            store.save_result(session_id, "analysis", version, final_output)
+            return patch_response(session_id, prior_version, version, prior_result or {}, final_output)
+
+        return final_output
 
     except Exception as e:
+        trace.fail(e)
         error_info = {
             "error": str(e),
             "trace": traceback.format_exc()
         }
-        print(json.dumps(error_info))
+        return error_info
+    finally:
+        if store:
+            store.close()
+        trace.finish()
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    # Read JSON from argument (passed as string), or from stdin with "-" / no argument
+    json_input = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] != "-" else sys.stdin.read()
+    if not json_input.strip():
         print(json.dumps({"error": "No resume JSON provided"}))
     else:
-        # Read JSON from argument (passed as string)
-        analyze_resume(sys.argv[1])
+        print(json.dumps(analyze_resume(json_input)))
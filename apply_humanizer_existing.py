@@ -1,38 +1,27 @@
-import json
-import os
 from humanizer import humanize_bullet
+from corpus_store import open_corpus
 
 def main():
-    file_path = 'augmented_resumes.json'
-    if not os.path.exists(file_path):
-        print(f"Error: {file_path} not found.")
-        return
+    store = open_corpus()
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    updated_count = 0
+    updated = []
     
-    for domain, content in data.items():
-        if 'synthetic' in content:
-            print(f"Processing {domain} - {len(content['synthetic'])} points...")
-            original_points = content['synthetic']
-            
-            # Apply humanizer
-            humanized_points = [humanize_bullet(p) for p in original_points]
-            
-            # Check how many actually changed (optional, but good for logs)
-            for o, h in zip(original_points, humanized_points):
-                if o != h:
-                    updated_count += 1
+    for domain in store.domains():
+        rows = list(store.iter_bullets(domain, 'synthetic'))
+        if rows:
+            print(f"Processing {domain} - {len(rows)} points...")
             
-            content['synthetic'] = humanized_points
+            # Apply humanizer, keeping only the rows that actually changed
+            for row in rows:
+                new_text = humanize_bullet(row['text'])
+                if new_text != row['text']:
+                    updated.append((row['id'], new_text))
 
-    # Save details
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Save details (changed rows only, single transaction)
+    store.update_texts(updated)
+    store.close()
         
-    print(f"\nSuccess! Updated {updated_count} synthetic bullet points with the latest humanizer logic.")
+    print(f"\nSuccess! Updated {len(updated)} synthetic bullet points with the latest humanizer logic.")
 
 if __name__ == "__main__":
     main()
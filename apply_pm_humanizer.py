@@ -1,41 +1,30 @@
-import json
-import os
 from humanizerPM import humanize_and_indianize
+from corpus_store import open_corpus
 
 def main():
-    file_path = 'augmented_resumes.json'
-    if not os.path.exists(file_path):
-        print(f"Error: {file_path} not found.")
-        return
+    store = open_corpus()
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    updated_count = 0
+    updated = []
     
     # Target ONLY Product -> Synthetic
-    if 'Product' in data and 'synthetic' in data['Product']:
-        print(f"Processing Product Domain - {len(data['Product']['synthetic'])} points...")
-        original_points = data['Product']['synthetic']
+    rows = list(store.iter_bullets('Product', 'synthetic'))
+    if rows:
+        print(f"Processing Product Domain - {len(rows)} points...")
         
-        new_points = []
-        for p in original_points:
+        for row in rows:
             # Check if likely already latex-escaped or processed?
             # humanize_and_indianize adds \% and \$ so we should be careful avoiding double escaping if run multiple times
             # But simpler is just to run it.
-            new_p = humanize_and_indianize(p)
-            new_points.append(new_p)
+            new_p = humanize_and_indianize(row['text'])
             
-            if new_p != p:
-                updated_count += 1
-                
-        data['Product']['synthetic'] = new_points
+            if new_p != row['text']:
+                updated.append((row['id'], new_p))
 
-    # Save details
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Save details (changed rows only, single transaction)
+    store.update_texts(updated)
+    store.close()
         
-    print(f"\nSuccess! Updated {updated_count} Product bullet points with the Indian Humanizer.")
+    print(f"\nSuccess! Updated {len(updated)} Product bullet points with the Indian Humanizer.")
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,6 @@
-import json
-import os
 import re
 import random
+from corpus_store import open_corpus
 
 # Logic adapted from USER's removeBIGnumbers.py
 def process_bullet(text):
@@ -55,50 +54,35 @@ def process_bullet(text):
 
     return text
 
-def main():
-    file_path = 'augmented_resumes.json'
-    if not os.path.exists(file_path):
-        print("Error: augmented_resumes.json not found.")
-        return
+def optimize_domain(store, domain):
+    """Run process_bullet over a domain's synthetic rows; returns [(id, new_text)] for changed rows."""
+    rows = list(store.iter_bullets(domain, 'synthetic'))
+    if not rows:
+        return []
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    print(f"Optimizing {domain} Domain - {len(rows)} points...")
+    updated = []
+    for row in rows:
+        new_p = process_bullet(row['text'])
+        if new_p != row['text']:
+            updated.append((row['id'], new_p))
+    return updated
+
+def main():
+    store = open_corpus()
 
-    updated_count = 0
-    
     # Apply to Product Synthetic Data
-    if 'Product' in data and 'synthetic' in data['Product']:
-        print(f"Optimizing Product Domain - {len(data['Product']['synthetic'])} points...")
-        original_points = data['Product']['synthetic']
-        
-        new_points = []
-        for p in original_points:
-            new_p = process_bullet(p)
-            new_points.append(new_p)
-            if new_p != p:
-                updated_count += 1
-                
-        data['Product']['synthetic'] = new_points
+    updated = optimize_domain(store, 'Product')
         
     # Apply REVENUE/VARIETY logic to IT Synthetic too (skipping Product-specific tech replacement if not found)
     # The function is safe to run on IT as replacements won't match
-    if 'IT' in data and 'synthetic' in data['IT']:
-        print(f"Optimizing IT Domain - {len(data['IT']['synthetic'])} points...")
-        original_points = data['IT']['synthetic']
-        new_points = []
-        for p in original_points:
-            # We use the same function, tech terms won't match so it's fine
-            new_p = process_bullet(p)
-            new_points.append(new_p)
-            if new_p != p:
-                updated_count += 1
-        data['IT']['synthetic'] = new_points
+    updated += optimize_domain(store, 'IT')
 
-    # Save
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Save (changed rows only, single transaction)
+    store.update_texts(updated)
+    store.close()
         
-    print(f"\nSuccess! Optimized {updated_count} bullet points (Revenue Balancing + Variety).")
+    print(f"\nSuccess! Optimized {len(updated)} bullet points (Revenue Balancing + Variety).")
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,9 @@ import time
 from groq import Groq
 from dotenv import load_dotenv
 from humanizer import humanize_bullet
+from dedup import MinHashLSH, dedupe_bullets
+from corpus_store import open_corpus
+from metrics import instrumented_completion, dump_at_exit
 
 # Load Environment Variables
 load_dotenv()
@@ -39,7 +42,8 @@ def generate_bullets(domain, seeds, count=20):
     """
     
     try:
-        completion = client.chat.completions.create(
+        completion = instrumented_completion(
+            client, "augment",
             model=MODEL_NAME,
             messages=[
                 {"role": "system", "content": "You are a helpful AI assistant that writes perfect resume bullet points."},
@@ -73,36 +77,40 @@ def generate_bullets(domain, seeds, count=20):
         return []
 
 def main():
+    # Token/latency totals for the run -> .cache/metrics.jsonl (python metrics.py)
+    dump_at_exit()
+
     # 1. Load Data
-    data_structure = {}
+    store = open_corpus()
     
-    if os.path.exists('augmented_resumes.json'):
-         with open('augmented_resumes.json', 'r', encoding='utf-8') as f:
-            data_structure = json.load(f)
-    else:
+    if not store.count():
          with open('cleaned_resumes.json', 'r', encoding='utf-8') as f:
             raw = json.load(f)
             for d, pts in raw.items():
-                data_structure[d] = {"real": pts, "synthetic": []}
+                store.insert_many(d, 'real', pts)
 
     # 2. Iterate Domains
     for domain in TARGET_DOMAINS:
-        if domain not in data_structure:
+        if domain not in store.domains():
             continue
 
-        real_count = len(data_structure[domain]['real'])
-        
         # Check if already augmented (threshold check)
-        existing_synthetic = data_structure[domain].get('synthetic', [])
+        existing_synthetic = store.texts(domain, 'synthetic')
         if len(existing_synthetic) > 50: 
              print(f"\nSkipping {domain} (Enough synthetic data: {len(existing_synthetic)})")
              continue
              
         print(f"\nProcessing Domain: {domain}")
         
-        seeds = data_structure[domain].get('real', [])
+        seeds = store.texts(domain, 'real')
         context_seeds = seeds if seeds else []
         
+        # Near-duplicate index over everything already in this domain
+        lsh = MinHashLSH()
+        dedupe_bullets(seeds, lsh, key_prefix="real_")
+        dedupe_bullets(existing_synthetic, lsh, key_prefix="synthetic_")
+        duplicates = 0
+
         domain_new_points = []
         # Groq is fast, let's do bigger batches
         for i in range(2): 
@@ -111,27 +119,28 @@ def main():
             
             # HUMANIZE SYNTHETIC POINTS
             humanized_points = [humanize_bullet(p) for p in new_points]
-            domain_new_points.extend(humanized_points)
+
+            # Drop near-duplicates of existing or earlier generated points
+            kept_points, removed = dedupe_bullets(humanized_points, lsh, key_prefix=f"batch{i}_")
+            duplicates += len(removed)
+            domain_new_points.extend(kept_points)
             
             # Groq rate limits are generous but let's be safe
             time.sleep(2) 
             
-        print(f"  > Generated {len(domain_new_points)} new points.")
-        
-        # Append to SYNTHETIC list
-        data_structure[domain]['synthetic'].extend(domain_new_points)
+        print(f"  > Generated {len(domain_new_points)} new points ({duplicates} near-duplicates removed).")
         
-        # SAVE INCREMENTALLY
-        with open('augmented_resumes.json', 'w', encoding='utf-8') as f:
-            json.dump(data_structure, f, indent=2, ensure_ascii=False)
+        # Append to SYNTHETIC rows (SAVE INCREMENTALLY, one transaction per domain)
+        store.insert_many(domain, 'synthetic', domain_new_points)
         print(f"  [Saved progress for {domain}]")
 
-    print("\nSUCCESS: Saved all to augmented_resumes.json")
+    print("\nSUCCESS: Saved all to the corpus store")
     
     # Stats
-    total_real = sum(len(v['real']) for v in data_structure.values())
-    total_synth = sum(len(v['synthetic']) for v in data_structure.values())
+    total_real = store.count(bullet_type='real')
+    total_synth = store.count(bullet_type='synthetic')
     print(f"Total Database: {total_real} Real, {total_synth} Synthetic")
+    store.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import time
+import random
+import numpy as np
+from vector_index import VectorIndex, load_embeddings
+from embeddings import get_provider
+
+# Benchmark: compressed in-process index formats vs the float32 baseline.
+# Uses the real corpus embeddings from `python vector_index.py embed`.
+# Queries are sampled corpus bullets embedded as retrieval queries with the same backend
+# (pass --doc-queries to reuse the stored document vectors and stay offline).
+# Reports memory, per-query latency and recall@k against exact float32 search.
+
+TOP_K = 10
+NUM_QUERIES = 100
+OUTPUT_PATH = os.path.join("bench_results", "compression.json")
+
+CONFIGS = [
+    ("float32", None, "truncate"),
+    ("float16", None, "truncate"),
+    ("int8", None, "truncate"),
+    ("float32", 384, "truncate"),
+    ("float32", 256, "truncate"),
+    ("int8", 256, "truncate"),
+    ("float32", 384, "pca"),
+    ("float32", 256, "pca"),
+    ("int8", 256, "pca"),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def query_vectors(vectors, meta, provider):
+    rng = random.Random(42)
+    picks = rng.sample(range(len(vectors)), min(NUM_QUERIES, len(vectors)))
+    if "--doc-queries" in sys.argv:
+        return vectors[picks]
+
+    texts = [str(meta["texts"][i]) for i in picks]
+    return np.asarray(get_provider(provider).embed(texts, "retrieval_query"), dtype=np.float32)
+
+
+def main():
+    vectors, meta, provider = load_embeddings()
+    queries = query_vectors(vectors, meta, provider)
+    print(f"Corpus: {len(vectors)} x {vectors.shape[1]} ({provider}), {len(queries)} queries, k={TOP_K}\n")
+
+    baseline = VectorIndex.from_float32(vectors, meta)
+    gold = [{m["id"] for m in baseline.search(q, TOP_K)} for q in queries]
+
+    report = {"provider": provider, "top_k": TOP_K, "corpus_size": int(len(vectors)), "queries": int(len(queries)), "configs": []}
+    print(f"{'FORMAT':<8} | {'DIMS':<5} | {'REDUCE':<8} | {'KiB':<8} | {'P50 MS':<7} | {'P95 MS':<7} | {'RECALL@K':<8}")
+    print("-" * 68)
+    for fmt, dims, reduction in CONFIGS:
+        index = VectorIndex.from_float32(vectors, meta, fmt=fmt, dims=dims, reduction=reduction)
+        latencies, recalls = [], []
+        for q, expected in zip(queries, gold):
+            start = time.perf_counter()
+            found = index.search(q, TOP_K)
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(expected & {m["id"] for m in found}) / len(expected))
+
+        row = {
+            "format": fmt,
+            "dims": int(index.data.shape[1]),
+            "reduction": reduction if dims else None,
+            "memory_kib": round(index.nbytes / 1024, 1),
+            "latency_p50_ms": round(percentile(latencies, 50), 3),
+            "latency_p95_ms": round(percentile(latencies, 95), 3),
+            "recall_at_k": round(float(np.mean(recalls)), 4),
+        }
+        report["configs"].append(row)
+        print(f"{fmt:<8} | {row['dims']:<5} | {str(row['reduction']):<8} | {row['memory_kib']:<8} | "
+              f"{row['latency_p50_ms']:<7} | {row['latency_p95_ms']:<7} | {row['recall_at_k']:<8}")
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+from dotenv import load_dotenv
+from domain_classifier import domain_weights
+from example_selector import select_examples
+from exemplar_packs import fast_examples, load_packs
+
+# Benchmark: example gathering in fast mode (precomputed exemplar packs) vs live RAG.
+# Only the example stage of rewrite_with_rag is timed; the LLM call is identical in both modes.
+#
+#   python bench_fast_mode.py [resume.json ...]
+#
+# Needs `python exemplar_packs.py` for fast mode and the usual retrieval setup
+# (RETRIEVAL_BACKEND, keys or local index) for live mode.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(script_dir, "web", ".env"))
+load_dotenv(dotenv_path=os.path.join(script_dir, ".env"))
+
+DEFAULT_RESUMES = ["test_input.json", "temp_test.json", "temp_test6.json"]
+REPEATS = 20
+OUTPUT_PATH = os.path.join("bench_results", "fast_mode.json")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def resume_bullets(resume):
+    bullets = []
+    for section in ("experience", "projects"):
+        for entry in resume.get(section, []):
+            bullets.extend(entry.get("bullets", []))
+    return bullets
+
+
+def fast_mode(bullets, domains):
+    return select_examples(fast_examples(bullets, domains))
+
+
+def live_mode(bullets, domains):
+    from rewriter_rag import retrieve_examples, EXAMPLE_OVERFETCH
+    lists = [retrieve_examples(b, top_k=EXAMPLE_OVERFETCH, domains=domains) for b in bullets[:5]]
+    return select_examples(lists)
+
+
+def time_mode(fn, resumes, repeats):
+    latencies, examples = [], []
+    for _ in range(repeats):
+        for bullets, domains in resumes:
+            start = time.perf_counter()
+            chosen = fn(bullets, domains)
+            latencies.append((time.perf_counter() - start) * 1000)
+            examples.append(len(chosen))
+    return {
+        "latency_p50_ms": round(percentile(latencies, 50), 4),
+        "latency_p95_ms": round(percentile(latencies, 95), 4),
+        "mean_examples": round(sum(examples) / len(examples), 2),
+    }
+
+
+def main():
+    paths = sys.argv[1:] or [p for p in DEFAULT_RESUMES if os.path.exists(p)]
+    resumes = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            resume = json.load(f)
+        bullets = resume_bullets(resume)
+        if bullets:
+            resumes.append((bullets, domain_weights(resume)))
+    print(f"{len(resumes)} resumes, {REPEATS} repeats each\n")
+
+    load_packs()  # startup cost, not per request
+    report = {"resumes": len(resumes), "repeats": REPEATS, "modes": {}}
+    for name, fn, repeats in (("fast", fast_mode, REPEATS), ("rag", live_mode, 1)):
+        try:
+            fn(*resumes[0])  # warm-up: client/index loading happens once per process
+            report["modes"][name] = time_mode(fn, resumes, repeats)
+        except Exception as e:
+            report["modes"][name] = {"skipped": str(e)}
+
+    print(f"{'MODE':<6} | {'P50 MS':<10} | {'P95 MS':<10} | {'EXAMPLES':<8}")
+    print("-" * 44)
+    for name, r in report["modes"].items():
+        if "skipped" in r:
+            print(f"{name:<6} | skipped ({r['skipped']})")
+        else:
+            print(f"{name:<6} | {r['latency_p50_ms']:<10} | {r['latency_p95_ms']:<10} | {r['mean_examples']:<8}")
+
+    fast, rag = report["modes"].get("fast", {}), report["modes"].get("rag", {})
+    if "latency_p50_ms" in fast and "latency_p50_ms" in rag:
+        report["p50_delta_ms"] = round(rag["latency_p50_ms"] - fast["latency_p50_ms"], 4)
+        print(f"\nFast mode saves {report['p50_delta_ms']} ms (p50) per request")
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import subprocess
+import statistics
+
+# Cold-start benchmark for the per-request entry points the Next.js routes spawn.
+#
+#   python bench_import_time.py [--update-baseline]
+#
+# 1. For each module, runs `python -X importtime -c "import <module>"` several
+#    times and takes the median cumulative import time of the module itself.
+# 2. Lists the heaviest imports of the slowest run, so a regression points at its cause.
+# 3. Fails (exit 1) if a module exceeds its budget, or is more than
+#    REGRESSION_TOLERANCE slower than the saved baseline.
+
+RUNS = 5
+REGRESSION_TOLERANCE = 1.25
+TOP_IMPORTS = 8
+BASELINE_PATH = os.path.join("bench_results", "import_time_baseline.json")
+OUTPUT_PATH = os.path.join("bench_results", "import_time.json")
+
+# Budget per entry point (ms of cumulative import time). SDKs must not load at import.
+BUDGETS_MS = {
+    "parser": 60,
+    "analyzer": 60,
+    "rewriter": 60,
+    "rewriter_rag": 120,
+    "rag_search": 120,
+}
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_profile(module):
+    """Returns {package: cumulative_us} from one `-X importtime` run."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=script_dir, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        profile[package.strip()] = int(cumulative)
+    return profile
+
+
+def load_baseline():
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def main():
+    baseline = load_baseline()
+    report = {"runs": RUNS, "python": sys.version.split()[0], "modules": {}}
+    failures = []
+
+    print(f"{'MODULE':<14} | {'MEDIAN MS':<10} | {'BUDGET':<7} | {'BASELINE':<9} | STATUS")
+    print("-" * 60)
+    for module, budget in BUDGETS_MS.items():
+        try:
+            profiles = [import_profile(module) for _ in range(RUNS)]
+        except RuntimeError as e:
+            print(f"{module:<14} | import failed: {e}")
+            report["modules"][module] = {"error": str(e)}
+            failures.append(module)
+            continue
+
+        times = [p.get(module, 0) / 1000 for p in profiles]
+        median_ms = round(statistics.median(times), 2)
+        slowest = max(profiles, key=lambda p: p.get(module, 0))
+        heaviest = sorted(
+            ((pkg, us) for pkg, us in slowest.items() if pkg != module and not pkg.startswith(".")),
+            key=lambda x: -x[1],
+        )[:TOP_IMPORTS]
+
+        status = "ok"
+        base = baseline.get(module)
+        if median_ms > budget:
+            status = "OVER BUDGET"
+        elif base and median_ms > base * REGRESSION_TOLERANCE:
+            status = "REGRESSION"
+        if status != "ok":
+            failures.append(module)
+
+        report["modules"][module] = {
+            "median_ms": median_ms,
+            "budget_ms": budget,
+            "baseline_ms": base,
+            "status": status,
+            "heaviest_imports_ms": {pkg: round(us / 1000, 2) for pkg, us in heaviest},
+        }
+        print(f"{module:<14} | {median_ms:<10} | {budget:<7} | {str(base or '-'):<9} | {status}")
+        if status != "ok":
+            for pkg, us in heaviest:
+                print(f"    {pkg:<40} {us / 1000:.1f} ms")
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {OUTPUT_PATH}")
+
+    if "--update-baseline" in sys.argv:
+        new_baseline = {m: r["median_ms"] for m, r in report["modules"].items() if "median_ms" in r}
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(new_baseline, f, indent=2)
+        print(f"Updated baseline {BASELINE_PATH}")
+
+    if failures:
+        print(f"Import-time check failed: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import random
+import statistics
+from pinecone import Pinecone
+from dotenv import load_dotenv
+from corpus_store import open_corpus
+from retrieval import query_index, query_partitions
+from embeddings import get_provider
+
+# Benchmark: partitioned (per-domain namespace) vs unpartitioned retrieval.
+# Needs an index ingested with `python vector_db.py --layout both`.
+#
+# For each sampled corpus bullet (query domain known), the gold set is its k nearest
+# SAME-DOMAIN neighbours, taken from an over-fetched flat query. We then measure:
+#   - flat recall@k:        how many gold items the plain top-k flat query returns
+#   - partitioned recall@k: how many the query against the domain's namespace returns
+#   - query latency for both (embedding time excluded; it's identical for both)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(script_dir, "web", ".env"))
+load_dotenv(dotenv_path=os.path.join(script_dir, ".env"))
+
+INDEX_NAME = "resume-bullets"
+TOP_K = 5
+OVERFETCH = 10
+QUERIES_PER_DOMAIN = 20
+OUTPUT_PATH = os.path.join("bench_results", "partitions.json")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(INDEX_NAME)
+
+    store = open_corpus()
+    rng = random.Random(42)
+    queries = []
+    for domain in store.domains():
+        texts = store.texts(domain, "real") + store.texts(domain, "synthetic")
+        for text in rng.sample(texts, min(QUERIES_PER_DOMAIN, len(texts))):
+            queries.append((domain, text))
+    store.close()
+    print(f"Running {len(queries)} queries (top_k={TOP_K})...")
+
+    results = {"flat": {"recall": [], "latency_ms": []}, "partitioned": {"recall": [], "latency_ms": []}}
+    for domain, text in queries:
+        vector = get_provider().embed_one(text, "retrieval_query")
+
+        # Gold: k nearest same-domain neighbours from an over-fetched flat query
+        wide = query_index(index, vector, TOP_K * OVERFETCH)
+        gold = set([m["text"] for m in wide if m["domain"] == domain][:TOP_K])
+        if not gold:
+            continue
+
+        flat, flat_ms = timed(query_index, index, vector, TOP_K)
+        part, part_ms = timed(query_partitions, index, vector, TOP_K, {domain: 1.0})
+
+        for name, matches, ms in (("flat", flat, flat_ms), ("partitioned", part, part_ms)):
+            hits = len(gold & {m["text"] for m in matches})
+            results[name]["recall"].append(hits / len(gold))
+            results[name]["latency_ms"].append(ms)
+
+    report = {"top_k": TOP_K, "queries": len(results["flat"]["recall"])}
+    for name, r in results.items():
+        report[name] = {
+            "recall_at_k": round(statistics.mean(r["recall"]), 4),
+            "latency_p50_ms": round(percentile(r["latency_ms"], 50), 2),
+            "latency_p95_ms": round(percentile(r["latency_ms"], 95), 2),
+        }
+
+    print(f"\n{'LAYOUT':<12} | {'RECALL@K':<9} | {'P50 MS':<8} | {'P95 MS':<8}")
+    print("-" * 46)
+    for name in ("flat", "partitioned"):
+        r = report[name]
+        print(f"{name:<12} | {r['recall_at_k']:<9} | {r['latency_p50_ms']:<8} | {r['latency_p95_ms']:<8}")
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
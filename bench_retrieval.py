@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from corpus_store import open_corpus
+from dedup import MinHashLSH
+
+# Retrieval benchmark harness.
+#
+#   python bench_retrieval.py [--backends exact,int8,bm25,...] [--k 5] [--queries 100]
+#
+# 1. Builds (once) a labelled query set from the corpus: each query is a degraded
+#    copy of a corpus bullet (words dropped, numbers removed); the source bullet is
+#    relevant (grade 2) and its near-duplicates in the corpus are relevant (grade 1).
+#    Saved to QUERY_SET_PATH so runs stay comparable over time.
+# 2. Runs every configured backend end-to-end (query embedding included).
+# 3. Reports p50/p95/p99 latency, QPS at several concurrency levels, recall@k and
+#    nDCG@k, written as a timestamped JSON artifact under bench_results/.
+#
+# Backends:
+#   pinecone, pinecone-partitioned    - remote index (vector_db.py)
+#   exact, float16, int8, pca256      - in-process vector_index.py over corpus_embeddings.npz
+#   partitioned                       - exact, restricted to the query's domain
+#   bm25, hybrid                      - lexical index alone / RRF of exact + bm25
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(script_dir, "web", ".env"))
+load_dotenv(dotenv_path=os.path.join(script_dir, ".env"))
+
+QUERY_SET_PATH = os.path.join("bench_results", "retrieval_queries.json")
+OUTPUT_DIR = "bench_results"
+DEFAULT_BACKENDS = ["exact", "float16", "int8", "pca256", "partitioned", "bm25", "hybrid"]
+CONCURRENCY_LEVELS = [1, 4, 16]
+DROP_RATE = 0.5
+
+
+def _arg(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+def degrade(text, rng):
+    """Turn a bullet into a plausible user query: drop numbers and about half the words."""
+    words = [w for w in text.replace("\\", "").split() if not any(c.isdigit() for c in w)]
+    kept = [w for w in words if rng.random() > DROP_RATE]
+    return " ".join(kept or words)
+
+
+def build_query_set(num_queries, seed=42):
+    store = open_corpus()
+    rows = [(r["text"], r["domain"]) for r in store.iter_bullets()]
+    store.close()
+
+    # Near-duplicate clusters give the grade-1 relevant items
+    lsh = MinHashLSH(threshold=0.6)
+    for i, (text, _) in enumerate(rows):
+        lsh.insert(i, text)
+
+    rng = random.Random(seed)
+    queries = []
+    for i in rng.sample(range(len(rows)), min(num_queries, len(rows))):
+        text, domain = rows[i]
+        relevant = {text: 2}
+        for j in lsh.query(text):
+            relevant.setdefault(rows[j][0], 1)
+        queries.append({"query": degrade(text, rng), "domain": domain, "relevant": relevant})
+    return queries
+
+
+def load_query_set(num_queries):
+    if os.path.exists(QUERY_SET_PATH):
+        with open(QUERY_SET_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    queries = build_query_set(num_queries)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(QUERY_SET_PATH, 'w', encoding='utf-8') as f:
+        json.dump(queries, f, indent=2, ensure_ascii=False)
+    print(f"Saved labelled query set ({len(queries)} queries) to {QUERY_SET_PATH}")
+    return queries
+
+
+# --- Backends: each returns fn(query, domain, k) -> [text, ...] ---
+
+def _local_backend(fmt="float32", dims=None, reduction="truncate", partitioned=False):
+    from vector_index import VectorIndex, load_embeddings
+    from embeddings import get_provider
+    vectors, meta, provider = load_embeddings()
+    index = VectorIndex.from_float32(vectors, meta, fmt=fmt, dims=dims, reduction=reduction, provider=provider)
+    embedder = get_provider(provider)
+
+    def search(query, domain, k):
+        vector = embedder.embed_one(query, "retrieval_query")
+        return [m["text"] for m in index.search(vector, k, {domain: 1.0} if partitioned else None)]
+    return search
+
+
+def _pinecone_backend(partitioned=False):
+    from pinecone import Pinecone
+    from embeddings import get_provider
+    from retrieval import query_partitions
+    index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index("resume-bullets")
+
+    def search(query, domain, k):
+        vector = get_provider().embed_one(query, "retrieval_query")
+        return [m["text"] for m in query_partitions(index, vector, k, {domain: 1.0} if partitioned else None)]
+    return search
+
+
+def _bm25_backend():
+    from bm25 import get_index
+    index = get_index()
+
+    def search(query, domain, k):
+        return [r["text"] for r in index.search(query, k)]
+    return search
+
+
+def _hybrid_backend():
+    from bm25 import rrf_fuse
+    dense, lexical = _local_backend(), _bm25_backend()
+
+    def search(query, domain, k):
+        return rrf_fuse([dense(query, domain, k * 2), lexical(query, domain, k * 2)])[:k]
+    return search
+
+
+BACKENDS = {
+    "pinecone": lambda: _pinecone_backend(),
+    "pinecone-partitioned": lambda: _pinecone_backend(partitioned=True),
+    "exact": lambda: _local_backend(),
+    "float16": lambda: _local_backend("float16"),
+    "int8": lambda: _local_backend("int8"),
+    "pca256": lambda: _local_backend("float32", 256, "pca"),
+    "partitioned": lambda: _local_backend(partitioned=True),
+    "bm25": _bm25_backend,
+    "hybrid": _hybrid_backend,
+}
+
+
+# --- Metrics ---
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def recall_at_k(found, relevant, k):
+    # A query can't score above 1.0 just because it has more than k labels
+    return len(set(found[:k]) & set(relevant)) / min(k, len(relevant))
+
+
+def ndcg_at_k(found, relevant, k):
+    dcg = sum((2 ** relevant.get(t, 0) - 1) / math.log2(i + 2) for i, t in enumerate(found[:k]))
+    ideal = sorted(relevant.values(), reverse=True)[:k]
+    idcg = sum((2 ** g - 1) / math.log2(i + 2) for i, g in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+
+def run_backend(search, queries, k):
+    latencies, recalls, ndcgs = [], [], []
+    errors = 0
+    for q in queries:
+        start = time.perf_counter()
+        try:
+            found = search(q["query"], q["domain"], k)
+        except Exception as e:
+            errors += 1
+            print(f"    ! {e}", file=sys.stderr)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not q.get("relevant"):
+            continue  # unlabelled: latency only
+        recalls.append(recall_at_k(found, q["relevant"], k))
+        ndcgs.append(ndcg_at_k(found, q["relevant"], k))
+
+    if not latencies:
+        return {"errors": errors}
+
+    def timed_search(q):
+        # One failing query must not abort the whole throughput run
+        try:
+            search(q["query"], q["domain"], k)
+            return True
+        except Exception as e:
+            print(f"    ! {e}", file=sys.stderr)
+            return False
+
+    throughput, throughput_errors = {}, 0
+    for workers in CONCURRENCY_LEVELS:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            completed = sum(pool.map(timed_search, queries))
+        throughput_errors += len(queries) - completed
+        throughput[str(workers)] = round(completed / (time.perf_counter() - start), 1)
+
+    return {
+        "latency_p50_ms": round(percentile(latencies, 50), 3),
+        "latency_p95_ms": round(percentile(latencies, 95), 3),
+        "latency_p99_ms": round(percentile(latencies, 99), 3),
+        "qps": throughput,
+        "recall_at_k": round(sum(recalls) / len(recalls), 4) if recalls else None,
+        "ndcg_at_k": round(sum(ndcgs) / len(ndcgs), 4) if ndcgs else None,
+        "labelled_queries": len(recalls),
+        "errors": errors,
+        "throughput_errors": throughput_errors,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main():
+    k = int(_arg("--k", 5))
+    backends = _arg("--backends", ",".join(DEFAULT_BACKENDS)).split(",")
+    queries = load_query_set(int(_arg("--queries", 100)))
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "k": k,
+        "queries": len(queries),
+        "embedding_backend": os.getenv("EMBEDDING_BACKEND", "gemini"),
+        "backends": {},
+    }
+
+    print(f"{'BACKEND':<22} | {'P50':<8} | {'P95':<8} | {'P99':<8} | {'QPS@' + str(CONCURRENCY_LEVELS[-1]):<8} | {'R@K':<6} | {'NDCG':<6}")
+    print("-" * 86)
+    for name in backends:
+        try:
+            search = BACKENDS[name]()
+        except Exception as e:
+            print(f"{name:<22} | skipped ({e})")
+            report["backends"][name] = {"skipped": str(e)}
+            continue
+
+        result = run_backend(search, queries, k)
+        report["backends"][name] = result
+        if "latency_p50_ms" in result:
+            print(f"{name:<22} | {result['latency_p50_ms']:<8} | {result['latency_p95_ms']:<8} | "
+                  f"{result['latency_p99_ms']:<8} | {result['qps'][str(CONCURRENCY_LEVELS[-1])]:<8} | "
+                  f"{str(result['recall_at_k']):<6} | {str(result['ndcg_at_k']):<6}")
+        else:
+            print(f"{name:<22} | all {result['errors']} queries failed")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, f"retrieval_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import time
+from dotenv import load_dotenv
+
+# Benchmark: completion tokens and latency of the rewrite, full echo contract vs
+# the compact {entry_id: [bullets]} contract (compact_rewrite.py).
+#
+#   python bench_rewrite_tokens.py [--rag] [--runs 3] [resume.json ...]
+#
+# Runs against whatever GROQ_BASE_URL points at. Offline, use mock_services.py
+# with --decode-ms-per-token so latency tracks output length like the real API:
+#   python mock_services.py --decode-ms-per-token 4 --latency groq=fixed:150
+# --rag benchmarks rewriter_rag.py (adds retrieval; set REWRITE_MODE=fast to keep it cheap).
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(script_dir, "web", ".env"))
+load_dotenv(dotenv_path=os.path.join(script_dir, ".env"))
+
+DEFAULT_RESUMES = ["temp_test.json", "temp_test6.json", "test_output.json", "debug_llm_response.txt"]
+SCHEMAS = ["full", "compact"]
+OUTPUT_PATH = os.path.join("bench_results", "rewrite_tokens.json")
+
+
+def load_resume(path):
+    with open(os.path.join(script_dir, path) if not os.path.isabs(path) else path, 'r', encoding='utf-8') as f:
+        text = f.read().replace("```json", "").replace("```", "").strip()
+    return json.loads(text)
+
+
+def unchanged_outside_bullets(original, rewritten):
+    """True when every field except bullets/summary/softSkills came back identical."""
+    def strip(doc):
+        doc = json.loads(json.dumps(doc))
+        for key in list(doc):
+            if key.startswith("_") or key == "softSkills":
+                del doc[key]
+        doc.get("profile", {}).pop("summary", None)
+        for section in ("experience", "projects", "responsibilities"):
+            for entry in doc.get(section) or []:
+                if isinstance(entry, dict):
+                    entry.pop("bullets", None)
+        return doc
+    return strip(original) == strip(rewritten)
+
+
+def main():
+    args = sys.argv[1:]
+    use_rag = "--rag" in args
+    runs = int(args[args.index("--runs") + 1]) if "--runs" in args else 3
+    paths = [a for i, a in enumerate(args) if not a.startswith("--") and (i == 0 or args[i - 1] != "--runs")]
+    paths = paths or DEFAULT_RESUMES
+
+    import metrics
+    if use_rag:
+        import rewriter_rag as target
+        rewrite, site = target.rewrite_with_rag, "rewrite"
+    else:
+        import rewriter as target
+        rewrite, site = target.rewrite_resume, "rewrite_basic"
+
+    # 1. Rewrite every fixture under both contracts
+    rows = []
+    for path in paths:
+        resume = load_resume(path)
+        for schema in SCHEMAS:
+            target.REWRITE_SCHEMA = schema
+            target.HASH_REUSE = target.SEMANTIC_CACHE = False  # measure the model, not the caches
+            for _ in range(runs):
+                before = (metrics.counter("llm_prompt_tokens_total", site=site),
+                          metrics.counter("llm_completion_tokens_total", site=site))
+                start = time.perf_counter()
+                result = rewrite(json.dumps(resume))
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if "error" in result:
+                    print(f"  ! {path} [{schema}]: {result['error']}", file=sys.stderr)
+                    continue
+                rows.append({
+                    "resume": os.path.basename(path),
+                    "schema": schema,
+                    "prompt_tokens": metrics.counter("llm_prompt_tokens_total", site=site) - before[0],
+                    "completion_tokens": metrics.counter("llm_completion_tokens_total", site=site) - before[1],
+                    "latency_ms": round(elapsed_ms, 1),
+                    "structure_preserved": unchanged_outside_bullets(resume, result),
+                })
+
+    # 2. Summarise per contract
+    summary = {}
+    for schema in SCHEMAS:
+        mine = [r for r in rows if r["schema"] == schema]
+        if not mine:
+            continue
+        summary[schema] = {
+            "calls": len(mine),
+            "avg_prompt_tokens": round(sum(r["prompt_tokens"] for r in mine) / len(mine), 1),
+            "avg_completion_tokens": round(sum(r["completion_tokens"] for r in mine) / len(mine), 1),
+            "avg_latency_ms": round(sum(r["latency_ms"] for r in mine) / len(mine), 1),
+            "structure_preserved": sum(r["structure_preserved"] for r in mine) / len(mine),
+        }
+
+    print(f"\n{'schema':<8} | {'calls':<5} | {'prompt tok':<10} | {'completion tok':<14} | {'latency ms':<10} | preserved")
+    print("-" * 70)
+    for schema, s in summary.items():
+        print(f"{schema:<8} | {s['calls']:<5} | {s['avg_prompt_tokens']:<10} | {s['avg_completion_tokens']:<14} | {s['avg_latency_ms']:<10} | {s['structure_preserved']:.0%}")
+    if "full" in summary and "compact" in summary and summary["full"]["avg_completion_tokens"]:
+        full, compact = summary["full"], summary["compact"]
+        print(f"\nCompletion tokens: -{100 * (1 - compact['avg_completion_tokens'] / full['avg_completion_tokens']):.1f}%  "
+              f"Latency: -{100 * (1 - compact['avg_latency_ms'] / full['avg_latency_ms']):.1f}%")
+
+    # 3. Save
+    os.makedirs("bench_results", exist_ok=True)
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump({
+            "target": "rewriter_rag" if use_rag else "rewriter",
+            "groq_base_url": os.getenv("GROQ_BASE_URL") or "https://api.groq.com",
+            "summary": summary,
+            "runs": rows,
+        }, f, indent=2)
+    print(f"\nSaved report to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import re
+import sys
+import json
+import math
+import threading
+from corpus_store import open_corpus
+
+# In-process BM25 index over the bullet corpus.
+# Many resume bullets share exact tech keywords ("Kubernetes", "Jira") with
+# corpus bullets; a lexical index finds those without a remote embedding call.
+# Built once from the corpus store and persisted to BM25_INDEX_PATH.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+BM25_INDEX_PATH = os.path.join(script_dir, 'bm25_index.json')
+K1 = 1.5
+B = 0.75
+RRF_K = 60
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from", "as",
+    "is", "was", "were", "be", "been", "this", "that", "into", "over", "across", "using", "via",
+    "our", "their", "its", "it", "per", "than", "while", "through",
+}
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+
+
+def tokenize(text):
+    tokens = []
+    for tok in _TOKEN_PATTERN.findall(text.lower().replace("\\", "")):
+        tok = tok.rstrip(".")
+        if tok and tok not in STOPWORDS and not tok.isdigit():
+            tokens.append(tok)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, docs=None, postings=None, doc_len=None):
+        self.docs = docs or []            # [{"text", "domain", "quality_score"}]
+        self.postings = postings or {}    # term -> [[doc_idx, tf], ...]
+        self.doc_len = doc_len or []
+        self._finalize()
+
+    def _finalize(self):
+        n = len(self.docs)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    @classmethod
+    def build(cls, docs):
+        postings = {}
+        doc_len = []
+        for i, doc in enumerate(docs):
+            tokens = tokenize(doc["text"])
+            doc_len.append(len(tokens))
+            counts = {}
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                postings.setdefault(tok, []).append([i, tf])
+        return cls(list(docs), postings, doc_len)
+
+    def save(self, path=BM25_INDEX_PATH):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"docs": self.docs, "postings": self.postings, "doc_len": self.doc_len}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=BM25_INDEX_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["docs"], data["postings"], data["doc_len"])
+
+    def search(self, query, top_k=5, domains=None, min_quality=None):
+        """
+        Returns [{"text", "domain", "score", "coverage"}] best first.
+        coverage = share of the query's IDF mass the bullet matches (0-1), used as lexical confidence.
+        """
+        terms = set(tokenize(query))
+        query_idf = sum(self.idf.get(t, 0.0) for t in terms)
+        if not query_idf:
+            return []
+
+        scores = {}
+        matched_idf = {}
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, tf in self.postings[term]:
+                norm = K1 * (1 - B + B * self.doc_len[doc_idx] / self.avgdl)
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+                matched_idf[doc_idx] = matched_idf.get(doc_idx, 0.0) + idf
+
+        results = []
+        for doc_idx, score in sorted(scores.items(), key=lambda x: (-x[1], x[0])):
+            doc = self.docs[doc_idx]
+            if domains and doc["domain"] not in domains:
+                continue
+            quality = doc.get("quality_score")
+            if min_quality and quality is not None and quality < min_quality:
+                continue
+            results.append({
+                "text": doc["text"],
+                "domain": doc["domain"],
+                "score": round(score, 4),
+                "coverage": round(matched_idf[doc_idx] / query_idf, 4),
+            })
+            if len(results) >= top_k:
+                break
+        return results
+
+
+def lexical_confidence(results, top_k):
+    """Confidence that lexical results alone are good enough: min coverage over a full top-k."""
+    if len(results) < top_k:
+        return 0.0
+    return min(r["coverage"] for r in results[:top_k])
+
+
+def rrf_fuse(ranked_lists, k=RRF_K):
+    """Reciprocal-rank fusion of ranked text lists; stable for ties (first list wins)."""
+    scores = {}
+    order = {}
+    for ranked in ranked_lists:
+        for rank, text in enumerate(ranked):
+            scores[text] = scores.get(text, 0.0) + 1.0 / (k + rank + 1)
+            order.setdefault(text, len(order))
+    return sorted(scores, key=lambda t: (-scores[t], order[t]))
+
+
+def build_from_store(store):
+    docs = [
+        {"text": r["text"], "domain": r["domain"], "quality_score": r["quality_score"]}
+        for r in store.iter_bullets()
+    ]
+    return BM25Index.build(docs)
+
+
+_index = None
+_index_lock = threading.Lock()  # rag_search.py and run_with_deadline call this from several threads
+
+
+def get_index(path=BM25_INDEX_PATH):
+    """Load the persisted index once per process, building it from the corpus if missing."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _load_or_build(path)
+    return _index
+
+
+def _load_or_build(path):
+    if os.path.exists(path):
+        return BM25Index.load(path)
+    store = open_corpus()
+    index = build_from_store(store)
+    store.close()
+    if index.docs:  # never persist an index built from a missing corpus
+        index.save(path)
+    return index
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        store = open_corpus()
+        index = build_from_store(store)
+        store.close()
+        index.save()
+        print(f"Built BM25 index: {len(index.docs)} bullets, {len(index.postings)} terms -> {BM25_INDEX_PATH}")
+    elif command == "search":
+        results = get_index().search(sys.argv[2], top_k=5)
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"Unknown command: {command} (use build or search)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+from clients import get_groq_client
+from metrics import instrumented_completion, inc, observe, render_prometheus, snapshot
+from prompts import compile_prompt, compact_json, estimate_tokens
+from compact_rewrite import parse_reply
+from domain_classifier import detect_domain
+from semantic_cache import SEMANTIC_CACHE, get_semantic_cache
+
+# Bullet-level rewrite.
+#
+#   python bullet_rewriter.py < request.json                   # one-shot
+#   python bullet_rewriter.py --serve [--port 8766]             # resident service
+#
+# Request: {"bullets": [{"id": "b1", "text": "...", "context": {"title": "...", "org": "..."}}]}
+# Reply:   {"results": [{"id": "b1", "text": "...", "rewritten": true}]}
+#
+# In service mode every bullet, from every concurrent request, goes into one
+# MicroBatcher: pending bullets are collected for BATCH_WINDOW_MS (or until
+# MAX_BATCH_BULLETS) and sent as a single completion with per-item ids, then
+# fanned back out to the waiting requests. Under load that is one LLM call per
+# window instead of one per bullet. Bullets near-identical to ones rewritten
+# before (any user, same domain) are answered from semantic_cache.py and never
+# reach the model ("cached": true in the result; SEMANTIC_CACHE=0 disables).
+#   POST /rewrite, GET /health, GET /metrics, GET /metrics/prometheus
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(script_dir, ".env"))
+load_dotenv(dotenv_path=os.path.join(script_dir, "web", ".env"))
+
+DEFAULT_PORT = 8766
+BATCH_WINDOW_MS = int(os.getenv("BULLET_BATCH_WINDOW_MS", "25"))
+MAX_BATCH_BULLETS = 32
+MAX_INFLIGHT_BATCHES = 4
+MAX_REQUEST_BULLETS = 50
+REQUEST_TIMEOUT_SECONDS = 60
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+
+def _item_context(item):
+    context = item.get("context") or {}
+    out = {"bullet": item["text"]}
+    for key in ("title", "org"):
+        if context.get(key):
+            out[key] = context[key]
+    return out
+
+
+def _item_domain(item):
+    return detect_domain({"experience": [{"role": (item.get("context") or {}).get("title", "")}]})
+
+
+def rewrite_batch(items):
+    """
+    Rewrite a list of {"text", "context"} items: semantic cache hits first,
+    the rest in one completion. Returns one result per item, in order.
+    """
+    if not SEMANTIC_CACHE:
+        return rewrite_with_llm(items)
+    results = [None] * len(items)
+    domains = [_item_domain(item) for item in items]
+    # The cache only saves calls: if it fails, every bullet goes to the model
+    try:
+        cache = get_semantic_cache()
+        for domain in set(domains):
+            indices = [i for i, d in enumerate(domains) if d == domain]
+            for i, text in zip(indices, cache.lookup([items[i]["text"] for i in indices], domain)):
+                if text is not None:
+                    results[i] = {"text": text, "rewritten": True, "cached": True}
+    except Exception as e:
+        print(f"Semantic cache lookup failed: {e}", file=sys.stderr)
+        cache, results = None, [None] * len(items)
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        for i, result in zip(pending, rewrite_with_llm([items[i] for i in pending])):
+            results[i] = result
+        try:
+            for domain in set(domains[i] for i in pending) if cache else ():
+                cache.store([(items[i]["text"], results[i]["text"]) for i in pending
+                             if domains[i] == domain and results[i]["rewritten"]], domain)
+        except Exception as e:
+            print(f"Semantic cache store failed: {e}", file=sys.stderr)
+    return results
+
+
+def rewrite_with_llm(items):
+    """
+    One completion for a list of {"text", "context"} items. Identical bullets
+    (same text and context) are sent once. Returns one result per item, in order;
+    items the model skipped come back unchanged with rewritten=False.
+    """
+    # 1. Short per-item ids, deduplicated
+    payload, keys = {}, []
+    seen = {}
+    for item in items:
+        ctx = _item_context(item)
+        key = compact_json(ctx)
+        if key not in seen:
+            seen[key] = f"i{len(seen)}"
+            payload[seen[key]] = ctx
+        keys.append(seen[key])
+
+    # 2. One batched call
+    user_content = f"Rewrite bullets:\n{compact_json(payload)}"
+    system = compile_prompt("rewrite_bullets_system", site="rewrite_bullets", reserved_tokens=estimate_tokens(user_content))
+    client = get_groq_client(os.getenv("GROQ_API_KEY"))
+    completion = instrumented_completion(
+        client, "rewrite_bullets",
+        messages=[
+            {"role": "system", "content": system.text},
+            {"role": "user", "content": user_content}
+        ],
+        model="llama-3.3-70b-versatile",
+        temperature=0.2,
+        stream=False,
+    )
+    reply = parse_reply(completion.choices[0].message.content)
+
+    # 3. Fan results back out
+    results = []
+    for item, key in zip(items, keys):
+        text = reply.get(key)
+        if isinstance(text, str) and text.strip():
+            results.append({"text": text.strip(), "rewritten": True})
+        else:
+            results.append({"text": item["text"], "rewritten": False})
+    return results
+
+
+class MicroBatcher:
+    """Collects submitted items for a short window and hands them to `handler` as one list."""
+
+    def __init__(self, handler, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH_BULLETS):
+        self.handler = handler
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=MAX_INFLIGHT_BATCHES)
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Dispatch without blocking the next window
+            self._pool.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        now = time.perf_counter()
+        observe("bullet_batch_size", len(batch), buckets=BATCH_SIZE_BUCKETS)
+        for _, _, queued in batch:
+            observe("bullet_queue_wait_seconds", now - queued)
+        self._run(batch)
+
+    def _run(self, batch):
+        try:
+            results = self.handler([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad item must not fail everyone batched with it: retry one by one
+            print(f"Batch of {len(batch)} failed ({e}); retrying items individually", file=sys.stderr)
+            inc("bullet_batch_fallbacks_total")
+            for entry in batch:
+                self._run([entry])
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+
+def validate_request(body):
+    """List of bullet items or an error message."""
+    bullets = body.get("bullets") if isinstance(body, dict) else None
+    if not bullets or not isinstance(bullets, list):
+        return None, "No bullets provided"
+    if len(bullets) > MAX_REQUEST_BULLETS:
+        return None, f"At most {MAX_REQUEST_BULLETS} bullets per request"
+    items = []
+    for i, b in enumerate(bullets):
+        if isinstance(b, str):
+            b = {"text": b}
+        if not isinstance(b, dict) or not isinstance(b.get("text"), str) or not b["text"].strip():
+            return None, f"Bullet {i} has no text"
+        context = b.get("context") or {}
+        if not isinstance(context, dict):
+            return None, f"Bullet {i}: context must be an object"
+        for key in ("title", "org"):
+            if context.get(key) is not None and not isinstance(context[key], str):
+                return None, f"Bullet {i}: context.{key} must be a string"
+        items.append({"id": b.get("id", str(i)), "text": b["text"].strip(), "context": context})
+    return items, None
+
+
+class BulletHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    batcher = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "window_ms": BATCH_WINDOW_MS})
+        elif self.path == "/metrics":
+            self._send(200, snapshot())
+        elif self.path == "/metrics/prometheus":
+            self._send(200, render_prometheus(), "text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/rewrite":
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            items, error = validate_request(json.loads(self.rfile.read(length) or b"{}"))
+            if error:
+                self._send(400, {"error": error})
+                return
+            futures = [self.batcher.submit(item) for item in items]
+            results = [dict(f.result(timeout=REQUEST_TIMEOUT_SECONDS), id=item["id"]) for item, f in zip(items, futures)]
+            self._send(200, {"results": results})
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+
+class BulletServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # bursts of editor requests arrive together; don't reset them at accept()
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT):
+    BulletHandler.batcher = MicroBatcher(rewrite_batch)
+    server = BulletServer((host, port), BulletHandler)
+    print(f"Bullet rewrite service on http://{host}:{port} (batch window {BATCH_WINDOW_MS} ms)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def rewrite_bullets(json_str):
+    """One-shot: all bullets of the request in a single completion."""
+    try:
+        items, error = validate_request(json.loads(json_str))
+        if error:
+            return {"error": error}
+        if not os.getenv("GROQ_API_KEY"):
+            return {"error": "GROQ_API_KEY missing"}
+        results = rewrite_batch(items)
+        return {"results": [dict(result, id=item["id"]) for item, result in zip(items, results)]}
+    except Exception as e:
+        return {"error": str(e), "trace": traceback.format_exc()}
+
+
+def _arg(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        if not os.getenv("GROQ_API_KEY"):
+            print(json.dumps({"error": "GROQ_API_KEY missing"}))
+            sys.exit(1)
+        serve(_arg("--host", "127.0.0.1"), int(_arg("--port", DEFAULT_PORT)))
+    else:
+        json_input = sys.stdin.read()
+        if not json_input.strip():
+            print(json.dumps({"error": "No JSON input provided via stdin"}))
+        else:
+            print(json.dumps(rewrite_bullets(json_input)))
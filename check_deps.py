@@ -15,3 +15,9 @@ try:
     print("dotenv OK")
 except ImportError:
     print("dotenv MISSING")
+
+try:
+    import numpy
+    print("numpy OK")
+except ImportError:
+    print("numpy MISSING (semantic cache, vector index and exemplar packs are disabled)")
@@ -0,0 +1,28 @@
+import os
+from functools import lru_cache
+
+# Lazily constructed SDK clients.
+# The SDKs (groq, pinecone) take a large share of a cold process start, and the
+# Next.js routes spawn a fresh Python process per request. Entry points import
+# this module instead of the SDKs, so nothing is loaded until a client is
+# actually needed (and never on validation/error paths).
+# GROQ_BASE_URL / PINECONE_HOST redirect them, e.g. to mock_services.py.
+
+INDEX_NAME = "resume-bullets"
+
+
+@lru_cache(maxsize=None)
+def get_groq_client(api_key=None):
+    from groq import Groq
+    return Groq(api_key=api_key or os.getenv("GROQ_API_KEY"), base_url=os.getenv("GROQ_BASE_URL") or None)
+
+
+@lru_cache(maxsize=None)
+def get_pinecone_client(api_key=None):
+    from pinecone import Pinecone
+    return Pinecone(api_key=api_key or os.getenv("PINECONE_API_KEY"), host=os.getenv("PINECONE_HOST") or None)
+
+
+@lru_cache(maxsize=None)
+def get_pinecone_index(name=INDEX_NAME):
+    return get_pinecone_client().Index(name)
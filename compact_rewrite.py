@@ -0,0 +1,115 @@
+import os
+import copy
+import json
+
+# Compact rewrite contract.
+# Asking the model to echo the whole resume back spends most of the completion
+# (and so most of the latency) regenerating profile, education, skills, dates...
+# that never change. Instead the model sees only the rewritable parts, keyed by
+# short local entry ids, and answers with the changes:
+#
+#   in:  {"summary": "...", "softSkills": [...], "entries": {"e0": {"title", "org", "bullets"}, ...}}
+#   out: {"bullets": {"e0": ["..."]}, "summary": "...", "softSkills": [...], "drop": ["r1"]}
+#
+# merge_rewrite() applies the reply to a copy of the original document.
+# `only` (a set of entry ids, plus "summary") narrows both to the entries an
+# edit touched (patch requests, see session_store.py).
+# REWRITE_SCHEMA=full restores the echo-everything contract.
+
+REWRITE_SCHEMA = os.getenv("REWRITE_SCHEMA", "compact")
+
+# (resume section, entry id prefix, title field, organisation field)
+ENTRY_SECTIONS = [
+    ("experience", "e", "role", "company"),
+    ("projects", "p", "name", None),
+    ("responsibilities", "r", "title", "organization"),
+]
+# Sections the dedupe rule may drop entries from
+DROPPABLE = ("experience", "responsibilities")
+
+
+def entry_ids(resume):
+    """{entry_id: (section, index)} in document order, e.g. e0, e1, p0, r0."""
+    ids = {}
+    for section, prefix, _, _ in ENTRY_SECTIONS:
+        for i, entry in enumerate(resume.get(section) or []):
+            if isinstance(entry, dict):
+                ids[f"{prefix}{i}"] = (section, i)
+    return ids
+
+
+def compact_payload(resume, only=None):
+    """The rewritable subset of the resume, keyed by entry id (restricted to `only` if given)."""
+    entries = {}
+    for section, prefix, title_field, org_field in ENTRY_SECTIONS:
+        for i, entry in enumerate(resume.get(section) or []):
+            if not isinstance(entry, dict) or (only is not None and f"{prefix}{i}" not in only):
+                continue
+            item = {"title": entry.get(title_field, "")}
+            if org_field and entry.get(org_field):
+                item["org"] = entry[org_field]
+            item["bullets"] = entry.get("bullets") or []
+            if not item["bullets"] and entry.get("description"):
+                item["description"] = entry["description"]
+            entries[f"{prefix}{i}"] = item
+    if only is not None and "summary" not in only:
+        return {"entries": entries}
+    return {
+        "summary": (resume.get("profile") or {}).get("summary", ""),
+        "softSkills": resume.get("softSkills") or [],
+        "entries": entries,
+    }
+
+
+def _strings(value):
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def merge_rewrite(resume, reply, only=None):
+    """
+    Apply a compact reply to a copy of `resume`. Unknown ids and malformed
+    values are ignored, so a partial reply leaves the rest of the document as-is.
+    Returns (merged resume, stats).
+    """
+    merged = copy.deepcopy(resume)
+    ids = entry_ids(resume)
+    stats = {"entries_rewritten": 0, "dropped": [], "ignored": []}
+
+    for eid, bullets in (reply.get("bullets") or {}).items():
+        if eid not in ids or (only is not None and eid not in only) or not _strings(bullets) or not bullets:
+            stats["ignored"].append(eid)
+            continue
+        section, i = ids[eid]
+        merged[section][i]["bullets"] = [b.strip() for b in bullets if b.strip()]
+        stats["entries_rewritten"] += 1
+
+    if only is not None and "summary" not in only:
+        reply = {key: value for key, value in reply.items() if key not in ("summary", "softSkills", "drop")}
+    summary = reply.get("summary")
+    if isinstance(summary, str) and summary.strip():
+        merged.setdefault("profile", {})["summary"] = summary.strip()
+
+    soft_skills = reply.get("softSkills")
+    if _strings(soft_skills) and soft_skills and not resume.get("softSkills"):
+        merged["softSkills"] = soft_skills
+
+    # Drop duplicates last, highest index first, so earlier indices stay valid
+    drops = [eid for eid in (reply.get("drop") or []) if eid in ids and ids[eid][0] in DROPPABLE]
+    for eid in sorted(set(drops), key=lambda e: -ids[e][1]):
+        section, i = ids[eid]
+        del merged[section][i]
+        stats["dropped"].append(eid)
+    stats["ignored"].extend(eid for eid in (reply.get("drop") or []) if eid not in drops)
+    return merged, stats
+
+
+def parse_reply(text):
+    """First JSON object in the model output (tolerates code fences and trailing text)."""
+    text = text.replace("```json", "").replace("```", "").strip()
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in response")
+    reply, _ = json.JSONDecoder().raw_decode(text[start:])
+    if not isinstance(reply, dict):
+        raise ValueError("Rewrite reply is not a JSON object")
+    return reply
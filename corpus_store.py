@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+
+# SQLite-backed bullet corpus.
+# Replaces reading/rewriting the whole of augmented_resumes.json in every tool:
+# tools stream rows with iter_bullets() and write back only the rows they change,
+# inside a transaction, so a crash mid-run can't corrupt the corpus.
+# augmented_resumes.json stays as the import/export format.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DB = os.path.join(script_dir, 'corpus.db')
+CORPUS_JSON = os.path.join(script_dir, 'augmented_resumes.json')
+BULLET_TYPES = ("real", "synthetic")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS domains (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bullets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    domain TEXT NOT NULL REFERENCES domains(name),
+    type TEXT NOT NULL CHECK (type IN ('real', 'synthetic')),
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    quality_score REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bullets_domain_type ON bullets(domain, type, position);
+CREATE INDEX IF NOT EXISTS idx_bullets_type ON bullets(type);
+CREATE INDEX IF NOT EXISTS idx_bullets_hash ON bullets(content_hash);
+CREATE INDEX IF NOT EXISTS idx_bullets_quality ON bullets(quality_score);
+"""
+
+# Per-bullet quality features written by quality.py (added to older DBs on open)
+FEATURE_COLUMNS = {
+    "length": "REAL",
+    "metric_density": "REAL",
+    "verb_strength": "REAL",
+    "has_currency": "INTEGER",
+    "has_percent": "INTEGER",
+    "latex_residue": "REAL",
+}
+
+
+def content_hash(text):
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+
+class CorpusStore:
+    def __init__(self, path=CORPUS_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self._tx_depth = 0
+
+    def _migrate(self):
+        existing = {r["name"] for r in self.conn.execute("PRAGMA table_info(bullets)")}
+        with self.conn:
+            for name, col_type in FEATURE_COLUMNS.items():
+                if name not in existing:
+                    self.conn.execute(f"ALTER TABLE bullets ADD COLUMN {name} {col_type}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Commit everything in the block at once, or nothing on error. Nests."""
+        if self._tx_depth:
+            self._tx_depth += 1
+            try:
+                yield self.conn
+            finally:
+                self._tx_depth -= 1
+            return
+        self._tx_depth = 1
+        try:
+            with self.conn:
+                yield self.conn
+        finally:
+            self._tx_depth = 0
+
+    # --- Domains ---
+
+    def add_domain(self, domain):
+        row = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM domains").fetchone()
+        self.conn.execute(
+            "INSERT OR IGNORE INTO domains (name, position) VALUES (?, ?)", (domain, row[0])
+        )
+
+    def domains(self):
+        return [r["name"] for r in self.conn.execute("SELECT name FROM domains ORDER BY position")]
+
+    # --- Writes ---
+
+    def insert_many(self, domain, bullet_type, texts):
+        """Append bullets to a domain/type in one transaction. Returns the number inserted."""
+        if bullet_type not in BULLET_TYPES:
+            raise ValueError(f"Unknown bullet type: {bullet_type}")
+        now = time.time()
+        with self.transaction():
+            self.add_domain(domain)
+            start = self.conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM bullets WHERE domain = ? AND type = ?",
+                (domain, bullet_type)
+            ).fetchone()[0]
+            rows = [
+                (domain, bullet_type, start + i, text, content_hash(text), now)
+                for i, text in enumerate(texts)
+            ]
+            self.conn.executemany(
+                "INSERT INTO bullets (domain, type, position, text, content_hash, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def update_texts(self, updates):
+        """Rewrite the text of existing rows. updates: iterable of (id, new_text)."""
+        now = time.time()
+        rows = [(text, content_hash(text), now, bullet_id) for bullet_id, text in updates]
+        with self.transaction():
+            # Text changed, so any stored quality score is stale
+            self.conn.executemany(
+                "UPDATE bullets SET text = ?, content_hash = ?, updated_at = ?, quality_score = NULL "
+                "WHERE id = ?",
+                rows
+            )
+        return len(rows)
+
+    def set_quality(self, scores):
+        """Store quality scores. scores: iterable of (id, score, {feature: value})."""
+        columns = list(FEATURE_COLUMNS)
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        rows = [
+            (score, *[features.get(c) for c in columns], bullet_id)
+            for bullet_id, score, features in scores
+        ]
+        with self.transaction():
+            self.conn.executemany(
+                f"UPDATE bullets SET quality_score = ?, {assignments} WHERE id = ?", rows
+            )
+        return len(rows)
+
+    def delete_ids(self, ids):
+        """Remove rows by id in one transaction. Returns the number deleted."""
+        ids = list(ids)
+        with self.transaction():
+            self.conn.executemany("DELETE FROM bullets WHERE id = ?", [(i,) for i in ids])
+        return len(ids)
+
+    def replace_domain(self, domain, real, synthetic):
+        """Swap a domain's contents for new real/synthetic lists atomically."""
+        with self.transaction():
+            self.conn.execute("DELETE FROM bullets WHERE domain = ?", (domain,))
+            self.insert_many(domain, "real", real)
+            self.insert_many(domain, "synthetic", synthetic)
+
+    # --- Reads ---
+
+    def iter_bullets(self, domain=None, bullet_type=None, batch_size=500):
+        """Stream rows in corpus order (domain, real before synthetic, position)."""
+        query = (
+            "SELECT b.* FROM bullets b JOIN domains d ON d.name = b.domain WHERE 1 = 1"
+        )
+        params = []
+        if domain is not None:
+            query += " AND b.domain = ?"
+            params.append(domain)
+        if bullet_type is not None:
+            query += " AND b.type = ?"
+            params.append(bullet_type)
+        query += " ORDER BY d.position, b.type, b.position"
+
+        cursor = self.conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    def texts(self, domain, bullet_type):
+        return [r["text"] for r in self.iter_bullets(domain, bullet_type)]
+
+    def count(self, domain=None, bullet_type=None):
+        query = "SELECT COUNT(*) FROM bullets WHERE 1 = 1"
+        params = []
+        if domain is not None:
+            query += " AND domain = ?"
+            params.append(domain)
+        if bullet_type is not None:
+            query += " AND type = ?"
+            params.append(bullet_type)
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def has_hash(self, text):
+        row = self.conn.execute(
+            "SELECT 1 FROM bullets WHERE content_hash = ? LIMIT 1", (content_hash(text),)
+        ).fetchone()
+        return row is not None
+
+    # --- JSON bridge ---
+
+    def import_json(self, path=CORPUS_JSON):
+        """Load an augmented_resumes.json-shaped file, replacing the current contents."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with self.transaction():
+            self.conn.execute("DELETE FROM bullets")
+            self.conn.execute("DELETE FROM domains")
+            for domain, content in data.items():
+                self.add_domain(domain)
+                self.insert_many(domain, "real", content.get("real", []))
+                self.insert_many(domain, "synthetic", content.get("synthetic", []))
+        return self.count()
+
+    def to_dict(self):
+        data = {d: {"real": [], "synthetic": []} for d in self.domains()}
+        for row in self.iter_bullets():
+            data[row["domain"]][row["type"]].append(row["text"])
+        return data
+
+    def export_json(self, path=CORPUS_JSON):
+        """Write the corpus in the legacy JSON shape (atomic: temp file + rename)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def open_corpus(path=CORPUS_DB, json_path=CORPUS_JSON):
+    """Open the store, seeding it from the JSON corpus on first use."""
+    is_new = not os.path.exists(path)
+    store = CorpusStore(path)
+    if is_new and os.path.exists(json_path):
+        count = store.import_json(json_path)
+        print(f"Imported {count} bullets from {json_path} into {path}")
+    return store
+
+
+def print_stats(store):
+    print(f"{'DOMAIN':<20} | {'REAL':<6} | {'SYNTHETIC':<10}")
+    print("-" * 42)
+    for domain in store.domains():
+        print(f"{domain:<20} | {store.count(domain, 'real'):<6} | {store.count(domain, 'synthetic'):<10}")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    json_path = sys.argv[2] if len(sys.argv) > 2 else CORPUS_JSON
+
+    with CorpusStore(CORPUS_DB) as store:
+        if command == "import":
+            count = store.import_json(json_path)
+            print(f"Imported {count} bullets from {json_path}")
+        elif command == "export":
+            store.export_json(json_path)
+            print(f"Exported {store.count()} bullets to {json_path}")
+        elif command == "stats":
+            print_stats(store)
+        else:
+            print(f"Unknown command: {command} (use import, export or stats)")
+
+
+if __name__ == "__main__":
+    main()
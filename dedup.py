@@ -0,0 +1,211 @@
+import re
+import sys
+import zlib
+import random
+from corpus_store import open_corpus
+
+# Near-duplicate detection for the bullet corpus.
+# Bullets are turned into character shingles, summarised with MinHash and
+# bucketed with LSH banding, so each insert only compares against the few
+# bullets that share a band instead of the whole corpus.
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_text(text):
+    # Lowercase, drop LaTeX escapes and collapse digits so that jittered
+    # variants ("70%" vs "72\%") shingle identically.
+    text = text.lower().replace("\\", "")
+    text = re.sub(r'\d+', '0', text)
+    text = re.sub(r'[^a-z0 ]+', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    norm = normalize_text(text)
+    if len(norm) <= size:
+        return {norm}
+    return {norm[i:i + size] for i in range(len(norm) - size + 1)}
+
+
+def jaccard(a, b):
+    """Exact Jaccard similarity of two bullets' shingle sets."""
+    sa, sb = shingles(a), shingles(b)
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def _optimal_bands(threshold, num_perm):
+    # Pick (bands, rows) whose S-curve midpoint (1/b)^(1/r) sits closest to
+    # the threshold, leaning towards more bands (fewer false negatives).
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if bands == 0:
+            break
+        midpoint = (1.0 / bands) ** (1.0 / rows)
+        err = abs(midpoint - threshold)
+        if best is None or err < best[0]:
+            best = (err, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashLSH:
+    """
+    Incremental MinHash LSH index.
+    add() inserts a bullet and returns the key of the bullet it duplicates
+    (the cluster representative) or None if it is new.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+        self.clusters = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text)]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, sig):
+        for i in range(self.bands):
+            yield i, sig[i * self.rows:(i + 1) * self.rows]
+
+    def _similarity(self, sig_a, sig_b):
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / self.num_perm
+
+    def query(self, text, sig=None):
+        """Keys of indexed bullets whose estimated Jaccard >= threshold, best first."""
+        sig = sig or self.signature(text)
+        candidates = set()
+        for i, band in self._band_keys(sig):
+            candidates.update(self._buckets[i].get(band, ()))
+
+        scored = []
+        for key in candidates:
+            sim = self._similarity(sig, self._signatures[key])
+            if sim >= self.threshold:
+                scored.append((sim, key))
+        scored.sort(key=lambda x: (-x[0], str(x[1])))
+        return [key for _, key in scored]
+
+    def insert(self, key, text, sig=None):
+        sig = sig or self.signature(text)
+        self._signatures[key] = sig
+        for i, band in self._band_keys(sig):
+            self._buckets[i].setdefault(band, []).append(key)
+        self.clusters.setdefault(key, [])
+
+    def add(self, key, text):
+        sig = self.signature(text)
+        matches = self.query(text, sig)
+        if matches:
+            rep = matches[0]
+            self.clusters[rep].append(key)
+            return rep
+        self.insert(key, text, sig)
+        return None
+
+
+def dedupe_bullets(bullets, lsh=None, threshold=DEFAULT_THRESHOLD, key_prefix=""):
+    """
+    Drop near-duplicates from a list of bullets, keeping the first occurrence.
+    Pass an existing index to also reject bullets already seen elsewhere
+    (use a distinct key_prefix per call so keys stay unique).
+    Returns (kept, removed).
+    """
+    lsh = lsh if lsh is not None else MinHashLSH(threshold=threshold)
+    kept, removed = [], []
+    for i, text in enumerate(bullets):
+        if lsh.add(f"{key_prefix}{i}", text) is None:
+            kept.append(text)
+        else:
+            removed.append(text)
+    return kept, removed
+
+
+def dedupe_corpus(data, threshold=DEFAULT_THRESHOLD):
+    """
+    Dedupe an augmented_resumes.json-shaped dict per domain.
+    Real bullets are indexed first so synthetic variants of them are the ones dropped.
+    Returns (new_data, report) where report maps domain -> removed counts.
+    """
+    new_data = {}
+    report = {}
+    for domain, content in data.items():
+        lsh = MinHashLSH(threshold=threshold)
+        real, real_removed = dedupe_bullets(content.get("real", []), lsh, key_prefix="real_")
+        synth, synth_removed = dedupe_bullets(content.get("synthetic", []), lsh, key_prefix="synthetic_")
+        new_data[domain] = {**content, "real": real, "synthetic": synth}
+        report[domain] = {"real": len(real_removed), "synthetic": len(synth_removed)}
+    return new_data, report
+
+
+def dedupe_store(store, threshold=DEFAULT_THRESHOLD):
+    """
+    Near-duplicate rows of a CorpusStore, per domain. Rows stream real-first,
+    so synthetic variants of real bullets are the ones flagged.
+    Returns (ids_to_remove, report) where report maps domain -> removed counts.
+    """
+    remove, report = [], {}
+    for domain in store.domains():
+        lsh = MinHashLSH(threshold=threshold)
+        report[domain] = {"real": 0, "synthetic": 0}
+        for row in store.iter_bullets(domain):
+            if lsh.add(row["id"], row["text"]) is not None:
+                remove.append(row["id"])
+                report[domain][row["type"]] += 1
+    return remove, report
+
+
+def print_report(report):
+    print(f"{'DOMAIN':<20} | {'REAL':<6} | {'SYNTHETIC':<10}")
+    print("-" * 42)
+    for domain, counts in report.items():
+        print(f"{domain:<20} | {counts['real']:<6} | {counts['synthetic']:<10}")
+    total = sum(c["real"] + c["synthetic"] for c in report.values())
+    print(f"\nRemoved {total} near-duplicate bullets.")
+
+
+def main():
+    apply = "--apply" in sys.argv
+    threshold = DEFAULT_THRESHOLD
+    if "--threshold" in sys.argv:
+        threshold = float(sys.argv[sys.argv.index("--threshold") + 1])
+
+    # The corpus of record is the store (corpus_store.py), not the JSON export
+    store = open_corpus()
+    remove, report = dedupe_store(store, threshold=threshold)
+    print(f"Near-duplicate report (Jaccard >= {threshold}):")
+    print_report(report)
+
+    if apply:
+        store.delete_ids(remove)
+        print(f"Removed {len(remove)} rows from {store.path}")
+    else:
+        print("Dry run - pass --apply to delete them from the corpus.")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import re
+import sys
+import json
+
+# Cheap local resume -> domain classifier.
+# Scores each corpus domain by keyword hits in the parsed job titles (weighted
+# higher) and skills, so retrieval can search only the matching partition(s).
+# Domains match the corpus / Pinecone namespaces (see script.DOMAINS).
+
+DOMAIN_KEYWORDS = {
+    "IT": {
+        "titles": ["software", "developer", "frontend", "backend", "full stack", "fullstack", "devops",
+                   "sre", "data scientist", "data engineer", "machine learning", "ml engineer", "ai engineer",
+                   "cloud", "security", "system administrator", "sysadmin", "programmer", "web"],
+        "skills": ["python", "java", "javascript", "typescript", "react", "node", "sql", "aws", "gcp", "azure",
+                   "docker", "kubernetes", "terraform", "linux", "git", "django", "flask", "pytorch",
+                   "tensorflow", "scikit-learn", "pandas", "c++", "golang", "rust", "jenkins", "api"],
+    },
+    "Product": {
+        "titles": ["product manager", "product owner", "program manager", "product analyst", "associate product",
+                   "apm", "product lead", "head of product", "business analyst", "strategy"],
+        "skills": ["jira", "confluence", "roadmap", "a/b testing", "product strategy", "user research",
+                   "figma", "amplitude", "mixpanel", "agile", "scrum", "go-to-market", "gtm", "prd",
+                   "stakeholder management", "okr", "analytics"],
+    },
+    "Marketing": {
+        "titles": ["marketing", "brand", "growth", "seo", "content", "social media", "communications",
+                   "digital marketing", "campaign", "public relations"],
+        "skills": ["seo", "sem", "google analytics", "google ads", "hubspot", "salesforce", "copywriting",
+                   "content strategy", "social media", "email marketing", "canva", "branding", "meta ads"],
+    },
+    "Core Electronics": {
+        "titles": ["hardware", "electronics", "embedded", "vlsi", "rtl", "fpga", "asic", "pcb",
+                   "firmware", "signal processing", "electrical"],
+        "skills": ["verilog", "vhdl", "systemverilog", "fpga", "matlab", "cadence", "altium", "spice",
+                   "microcontroller", "arduino", "raspberry pi", "rtos", "embedded c", "arm", "pcb design"],
+    },
+    "Mechanical": {
+        "titles": ["mechanical", "design engineer", "mechatronics", "manufacturing", "automotive",
+                   "aerospace", "thermal", "production engineer", "quality engineer"],
+        "skills": ["solidworks", "autocad", "catia", "ansys", "creo", "fusion 360", "cad", "cam", "fea",
+                   "cfd", "gd&t", "six sigma", "lean manufacturing", "3d printing"],
+    },
+}
+
+TITLE_WEIGHT = 3.0
+SKILL_WEIGHT = 1.0
+DEFAULT_DOMAIN = "IT"
+
+
+def _titles(resume):
+    titles = [e.get("role", "") for e in resume.get("experience", [])]
+    titles += [r.get("title", "") for r in resume.get("responsibilities", [])]
+    return [t for t in titles if t]
+
+
+def _skills(resume):
+    skills = list(resume.get("skills", []))
+    for proj in resume.get("projects", []):
+        skills.extend(proj.get("technologies", []))
+    return [s for s in skills if isinstance(s, str) and s]
+
+
+def _hits(text, keywords):
+    text = text.lower()
+    return sum(1 for kw in keywords if re.search(rf'(?<![a-z]){re.escape(kw)}(?![a-z])', text))
+
+
+def domain_scores(resume):
+    """Raw keyword scores per domain."""
+    titles = " | ".join(_titles(resume))
+    skills = " | ".join(_skills(resume))
+    return {
+        domain: TITLE_WEIGHT * _hits(titles, kw["titles"]) + SKILL_WEIGHT * _hits(skills, kw["skills"])
+        for domain, kw in DOMAIN_KEYWORDS.items()
+    }
+
+
+def domain_weights(resume, min_share=0.2):
+    """
+    Normalized domain mix for retrieval, e.g. {"IT": 0.7, "Product": 0.3}.
+    Domains below min_share are dropped; falls back to DEFAULT_DOMAIN when nothing matches.
+    """
+    scores = domain_scores(resume)
+    total = sum(scores.values())
+    if not total:
+        return {DEFAULT_DOMAIN: 1.0}
+
+    weights = {d: s / total for d, s in scores.items() if s / total >= min_share}
+    norm = sum(weights.values())
+    return {d: round(w / norm, 3) for d, w in sorted(weights.items(), key=lambda x: -x[1])}
+
+
+def detect_domain(resume):
+    """Single most likely domain for a parsed resume."""
+    return next(iter(domain_weights(resume)))
+
+
+if __name__ == "__main__":
+    # Usage: python domain_classifier.py resume.json
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    print(json.dumps({"scores": domain_scores(data), "weights": domain_weights(data)}))
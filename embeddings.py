@@ -0,0 +1,163 @@
+import os
+import re
+import sys
+import zlib
+import threading
+
+# Pluggable embedding backends.
+# Every script used to call genai.embed_content directly; they now go through
+# get_provider(), selected per deployment with EMBEDDING_BACKEND:
+#   gemini  - text-embedding-004 over the network (default)
+#   hashing - local feature-hashing vectorizer, no model file, no network
+#   onnx    - local sentence model from EMBEDDING_MODEL_DIR (model.onnx + tokenizer.json)
+# Providers batch their inputs and are cached per process; SDKs and NumPy load on first use.
+# Vectors from different backends are not comparable: an index must be queried
+# with the backend that built it (vector_index.py records it).
+
+DEFAULT_BACKEND = "gemini"
+EMBEDDING_DIM = 768
+
+
+class EmbeddingProvider:
+    name = "base"
+    dimension = EMBEDDING_DIM
+    batch_size = 100
+
+    def _embed_batch(self, texts, task_type, title):
+        raise NotImplementedError
+
+    def embed(self, texts, task_type="retrieval_document", title=None):
+        """Embed a list of texts, batching calls. Returns a list of float vectors."""
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.batch_size], task_type, title))
+        return vectors
+
+    def embed_one(self, text, task_type="retrieval_query", title=None):
+        return self.embed([text], task_type, title)[0]
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = "gemini"
+    model = "models/text-embedding-004"
+
+    def __init__(self):
+        import google.generativeai as genai
+        base_url = os.getenv("GEMINI_BASE_URL")
+        if base_url:
+            # REST transport against a local endpoint (mock_services.py)
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest", client_options={"api_endpoint": base_url})
+        else:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self._genai = genai
+
+    def _embed_batch(self, texts, task_type, title):
+        from llm_scheduler import llm_slot  # shares the Gemini quota with ingest (batch) jobs
+        kwargs = {"title": title} if title and task_type == "retrieval_document" else {}
+        with llm_slot("embed", "gemini"):
+            result = self._genai.embed_content(
+                model=self.model,
+                content=list(texts),
+                task_type=task_type,
+                **kwargs
+            )
+        return result['embedding']
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Signed feature hashing of word unigrams/bigrams and character trigrams.
+    No model, no network, sub-millisecond per bullet; purely lexical similarity.
+    """
+    name = "hashing"
+    batch_size = 1000
+
+    def __init__(self, dimension=EMBEDDING_DIM):
+        self.dimension = dimension
+
+    def _features(self, text):
+        text = re.sub(r'\s+', ' ', text.lower().replace("\\", "")).strip()
+        words = re.findall(r'[a-z0-9][a-z0-9+#.]*', text)
+        feats = [f"w:{w}" for w in words]
+        feats += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        feats += [f"c:{text[i:i + 3]}" for i in range(len(text) - 2)]
+        return feats
+
+    def _embed_batch(self, texts, task_type, title):
+        import numpy as np
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feat in self._features(text):
+                h = zlib.crc32(feat.encode("utf-8"))
+                matrix[row, h % self.dimension] += 1.0 if (h >> 31) & 1 else -1.0
+        # Sublinear tf, then L2 normalize
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.maximum(norms, 1e-12)).tolist()
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """Small sentence-transformer exported to ONNX, mean-pooled, loaded from disk once."""
+    name = "onnx"
+    batch_size = 32
+
+    def __init__(self, model_dir=None):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError("onnx backend needs `pip install onnxruntime tokenizers`")
+
+        model_dir = model_dir or os.getenv("EMBEDDING_MODEL_DIR", "models/embedding")
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_padding()
+        self.tokenizer.enable_truncation(max_length=256)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def _embed_batch(self, texts, task_type, title):
+        import numpy as np
+        encoded = self.tokenizer.encode_batch(list(texts))
+        ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        summed = (hidden * mask[..., None]).sum(axis=1)
+        pooled = summed / np.maximum(mask.sum(axis=1, keepdims=True), 1)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).tolist()
+
+
+PROVIDERS = {
+    "gemini": GeminiEmbeddingProvider,
+    "hashing": HashingEmbeddingProvider,
+    "onnx": OnnxEmbeddingProvider,
+}
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """Cached provider instance (model/client loaded once per process, even with concurrent first callers)."""
+    name = name or os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {name} (use {', '.join(PROVIDERS)})")
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = PROVIDERS[name]()
+        return _providers[name]
+
+
+if __name__ == "__main__":
+    # Usage: python embeddings.py [backend] "some text"
+    backend = sys.argv[1] if len(sys.argv) > 2 else None
+    vector = get_provider(backend).embed_one(sys.argv[-1])
+    print(f"{get_provider(backend).name}: {len(vector)} dims, first 5 = {vector[:5]}")
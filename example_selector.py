@@ -0,0 +1,89 @@
+import sys
+import json
+from functools import lru_cache
+from dedup import normalize_text, shingles
+from metrics import register_lru
+from prompts import estimate_tokens
+
+# Picks the reference examples that go into the RAG rewrite prompt.
+# Candidates arrive as one ranked list per resume bullet (over-fetched). We:
+# 1. De-duplicate them stably (first occurrence wins, normalised text as key).
+# 2. Score relevance with reciprocal-rank fusion across the per-bullet lists.
+# 3. Greedily apply maximal marginal relevance (shingle Jaccard as similarity)
+#    until the token budget or example cap is reached.
+# Same input -> same examples in the same order, so the prompt is cacheable.
+
+EXAMPLE_TOKEN_BUDGET = 350
+MAX_EXAMPLES = 10
+MMR_LAMBDA = 0.7
+RRF_K = 60
+
+
+@lru_cache(maxsize=8192)
+def _signature(text):
+    """(dedupe key, shingle set) - cached, since exemplar texts recur across requests."""
+    return normalize_text(text), frozenset(shingles(text))
+
+
+register_lru("example_signature", _signature)
+
+
+def _similarity(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def select_examples(ranked_lists, budget_tokens=EXAMPLE_TOKEN_BUDGET, max_examples=MAX_EXAMPLES, mmr_lambda=MMR_LAMBDA):
+    """
+    ranked_lists: [[text, ...], ...] best first, one list per query bullet.
+    Returns the selected example texts in selection order.
+    """
+    # 1. Stable de-duplication + 2. RRF relevance
+    candidates = []
+    relevance = {}
+    seen = {}
+    for ranked in ranked_lists:
+        for rank, text in enumerate(ranked):
+            key = _signature(text)[0]
+            if key not in seen:
+                seen[key] = len(candidates)
+                candidates.append(text)
+            idx = seen[key]
+            relevance[idx] = relevance.get(idx, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    if not candidates:
+        return []
+
+    top_relevance = max(relevance.values())
+    rel = [relevance[i] / top_relevance for i in range(len(candidates))]
+    sigs = [_signature(text)[1] for text in candidates]
+    cost = [estimate_tokens(f"- {text}") for text in candidates]  # rendered as a "- " list line
+
+    # 3. Greedy MMR under the token budget
+    selected = []
+    max_sim = [0.0] * len(candidates)
+    remaining = set(range(len(candidates)))
+    used = 0
+    while remaining and len(selected) < max_examples:
+        fitting = [i for i in remaining if used + cost[i] <= budget_tokens]
+        if not fitting:
+            break
+        best = max(fitting, key=lambda i: (mmr_lambda * rel[i] - (1 - mmr_lambda) * max_sim[i], -i))
+        selected.append(best)
+        remaining.discard(best)
+        used += cost[best]
+        for i in remaining:
+            max_sim[i] = max(max_sim[i], _similarity(sigs[best], sigs[i]))
+
+    return [candidates[i] for i in selected]
+
+
+if __name__ == "__main__":
+    # Usage: python example_selector.py < ranked_lists.json   ([[text, ...], ...])
+    lists = json.loads(sys.stdin.read())
+    chosen = select_examples(lists)
+    print(json.dumps({
+        "examples": chosen,
+        "tokens": sum(estimate_tokens(f"- {t}") for t in chosen),
+    }, indent=2))
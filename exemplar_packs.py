@@ -0,0 +1,174 @@
+import os
+import re
+import sys
+import json
+from datetime import datetime
+import numpy as np
+from corpus_store import open_corpus
+from embeddings import get_provider
+
+# Precomputed exemplar packs for the zero-retrieval fast rewrite mode.
+#
+#   python exemplar_packs.py [backend]    # offline: corpus -> EXEMPLAR_PACKS_PATH
+#
+# 1. Embeds each domain's corpus and clusters it with k-means (NumPy).
+# 2. Tags every bullet with an archetype (leadership, optimization, launch, ...)
+#    from its keywords.
+# 3. Keeps, per domain and archetype, the best-quality bullets drawn from
+#    distinct clusters, plus one representative per cluster as "general".
+# At request time match_archetype() tags the user's bullet with the same
+# keywords and fast_examples() reads the pack: no embedding, no index query.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+EXEMPLAR_PACKS_PATH = os.getenv("EXEMPLAR_PACKS_PATH", os.path.join(script_dir, 'exemplar_packs.json'))
+CLUSTERS_PER_DOMAIN = 8
+EXEMPLARS_PER_ARCHETYPE = 3
+KMEANS_ITERATIONS = 25
+GENERAL = "general"
+
+# First matching archetype wins, so more specific ones come first
+ARCHETYPES = {
+    "migration": ["migrat", "moved", "transition", "ported", "upgrad", "moderniz", "legacy", "replatform"],
+    "launch": ["launch", "release", "shipped", "introduc", "rolled out", "go-live", "pilot", "mvp"],
+    "optimization": ["optimiz", "reduc", "improv", "faster", "latency", "cost", "efficien", "tun", "speed"],
+    "automation": ["automat", "pipeline", "script", "ci/cd", "workflow", "scheduled", "chatbot"],
+    "growth": ["grew", "growth", "increas", "revenue", "acquisition", "conversion", "engagement", "sales", "campaign"],
+    "analysis": ["analy", "insight", "dashboard", "report", "research", "model", "forecast", "a/b", "survey"],
+    "leadership": ["led", "lead", "manag", "mentor", "team", "coordinat", "spearhead", "head", "stakeholder"],
+}
+
+_WORD_PATTERN = re.compile(r'[a-z][a-z/\-]*')
+
+
+def match_archetype(text):
+    """Archetype whose keywords start any word of the bullet (earliest-listed wins), else GENERAL."""
+    lowered = text.lower().replace("\\", "")
+    words = _WORD_PATTERN.findall(lowered)
+    for name, stems in ARCHETYPES.items():
+        for stem in stems:
+            if (" " in stem and stem in lowered) or any(w.startswith(stem) for w in words):
+                return name
+    return GENERAL
+
+
+def kmeans(vectors, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Cosine k-means with k-means++ init. Returns (labels, centroids)."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    centroids = [vectors[rng.integers(n)]]
+    for _ in range(1, k):
+        dist = 1.0 - np.max(vectors @ np.array(centroids).T, axis=1)
+        dist = np.maximum(dist, 0.0)
+        probs = dist / dist.sum() if dist.sum() > 0 else None
+        centroids.append(vectors[rng.choice(n, p=probs)])
+    centroids = np.array(centroids)
+
+    labels = np.zeros(n, dtype=np.int64)
+    for iteration in range(iterations):
+        new_labels = np.argmax(vectors @ centroids.T, axis=1)
+        if iteration and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = vectors[labels == c]
+            if len(members):
+                mean = members.mean(axis=0)
+                centroids[c] = mean / max(np.linalg.norm(mean), 1e-12)
+    return labels, centroids
+
+
+def build_domain_pack(rows, provider):
+    texts = [r["text"] for r in rows]
+    quality = np.array([0.5 if r["quality_score"] is None else r["quality_score"] for r in rows], dtype=np.float32)
+    vectors = np.asarray(provider.embed(texts, "retrieval_document", title="Resume Bullet Point"), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    k = min(CLUSTERS_PER_DOMAIN, len(texts))
+    labels, centroids = kmeans(vectors, k)
+    centrality = np.sum(vectors * centroids[labels], axis=1)
+    archetypes = [match_archetype(t) for t in texts]
+
+    # Best first: quality, then closeness to the cluster centre, then corpus order
+    order = sorted(range(len(texts)), key=lambda i: (-quality[i], -centrality[i], i))
+
+    pack = {}
+    for name in list(ARCHETYPES) + [GENERAL]:
+        picked, used_clusters = [], set()
+        for i in order:
+            if len(picked) >= EXEMPLARS_PER_ARCHETYPE:
+                break
+            if archetypes[i] == name and labels[i] not in used_clusters:
+                picked.append(texts[i])
+                used_clusters.add(labels[i])
+        if picked:
+            pack[name] = picked
+
+    # One representative per cluster covers bullets that match no archetype
+    representatives = []
+    for c in range(k):
+        members = [i for i in order if labels[i] == c]
+        if members:
+            representatives.append(texts[members[0]])
+    pack[GENERAL] = list(dict.fromkeys(pack.get(GENERAL, []) + representatives))
+    return pack
+
+
+def build_packs(backend=None, path=EXEMPLAR_PACKS_PATH):
+    provider = get_provider(backend)
+    store = open_corpus()
+    packs = {}
+    for domain in store.domains():
+        rows = list(store.iter_bullets(domain=domain))
+        if not rows:
+            continue
+        packs[domain] = build_domain_pack(rows, provider)
+        sizes = ", ".join(f"{name}={len(texts)}" for name, texts in packs[domain].items())
+        print(f"  {domain}: {len(rows)} bullets -> {sizes}")
+    store.close()
+
+    data = {
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "provider": provider.name,
+        "domains": packs,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"Saved exemplar packs for {len(packs)} domains to {path}")
+
+
+_packs = None
+
+
+def load_packs(path=EXEMPLAR_PACKS_PATH):
+    """Load the packs once per process."""
+    global _packs
+    if _packs is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            _packs = json.load(f)["domains"]
+    return _packs
+
+
+def fast_examples(bullets, domains):
+    """
+    Ranked example lists (one per bullet) from the packs, for example_selector.
+    domains: {domain: weight}; heavier domains contribute first.
+    """
+    packs = load_packs()
+    ordered_domains = [d for d, _ in sorted(domains.items(), key=lambda x: (-x[1], x[0])) if d in packs]
+    if not ordered_domains:
+        ordered_domains = sorted(packs)
+
+    ranked_lists = []
+    for bullet in bullets:
+        archetype = match_archetype(bullet)
+        ranked = []
+        for domain in ordered_domains:
+            ranked.extend(packs[domain].get(archetype) or packs[domain].get(GENERAL, []))
+        ranked_lists.append(ranked)
+    return ranked_lists
+
+
+if __name__ == "__main__":
+    build_packs(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,163 @@
+import copy
+import json
+
+# Minimal RFC 6902 JSON Patch: apply add/remove/replace/move/copy/test
+# operations and compute a patch between two documents. Paths are RFC 6901
+# JSON Pointers ("/experience/0/bullets/2", "~1" for "/", "~0" for "~").
+#
+#   doc = apply_patch(doc, [{"op": "replace", "path": "/profile/summary", "value": "..."}])
+#   ops = make_patch(old, new)
+#
+# make_patch recurses into objects and into equal-length arrays; an array that
+# changed length is replaced whole, which keeps the diff simple and still small
+# at resume granularity (bullet lists).
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+def parse_pointer(path):
+    if not isinstance(path, str):
+        raise JsonPatchError(f"Invalid JSON pointer: {path!r}")
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {path!r}")
+    return [p.replace("~1", "/").replace("~0", "~") for p in path[1:].split("/")]
+
+
+def format_pointer(parts):
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in parts)
+
+
+def _index(container, token, allow_end=False):
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _parent(doc, parts):
+    target = doc
+    for token in parts[:-1]:
+        if isinstance(target, list):
+            target = target[_index(target, token)]
+        elif isinstance(target, dict) and token in target:
+            target = target[token]
+        else:
+            raise JsonPatchError(f"Path not found: {format_pointer(parts)}")
+    return target
+
+
+def _get(doc, parts):
+    if not parts:
+        return doc
+    parent, token = _parent(doc, parts), parts[-1]
+    if isinstance(parent, list):
+        return parent[_index(parent, token)]
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    raise JsonPatchError(f"Path not found: {format_pointer(parts)}")
+
+
+def _add(doc, parts, value):
+    if not parts:
+        return value
+    parent, token = _parent(doc, parts), parts[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[token] = value
+    else:
+        raise JsonPatchError(f"Cannot add to {format_pointer(parts)}")
+    return doc
+
+
+def _remove(doc, parts):
+    if not parts:
+        raise JsonPatchError("Cannot remove the document root")
+    parent, token = _parent(doc, parts), parts[-1]
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token))
+    if isinstance(parent, dict) and token in parent:
+        return parent.pop(token)
+    raise JsonPatchError(f"Path not found: {format_pointer(parts)}")
+
+
+def _member(op, name):
+    if name not in op:
+        raise JsonPatchError(f"{op.get('op')!r} operation at {op['path']!r} is missing {name!r}")
+    return op[name]
+
+
+def apply_patch(doc, ops):
+    """Apply `ops` to a copy of `doc`; raises JsonPatchError and leaves `doc` untouched on failure."""
+    if not isinstance(ops, list):
+        raise JsonPatchError("Patch must be a list of operations")
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        if not isinstance(op, dict) or "path" not in op:
+            raise JsonPatchError(f"Invalid operation: {op!r}")
+        kind, parts = op.get("op"), parse_pointer(op["path"])
+        if kind == "add":
+            doc = _add(doc, parts, copy.deepcopy(_member(op, "value")))
+        elif kind == "remove":
+            _remove(doc, parts)
+        elif kind == "replace":
+            value = copy.deepcopy(_member(op, "value"))
+            _get(doc, parts)  # must exist
+            if not parts:
+                doc = value
+            else:
+                _remove(doc, parts)
+                doc = _add(doc, parts, value)
+        elif kind in ("move", "copy"):
+            source = parse_pointer(_member(op, "from"))
+            if kind == "move" and parts[:len(source)] == source and parts != source:
+                raise JsonPatchError("Cannot move a value into one of its children")
+            value = _remove(doc, source) if kind == "move" else copy.deepcopy(_get(doc, source))
+            doc = _add(doc, parts, value)
+        elif kind == "test":
+            if _get(doc, parts) != _member(op, "value"):
+                raise JsonPatchError(f"Test failed at {op['path']}")
+        else:
+            raise JsonPatchError(f"Unknown operation: {kind!r}")
+    return doc
+
+
+def make_patch(old, new, path=()):
+    """Operations that turn `old` into `new`."""
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": format_pointer(path + (key,))})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": format_pointer(path + (key,)), "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, path + (key,)))
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            ops.extend(make_patch(a, b, path + (i,)))
+        return ops
+    return [{"op": "replace", "path": format_pointer(path), "value": new}]
+
+
+if __name__ == "__main__":
+    # Usage: python json_patch.py old.json new.json  -> patch on stdout
+    import sys
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    print(json.dumps(make_patch(old, new), indent=2))
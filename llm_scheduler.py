@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from metrics import inc, observe
+
+# Cross-process priority scheduler for LLM and embedding calls.
+# augment.py generation, vector_db.py ingest and bulk re-analysis share the
+# Groq/Gemini quotas with live editor requests. Every call now takes a slot:
+#
+#   with llm_slot("analyze", provider="groq"):
+#       client.chat.completions.create(...)
+#
+# (instrumented_completion and the Gemini embedding provider already do.)
+#
+# Classes: "interactive" (parse, analyze, rewrite, ...) and "batch" (augment;
+# vector_db.py / vector_index.py embed set LLM_PRIORITY=batch themselves).
+# LLM_PRIORITY=batch puts a whole process in the batch class, e.g.
+#   LLM_PRIORITY=batch python analyzer.py - < resume.json   # bulk re-analysis
+#
+# Admission, per provider:
+#   - interactive: FIFO among interactive, up to INTERACTIVE_CONCURRENCY in flight
+#   - batch: up to BATCH_CONCURRENCY in flight and BATCH_SHARE of the provider's
+#     requests/minute (LLM_RPM_<PROVIDER>, 0 = no limit), and deferred while any
+#     interactive call is waiting, while recent interactive queue wait is above
+#     INTERACTIVE_WAIT_TARGET_MS, or for a back-off after a 429.
+# A call already in flight is never interrupted; batch work yields between calls.
+# Interactive callers stop waiting after INTERACTIVE_MAX_WAIT_SECONDS and go
+# ahead anyway, so the scheduler can delay a user but never fail one.
+#
+# Processes coordinate through a small SQLite (WAL) file; tickets of processes
+# that died are reclaimed by pid.
+# Metrics: llm_queue_wait_seconds{class,provider}, llm_queue_depth{class},
+# llm_scheduler_deferred_total{class,reason}, llm_scheduler_timeouts_total.
+#
+#   python llm_scheduler.py [--json]     # live queue depth / in flight / waits per class
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+LLM_SCHEDULER = os.getenv("LLM_SCHEDULER", "1") == "1"
+SCHEDULER_DB = os.getenv("LLM_SCHEDULER_DB", os.path.join(script_dir, ".cache", "llm_scheduler.db"))
+CLASSES = ("interactive", "batch")
+SITE_CLASSES = {"augment": "batch"}
+INTERACTIVE_CONCURRENCY = int(os.getenv("LLM_INTERACTIVE_CONCURRENCY", "16"))
+BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "2"))
+BATCH_SHARE = float(os.getenv("LLM_BATCH_SHARE", "0.25"))
+INTERACTIVE_WAIT_TARGET_MS = float(os.getenv("LLM_INTERACTIVE_WAIT_TARGET_MS", "250"))
+INTERACTIVE_MAX_WAIT_SECONDS = 30.0
+BATCH_MAX_WAIT_SECONDS = 900.0
+RATE_LIMIT_BACKOFF_SECONDS = 30.0
+PRESSURE_WINDOW_SECONDS = 5.0  # short, so batch resumes soon after an interactive burst
+WAITING_EXPIRY_MARGIN_SECONDS = 30.0  # past its class max wait, a waiting ticket is orphaned
+STALE_RUNNING_SECONDS = 600.0
+POLL_SECONDS = {"interactive": 0.02, "batch": 0.25}
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    class TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    site TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    state TEXT NOT NULL CHECK (state IN ('waiting', 'running')),
+    enqueued_at REAL NOT NULL,
+    started_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_queue ON tickets(provider, state, class, id);
+CREATE TABLE IF NOT EXISTS grants (
+    provider TEXT NOT NULL,
+    class TEXT NOT NULL,
+    wait REAL NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_grants_at ON grants(provider, at);
+CREATE TABLE IF NOT EXISTS backoff (
+    provider TEXT PRIMARY KEY,
+    until REAL NOT NULL
+);
+"""
+
+
+def class_for(site):
+    return os.getenv("LLM_PRIORITY") or SITE_CLASSES.get(site, "interactive")
+
+
+def _rpm(provider):
+    return float(os.getenv(f"LLM_RPM_{provider.upper()}", "0"))
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+class Scheduler:
+    def __init__(self, path=SCHEDULER_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._local = threading.local()  # one connection per thread (bullet_rewriter.py batches in a pool)
+        self._last_reap = 0.0
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE: admission decisions are serialized across processes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _reap(self, conn, now):
+        """Drop tickets of dead processes, calls that never released and waits nobody is polling; prune old grants."""
+        if now - self._last_reap < 5:
+            return
+        self._last_reap = now
+        for (pid,) in conn.execute("SELECT DISTINCT pid FROM tickets WHERE pid != ?", (os.getpid(),)).fetchall():
+            if not _alive(pid):
+                conn.execute("DELETE FROM tickets WHERE pid = ?", (pid,))
+        conn.execute("DELETE FROM tickets WHERE state = 'running' AND started_at < ?", (now - STALE_RUNNING_SECONDS,))
+        # A live waiter turns its ticket into 'running' at its max wait; anything older was abandoned
+        # (whatever its pid: a thread of a still-running process may have died mid-wait)
+        for cls, max_wait in (("interactive", INTERACTIVE_MAX_WAIT_SECONDS), ("batch", BATCH_MAX_WAIT_SECONDS)):
+            conn.execute("DELETE FROM tickets WHERE state = 'waiting' AND class = ? AND enqueued_at < ?",
+                         (cls, now - max_wait - WAITING_EXPIRY_MARGIN_SECONDS))
+        conn.execute("DELETE FROM grants WHERE at < ?", (now - 300,))
+
+    def _blocked(self, conn, ticket, cls, provider, now):
+        """None if the ticket may start now, else the reason it has to wait."""
+        limit = INTERACTIVE_CONCURRENCY if cls == "interactive" else BATCH_CONCURRENCY
+        running = conn.execute(
+            "SELECT COUNT(*) FROM tickets WHERE provider = ? AND class = ? AND state = 'running'", (provider, cls)
+        ).fetchone()[0]
+        if running >= limit:
+            return "concurrency"
+        if conn.execute(
+            "SELECT 1 FROM tickets WHERE provider = ? AND class = ? AND state = 'waiting' AND id < ? LIMIT 1",
+            (provider, cls, ticket),
+        ).fetchone():
+            return "queued"
+
+        rpm = _rpm(provider)
+        if rpm:
+            used = conn.execute(
+                "SELECT COUNT(*) FROM grants WHERE provider = ? AND at >= ?" + (" AND class = 'batch'" if cls == "batch" else ""),
+                (provider, now - 60),
+            ).fetchone()[0]
+            if used >= (rpm * BATCH_SHARE if cls == "batch" else rpm):
+                return "quota"
+        if cls == "interactive":
+            return None
+
+        # Batch yields to interactive traffic
+        if conn.execute(
+            "SELECT 1 FROM tickets WHERE provider = ? AND class = 'interactive' AND state = 'waiting' LIMIT 1", (provider,)
+        ).fetchone():
+            return "interactive_waiting"
+        recent_wait = conn.execute(
+            "SELECT AVG(wait) FROM grants WHERE provider = ? AND class = 'interactive' AND at >= ?",
+            (provider, now - PRESSURE_WINDOW_SECONDS),
+        ).fetchone()[0]
+        if recent_wait is not None and recent_wait * 1000 > INTERACTIVE_WAIT_TARGET_MS:
+            return "interactive_latency"
+        backoff = conn.execute("SELECT until FROM backoff WHERE provider = ?", (provider,)).fetchone()
+        if backoff and backoff[0] > now:
+            return "rate_limited"
+        return None
+
+    def acquire(self, site, provider="groq"):
+        """Block until a slot is granted (or the class's max wait has passed); returns the ticket id."""
+        cls = class_for(site)
+        start = time.time()
+        with self._write() as conn:
+            depth = conn.execute(
+                "SELECT COUNT(*) FROM tickets WHERE provider = ? AND class = ? AND state = 'waiting'", (provider, cls)
+            ).fetchone()[0]
+            ticket = conn.execute(
+                "INSERT INTO tickets (class, provider, site, pid, state, enqueued_at) VALUES (?, ?, ?, ?, 'waiting', ?)",
+                (cls, provider, site, os.getpid(), start),
+            ).lastrowid
+        observe("llm_queue_depth", depth, buckets=DEPTH_BUCKETS, **{"class": cls})
+
+        max_wait = INTERACTIVE_MAX_WAIT_SECONDS if cls == "interactive" else BATCH_MAX_WAIT_SECONDS
+        deferred = None
+        try:
+            while True:
+                now = time.time()
+                with self._write() as conn:
+                    self._reap(conn, now)
+                    reason = self._blocked(conn, ticket, cls, provider, now)
+                    timed_out = reason is not None and now - start > max_wait
+                    if reason is None or timed_out:
+                        conn.execute("UPDATE tickets SET state = 'running', started_at = ? WHERE id = ?", (now, ticket))
+                        conn.execute("INSERT INTO grants (provider, class, wait, at) VALUES (?, ?, ?, ?)",
+                                     (provider, cls, now - start, now))
+                        break
+                if deferred is None and reason not in ("concurrency", "queued"):
+                    deferred = reason
+                    inc("llm_scheduler_deferred_total", **{"class": cls, "reason": reason})
+                time.sleep(POLL_SECONDS[cls] * (0.5 + random.random()))
+        except BaseException:
+            # A waiting ticket left behind would hold up every later ticket of its class
+            try:
+                self.release(ticket)
+            except sqlite3.Error:
+                pass
+            raise
+
+        if timed_out:
+            inc("llm_scheduler_timeouts_total", **{"class": cls})
+            print(f"LLM scheduler: {cls} {site} waited {now - start:.1f}s ({reason}) - proceeding", file=sys.stderr)
+        observe("llm_queue_wait_seconds", now - start, **{"class": cls, "provider": provider})
+        return ticket
+
+    def release(self, ticket):
+        with self._write() as conn:
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket,))
+
+    def rate_limited(self, provider, seconds=RATE_LIMIT_BACKOFF_SECONDS):
+        """A 429 came back: hold batch work on this provider for a while."""
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO backoff (provider, until) VALUES (?, ?)", (provider, time.time() + seconds))
+
+    def status(self):
+        """Per provider/class: waiting, running, grants in the last minute, average wait over the pressure window."""
+        now = time.time()
+        out = {}
+        rows = self.conn.execute(
+            "SELECT provider, class, SUM(state = 'waiting'), SUM(state = 'running'), MIN(CASE WHEN state = 'waiting' THEN enqueued_at END) "
+            "FROM tickets GROUP BY provider, class"
+        ).fetchall()
+        for provider, cls, waiting, running, oldest in rows:
+            out.setdefault(provider, {})[cls] = {
+                "waiting": waiting, "running": running,
+                "oldest_wait_seconds": round(now - oldest, 3) if oldest else 0.0,
+            }
+        for provider, cls, count, avg_wait in self.conn.execute(
+            "SELECT provider, class, SUM(at >= ?), AVG(CASE WHEN at >= ? THEN wait END) FROM grants GROUP BY provider, class",
+            (now - 60, now - PRESSURE_WINDOW_SECONDS),
+        ).fetchall():
+            entry = out.setdefault(provider, {}).setdefault(cls, {"waiting": 0, "running": 0, "oldest_wait_seconds": 0.0})
+            entry["grants_last_minute"] = count
+            entry["avg_wait_ms"] = round((avg_wait or 0) * 1000, 1)
+        for provider, until in self.conn.execute("SELECT provider, until FROM backoff WHERE until > ?", (now,)).fetchall():
+            out.setdefault(provider, {})["backoff_seconds"] = round(until - now, 1)
+        return out
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+
+@contextmanager
+def llm_slot(site, provider="groq"):
+    """Hold a scheduler slot for one call (no-op with LLM_SCHEDULER=0, or if the scheduler DB is unusable)."""
+    ticket, scheduler = None, None
+    if LLM_SCHEDULER:
+        try:
+            scheduler = get_scheduler()
+            ticket = scheduler.acquire(site, provider)
+        except sqlite3.Error as e:
+            print(f"LLM scheduler unavailable ({e}) - calling unscheduled", file=sys.stderr)
+    try:
+        yield
+    finally:
+        if ticket is not None:
+            try:
+                scheduler.release(ticket)
+            except sqlite3.Error as e:
+                print(f"LLM scheduler release failed: {e}", file=sys.stderr)
+
+
+def report_rate_limited(provider):
+    if LLM_SCHEDULER:
+        try:
+            get_scheduler().rate_limited(provider)
+        except sqlite3.Error:
+            pass
+
+
+def main():
+    status = Scheduler().status()
+    if "--json" in sys.argv:
+        print(json.dumps(status, indent=2))
+        return
+    print(f"{'PROVIDER':<8} | {'CLASS':<11} | {'WAITING':<7} | {'RUNNING':<7} | {'OLDEST s':<8} | {'GRANTS/min':<10} | AVG WAIT ms")
+    print("-" * 82)
+    for provider, classes in sorted(status.items()):
+        for cls in CLASSES:
+            s = classes.get(cls)
+            if s:
+                print(f"{provider:<8} | {cls:<11} | {s['waiting']:<7} | {s['running']:<7} | {s['oldest_wait_seconds']:<8} | "
+                      f"{s.get('grants_last_minute', 0):<10} | {s.get('avg_wait_ms', 0.0)}")
+        if "backoff_seconds" in classes:
+            print(f"{provider:<8} | batch held for {classes['backoff_seconds']}s after a 429")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import os
+import sys
+import json
+import time
+import random
+import threading
+import subprocess
+from datetime import datetime
+from dotenv import load_dotenv
+
+# End-to-end load test: simulated users run parse -> analyze -> rewrite.
+#
+#   python load_test.py [--rates 0.5,1,2,4] [--step-seconds 30] [--think 2]
+#                       [--pdf test_minimal.pdf] [--resume temp_test6.json]
+#                       [--spawn] [--max-users 200]
+#
+# 1. Open-loop arrivals: for each rate step, users arrive as a Poisson process
+#    at that many users/second, so a slow server does not slow the arrivals.
+# 2. Each user runs parser.parse_resume, waits an exponential think time,
+#    runs analyzer.analyze_resume, waits again, runs rewriter_rag.rewrite_with_rag.
+#    --spawn runs each stage as a fresh `python <script>` process instead, as the
+#    Next.js routes do. --resume feeds a fixed resume JSON to analyze/rewrite
+#    (useful when the parse reply is a stub, e.g. with mock_services.py).
+# 3. A sampler records CPU %, RSS and open file descriptors every SAMPLE_SECONDS.
+# 4. Per step: throughput, per-stage p50/p95/p99, error rate and resource peaks.
+#    Throughput counts sessions finishing inside the step window. Saturation = first
+#    step where under SATURATION_RATIO of its arrivals complete, or whose service-time
+#    p95 exceeds P95_BLOWUP x the first step's (after one warm-up session).
+#
+# Against stand-ins: start `python mock_services.py --seed-corpus` and export the
+# variables it prints. Against real backends: just run it (it costs API calls).
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(script_dir, "web", ".env"))
+load_dotenv(dotenv_path=os.path.join(script_dir, ".env"))
+
+STAGES = ("parse", "analyze", "rewrite")
+SAMPLE_SECONDS = 0.5
+SATURATION_RATIO = 0.9
+P95_BLOWUP = 2.0
+DRAIN_SECONDS = 120
+OUTPUT_DIR = "bench_results"
+
+
+def _arg(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[idx], 1)
+
+
+# --- Stage runners ---
+
+def _is_error(result):
+    return not isinstance(result, dict) or "error" in result
+
+
+class InProcessRunner:
+    """Calls the pipeline functions directly (one warm process, shared clients)."""
+
+    def __init__(self):
+        from parser import parse_resume
+        from analyzer import analyze_resume
+        from rewriter_rag import rewrite_with_rag
+        self.parse_resume = parse_resume
+        self.analyze_resume = analyze_resume
+        self.rewrite_with_rag = rewrite_with_rag
+
+    def parse(self, pdf_path):
+        return self.parse_resume(pdf_path)
+
+    def analyze(self, resume):
+        return self.analyze_resume(json.dumps(resume))
+
+    def rewrite(self, resume):
+        return self.rewrite_with_rag(json.dumps(resume))
+
+
+class SpawnRunner:
+    """One Python process per stage, like the web routes."""
+
+    def _run(self, args, stdin=None):
+        proc = subprocess.run(
+            [sys.executable] + args, input=stdin, capture_output=True, text=True, cwd=script_dir,
+        )
+        try:
+            return json.loads(proc.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            return {"error": f"exit {proc.returncode}: {proc.stderr.strip()[-200:]}"}
+
+    def parse(self, pdf_path):
+        return self._run(["parser.py", os.path.abspath(pdf_path)])
+
+    def analyze(self, resume):
+        return self._run(["analyzer.py", json.dumps(resume)])
+
+    def rewrite(self, resume):
+        return self._run(["rewriter_rag.py"], stdin=json.dumps(resume))
+
+
+# --- Resource sampling ---
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, Linux KiB
+
+
+def _open_fds():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path))
+    return None
+
+
+def _cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class ResourceSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.samples = []   # (t, cpu_percent, rss_mb, fds)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_wall, last_cpu = time.monotonic(), _cpu_seconds()
+        while not self._stop_event.wait(SAMPLE_SECONDS):
+            wall, cpu = time.monotonic(), _cpu_seconds()
+            cpu_percent = 100.0 * (cpu - last_cpu) / max(wall - last_wall, 1e-9)
+            self.samples.append((wall, round(cpu_percent, 1), round(_rss_mb(), 1), _open_fds()))
+            last_wall, last_cpu = wall, cpu
+
+    def stop(self):
+        self._stop_event.set()
+
+    def window(self, start, end):
+        rows = [s for s in self.samples if start <= s[0] <= end]
+        if not rows:
+            return {}
+        fds = [s[3] for s in rows if s[3] is not None]
+        return {
+            "cpu_percent_mean": round(sum(s[1] for s in rows) / len(rows), 1),
+            "cpu_percent_peak": max(s[1] for s in rows),
+            "rss_mb_peak": max(s[2] for s in rows),
+            "open_fds_peak": max(fds) if fds else None,
+        }
+
+
+# --- Users ---
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = []  # {"step", "start", "end", "stages": {stage: (ms, ok)}, "ok"}
+
+    def add(self, session):
+        with self.lock:
+            self.sessions.append(session)
+
+
+def simulate_user(runner, pdf_path, fixture, think_mean, step, results, rng):
+    session = {"step": step, "start": time.monotonic(), "stages": {}, "ok": True}
+    resume = None
+    for stage in STAGES:
+        start = time.perf_counter()
+        try:
+            if stage == "parse":
+                result = runner.parse(pdf_path)
+                resume = fixture or result
+            elif stage == "analyze":
+                result = runner.analyze(resume)
+            else:
+                result = runner.rewrite(resume)
+            ok = not _is_error(result)
+        except Exception:
+            ok = False
+        session["stages"][stage] = ((time.perf_counter() - start) * 1000, ok)
+        if not ok:
+            session["ok"] = False
+            break
+        if stage != STAGES[-1] and think_mean > 0:
+            time.sleep(rng.expovariate(1.0 / think_mean))
+    session["end"] = time.monotonic()
+    results.add(session)
+
+
+def summarize_step(step, rate, sessions, window, resources):
+    start, end = window
+    finished = [s for s in sessions if s["step"] == step]
+    completed = [s for s in finished if s["ok"]]
+    in_window = [s for s in sessions if s["ok"] and start <= s["end"] <= end]
+    stages = {}
+    for stage in STAGES:
+        times = [s["stages"][stage][0] for s in finished if stage in s["stages"]]
+        failures = sum(1 for s in finished if stage in s["stages"] and not s["stages"][stage][1])
+        stages[stage] = {
+            "count": len(times),
+            "p50_ms": percentile(times, 50),
+            "p95_ms": percentile(times, 95),
+            "p99_ms": percentile(times, 99),
+            "error_rate": round(failures / len(times), 3) if times else None,
+        }
+    # Service time only (think time excluded) so steps are comparable
+    service_ms = [sum(v[0] for v in s["stages"].values()) for s in completed]
+    return {
+        "offered_rate": rate,
+        "arrival_rate": round(len(finished) / (end - start), 3),
+        "sessions": len(finished),
+        "completed": len(completed),
+        "throughput_per_s": round(len(in_window) / (end - start), 3),
+        "error_rate": round(1 - len(completed) / len(finished), 3) if finished else None,
+        "service_p50_ms": percentile(service_ms, 50),
+        "service_p95_ms": percentile(service_ms, 95),
+        "stages": stages,
+        "resources": resources,
+    }
+
+
+def find_saturation(steps):
+    baseline_p95 = next((s["service_p95_ms"] for s in steps if s["service_p95_ms"]), None)
+    for s in steps:
+        offered = s["offered_rate"]
+        if s["sessions"] and s["completed"] / s["sessions"] < SATURATION_RATIO:
+            return {"rate": offered, "reason": "errors/timeouts"}
+        if baseline_p95 and s["service_p95_ms"] and s["service_p95_ms"] > P95_BLOWUP * baseline_p95:
+            return {"rate": offered, "reason": f"p95 above {P95_BLOWUP}x the first step"}
+    return None
+
+
+def main():
+    rates = [float(r) for r in _arg("--rates", "0.5,1,2,4").split(",")]
+    step_seconds = float(_arg("--step-seconds", 30))
+    think_mean = float(_arg("--think", 2))
+    max_users = int(_arg("--max-users", 200))
+    pdf_path = _arg("--pdf", os.path.join(script_dir, "test_minimal.pdf"))
+    fixture = None
+    if "--resume" in sys.argv:
+        with open(_arg("--resume", None), 'r', encoding='utf-8') as f:
+            fixture = json.load(f)
+    spawn = "--spawn" in sys.argv
+
+    runner = SpawnRunner() if spawn else InProcessRunner()
+    results = Results()
+    sampler = ResourceSampler()
+    sampler.start()
+    rng = random.Random(int(_arg("--seed", 0)))
+
+    print(f"Load test: rates={rates}/s, {step_seconds}s per step, think~{think_mean}s, "
+          f"{'spawned processes' if spawn else 'in-process'}")
+    # Warm-up session (imports, clients, indexes) so the first step is not the cold start
+    simulate_user(runner, pdf_path, fixture, 0, -1, Results(), random.Random(0))
+    threads, windows = [], []
+    for step, rate in enumerate(rates):
+        # 1. Poisson arrivals for this step
+        step_start = time.monotonic()
+        next_arrival = step_start
+        while True:
+            next_arrival += rng.expovariate(rate)
+            if next_arrival - step_start > step_seconds:
+                break
+            time.sleep(max(0.0, next_arrival - time.monotonic()))
+            active = sum(1 for t in threads if t.is_alive())
+            if active >= max_users:
+                results.add({"step": step, "start": time.monotonic(), "end": time.monotonic(),
+                             "stages": {}, "ok": False})  # rejected: client-side cap
+                continue
+            t = threading.Thread(
+                target=simulate_user,
+                args=(runner, pdf_path, fixture, think_mean, step, results, random.Random(rng.random())),
+                daemon=True,
+            )
+            t.start()
+            threads.append(t)
+        time.sleep(max(0.0, step_start + step_seconds - time.monotonic()))
+        windows.append((step_start, time.monotonic()))
+        print(f"  step {step}: {rate}/s offered, {sum(1 for t in threads if t.is_alive())} users active")
+
+    # 2. Drain in-flight users (bounded)
+    drain_deadline = time.monotonic() + DRAIN_SECONDS
+    for t in threads:
+        t.join(timeout=max(0.0, drain_deadline - time.monotonic()))
+    sampler.stop()
+
+    # 3. Summaries (latencies/errors by arrival step; throughput and resources by window)
+    steps = []
+    for step, rate in enumerate(rates):
+        start, end = windows[step]
+        steps.append(summarize_step(step, rate, results.sessions, (start, end), sampler.window(start, end)))
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "mode": "spawn" if spawn else "in-process",
+        "step_seconds": step_seconds,
+        "think_mean_s": think_mean,
+        "steps": steps,
+        "saturation": find_saturation(steps),
+    }
+
+    print(f"\n{'RATE':<6} | {'DONE':<5} | {'TPUT/S':<7} | {'ERR':<6} | {'PARSE P95':<10} | "
+          f"{'ANALYZE P95':<11} | {'REWRITE P95':<11} | {'CPU%':<6} | {'RSS MB':<7} | FDS")
+    print("-" * 104)
+    for s in steps:
+        r = s["resources"]
+        print(f"{s['offered_rate']:<6} | {s['completed']:<5} | {s['throughput_per_s']:<7} | "
+              f"{str(s['error_rate']):<6} | {str(s['stages']['parse']['p95_ms']):<10} | "
+              f"{str(s['stages']['analyze']['p95_ms']):<11} | {str(s['stages']['rewrite']['p95_ms']):<11} | "
+              f"{str(r.get('cpu_percent_mean')):<6} | {str(r.get('rss_mb_peak')):<7} | {r.get('open_fds_peak')}")
+    saturation = report["saturation"]
+    print(f"\nSaturation: {'at ' + str(saturation['rate']) + '/s (' + saturation['reason'] + ')' if saturation else 'not reached'}")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, f"load_test_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved report to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
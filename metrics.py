@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+# Process-wide counters and histograms for LLM calls and caches.
+#
+#   completion = instrumented_completion(client, "parse", model=..., messages=...)
+#   record_cache("prefetch", hit=True)
+#
+# Series (label "site" is the call site: parse, analyze, intro, rewrite, ...):
+#   llm_requests_total, llm_errors_total{status}, llm_rate_limited_total,
+#   llm_prompt_tokens_total, llm_completion_tokens_total,
+#   llm_latency_seconds (histogram), cache_requests_total{cache,result}
+#   (+ queue series from llm_scheduler.py, which every completion goes through)
+#
+# The entry points are one process per request, so each process can append its
+# snapshot to METRICS_DUMP_PATH at exit (METRICS_DUMP=1, or dump_at_exit() in
+# batch scripts). Resident workers expose render_prometheus()/snapshot() directly
+# (rag_search.py --serve: /metrics, /metrics/prometheus).
+#
+#   python metrics.py                 # aggregate dumps -> Prometheus text
+#   python metrics.py --json          # aggregate dumps -> JSON
+#   python metrics.py --serve 9100    # serve the aggregate on /metrics
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+METRICS_DUMP_PATH = os.getenv("METRICS_DUMP_PATH", os.path.join(script_dir, ".cache", "metrics.jsonl"))
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> {"buckets": [...], "sum": s, "count": n}
+_lru_caches = {}  # cache name -> functools.lru_cache wrapped function
+_dump_registered = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"bounds": list(buckets), "buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(hist["bounds"]):
+            if value <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def counter(name, **labels):
+    """Current value of one counter series (0 if never incremented)."""
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def record_cache(cache, hit):
+    inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def register_lru(cache, fn):
+    """Report a functools.lru_cache's hits/misses under cache_requests_total."""
+    _lru_caches[cache] = fn
+
+
+def instrumented_completion(client, site, **kwargs):
+    """
+    client.chat.completions.create(**kwargs) inside an llm_scheduler slot, recording
+    count, errors, tokens and latency (excluding queue wait) for `site`.
+    """
+    from llm_scheduler import llm_slot, report_rate_limited
+    inc("llm_requests_total", site=site)
+    with llm_slot(site, "groq"):
+        start = time.perf_counter()
+        try:
+            completion = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            status = getattr(e, "status_code", None) or type(e).__name__
+            inc("llm_errors_total", site=site, status=status)
+            if status == 429:
+                inc("llm_rate_limited_total", site=site)
+                report_rate_limited("groq")
+            raise
+        finally:
+            observe("llm_latency_seconds", time.perf_counter() - start, site=site)
+
+    # Streaming responses carry usage only on the final chunk; counted by the caller if needed
+    usage = getattr(completion, "usage", None)
+    if usage is not None:
+        record_usage(site, usage)
+    return completion
+
+
+def record_usage(site, usage):
+    inc("llm_prompt_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, site=site)
+    inc("llm_completion_tokens_total", getattr(usage, "completion_tokens", 0) or 0, site=site)
+
+
+def snapshot():
+    """JSON-friendly copy of every series plus derived cache hit ratios."""
+    with _lock:
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in _counters.items()]
+        histograms = [
+            {"name": n, "labels": dict(l), "bounds": h["bounds"], "buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+            for (n, l), h in _histograms.items()
+        ]
+    for cache, fn in _lru_caches.items():
+        info = fn.cache_info()
+        counters.append({"name": "cache_requests_total", "labels": {"cache": cache, "result": "hit"}, "value": info.hits})
+        counters.append({"name": "cache_requests_total", "labels": {"cache": cache, "result": "miss"}, "value": info.misses})
+    return {"counters": counters, "histograms": histograms, "cache_hit_ratio": cache_hit_ratios(counters)}
+
+
+def cache_hit_ratios(counters):
+    totals = {}
+    for c in counters:
+        if c["name"] == "cache_requests_total":
+            hits, total = totals.get(c["labels"]["cache"], (0, 0))
+            hit = c["value"] if c["labels"]["result"] == "hit" else 0
+            totals[c["labels"]["cache"]] = (hits + hit, total + c["value"])
+    return {cache: round(hits / total, 4) if total else 0.0 for cache, (hits, total) in sorted(totals.items())}
+
+
+def merge(snapshots):
+    """Sum several snapshots (e.g. per-process dumps) into one."""
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for c in snap.get("counters", []):
+            key = _key(c["name"], c["labels"])
+            counters[key] = counters.get(key, 0) + c["value"]
+        for h in snap.get("histograms", []):
+            key = _key(h["name"], h["labels"])
+            agg = histograms.get(key)
+            if agg is None:
+                histograms[key] = {"bounds": h["bounds"], "buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+            else:
+                agg["buckets"] = [a + b for a, b in zip(agg["buckets"], h["buckets"])]
+                agg["sum"] += h["sum"]
+                agg["count"] += h["count"]
+    counter_list = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in counters.items()]
+    return {
+        "counters": counter_list,
+        "histograms": [dict(name=n, labels=dict(l), **h) for (n, l), h in histograms.items()],
+        "cache_hit_ratio": cache_hit_ratios(counter_list),
+    }
+
+
+def _labels_text(labels, extra=None):
+    items = list(labels.items()) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus(snap=None):
+    """Prometheus text exposition format."""
+    snap = snap or snapshot()
+    lines = []
+    typed = set()
+    for c in sorted(snap["counters"], key=lambda c: (c["name"], sorted(c["labels"].items()))):
+        if c["name"] not in typed:
+            lines.append(f"# TYPE {c['name']} counter")
+            typed.add(c["name"])
+        lines.append(f"{c['name']}{_labels_text(c['labels'])} {c['value']}")
+    for h in sorted(snap["histograms"], key=lambda h: (h["name"], sorted(h["labels"].items()))):
+        if h["name"] not in typed:
+            lines.append(f"# TYPE {h['name']} histogram")
+            typed.add(h["name"])
+        for bound, count in zip(h["bounds"], h["buckets"]):
+            lines.append(f"{h['name']}_bucket{_labels_text(h['labels'], {'le': bound})} {count}")
+        lines.append(f"{h['name']}_bucket{_labels_text(h['labels'], {'le': '+Inf'})} {h['count']}")
+        lines.append(f"{h['name']}_sum{_labels_text(h['labels'])} {round(h['sum'], 6)}")
+        lines.append(f"{h['name']}_count{_labels_text(h['labels'])} {h['count']}")
+    if snap.get("cache_hit_ratio"):
+        lines.append("# TYPE cache_hit_ratio gauge")
+        for cache, ratio in snap["cache_hit_ratio"].items():
+            lines.append(f'cache_hit_ratio{{cache="{cache}"}} {ratio}')
+    return "\n".join(lines) + "\n"
+
+
+def dump(path=METRICS_DUMP_PATH):
+    """Append this process's snapshot to the dump file (skipped when nothing was recorded)."""
+    snap = snapshot()
+    if not any(c["value"] for c in snap["counters"]) and not snap["histograms"]:
+        return
+    snap.update({"pid": os.getpid(), "script": os.path.basename(sys.argv[0] or "python"), "time": round(time.time(), 3)})
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snap) + "\n")
+    except OSError as e:
+        print(f"Metrics dump failed: {e}", file=sys.stderr)
+
+
+def dump_at_exit(path=METRICS_DUMP_PATH):
+    global _dump_registered
+    if not _dump_registered:
+        atexit.register(dump, path)
+        _dump_registered = True
+
+
+def load_dumps(path=METRICS_DUMP_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if os.getenv("METRICS_DUMP") == "1":
+    dump_at_exit()
+
+
+def _handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            snap = merge(load_dumps())
+            if self.path == "/metrics":
+                body, ctype = render_prometheus(snap).encode("utf-8"), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, ctype = json.dumps(snap).encode("utf-8"), "application/json"
+            else:
+                body, ctype = b"not found\n", "text/plain"
+            self.send_response(200 if self.path in ("/metrics", "/metrics.json") else 404)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return MetricsHandler
+
+
+def main():
+    args = sys.argv[1:]
+    if "--serve" in args:
+        port = int(args[args.index("--serve") + 1]) if len(args) > args.index("--serve") + 1 else 9100
+        from http.server import ThreadingHTTPServer
+        server = ThreadingHTTPServer(("127.0.0.1", port), _handler())
+        print(f"Serving aggregated metrics from {METRICS_DUMP_PATH} on http://127.0.0.1:{port}/metrics", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    snap = merge(load_dumps())
+    if "--json" in args:
+        print(json.dumps(snap, indent=2))
+    else:
+        sys.stdout.write(render_prometheus(snap))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for Groq, Gemini embeddings and Pinecone, for offline load
+# testing and profiling. Speaks enough of each REST API for the real SDKs:
+#
+#   Groq      POST /openai/v1/chat/completions           (JSON or SSE streaming)
+#   Gemini    POST /v1beta/models/<m>:embedContent | :batchEmbedContents
+#   Pinecone  GET/POST /indexes[/<name>]  (control plane)
+#             POST /vectors/upsert, /query, /describe_index_stats  (data plane)
+#   Stats     GET  /_mock/stats
+#
+#   python mock_services.py [--port 8900] [--seed-corpus] [--replay-dir DIR]
+#       [--latency groq=lognormal:400:0.4] [--errors groq=0.02] [--rate-limit gemini=0.05]
+#       [--decode-ms-per-token 4]
+#
+# Point the entry points at it (printed on startup):
+#   GROQ_BASE_URL=http://127.0.0.1:8900  GEMINI_BASE_URL=http://127.0.0.1:8900
+#   PINECONE_HOST=http://127.0.0.1:8900  (+ any non-empty API keys)
+#
+# Chat replies are replayed by prompt kind: parse -> debug_llm_response.txt (a saved
+# parse reply, e.g. the llm_response payload of a captured trace),
+# rewrite -> the resume JSON echoed back (compact contract: the entry bullets
+# unchanged), analyze -> findings built from the items in the prompt. Files named <kind>.txt in --replay-dir take precedence.
+# Embeddings are deterministic (hashing backend), so retrieval results are stable.
+# --decode-ms-per-token adds generation time proportional to completion length
+# (non-streaming), so output-token savings show up in latency as they would on Groq.
+
+DEFAULT_PORT = 8900
+DEFAULT_LATENCY = {
+    "groq": "lognormal:400:0.4",
+    "gemini": "normal:80:20",
+    "pinecone": "normal:30:10",
+}
+script_dir = os.path.dirname(os.path.abspath(__file__))
+PARSE_REPLAY_PATH = os.path.join(script_dir, "debug_llm_response.txt")
+STREAM_CHUNK_WORDS = 4
+STREAM_CHUNK_MS = 15
+EMBEDDING_DIM = 768
+
+
+def parse_distribution(spec):
+    """'fixed:MS' | 'uniform:LO:HI' | 'normal:MEAN:SD' | 'lognormal:MEDIAN:SIGMA' -> sampler returning seconds."""
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda rng: params[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1])) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _service_map(values, cast):
+    """['groq=0.1', 'gemini=0.2'] -> {'groq': cast('0.1'), ...}"""
+    out = {}
+    for value in values:
+        name, _, setting = value.partition("=")
+        out[name] = cast(setting)
+    return out
+
+
+class MockState:
+    def __init__(self, latency, errors, rate_limits, replay_dir=None, seed=0, decode_ms_per_token=0.0):
+        self.latency = {name: parse_distribution(spec) for name, spec in latency.items()}
+        self.errors = errors
+        self.rate_limits = rate_limits
+        self.replay_dir = replay_dir
+        self.decode_ms_per_token = decode_ms_per_token
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.indexes = {}     # name -> description
+        self.vectors = {}     # namespace -> {id: (values, metadata)}
+        self.stats = {}       # "service:outcome" -> count
+        self._embedder = None
+        self.host = ""
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def delay(self, service):
+        with self.lock:
+            seconds = self.latency[service](self.rng) if service in self.latency else 0.0
+        time.sleep(seconds)
+
+    def injected_fault(self, service):
+        """None, 429 or 500, drawn from the configured rates."""
+        with self.lock:
+            roll = self.rng.random()
+        rate_limit = self.rate_limits.get(service, 0.0)
+        if roll < rate_limit:
+            return 429
+        if roll < rate_limit + self.errors.get(service, 0.0):
+            return 500
+        return None
+
+    def embed(self, texts):
+        if self._embedder is None:
+            from embeddings import HashingEmbeddingProvider
+            self._embedder = HashingEmbeddingProvider(EMBEDDING_DIM)
+        return self._embedder.embed(list(texts))
+
+    def replay(self, kind):
+        if self.replay_dir:
+            path = os.path.join(self.replay_dir, f"{kind}.txt")
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return f.read()
+        if kind == "parse" and os.path.exists(PARSE_REPLAY_PATH):
+            with open(PARSE_REPLAY_PATH, 'r', encoding='utf-8') as f:
+                return f.read()
+        return None
+
+
+# --- Groq chat completions ---
+
+def _classify_prompt(messages):
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+    if "Resume Parser" in system:
+        return "parse", system, user
+    if "Resume Critic" in system:
+        return "analyze", system, user
+    if user.startswith("Resume JSON:") or user.startswith("<resume_json>"):
+        return "rewrite", system, user
+    if user.startswith("Resume entries:"):
+        return "rewrite_compact", system, user
+    if user.startswith("Rewrite bullets:"):
+        return "rewrite_bullets", system, user
+    if "1-sentence summary" in user:
+        return "intro", system, user
+    return "default", system, user
+
+
+def _analysis_findings(prompt):
+    """Findings shaped like analyzer.py expects, one per bullet, cycling severity."""
+    section = re.search(r'Analyze ONLY the following `(\w+)`', prompt)
+    section = section.group(1) if section else "experience"
+    start, end = prompt.find("["), prompt.find("OUTPUT FORMAT")
+    try:
+        items = json.loads(prompt[start:prompt.rfind("]", start, end) + 1])
+    except ValueError:
+        items = []
+
+    findings = {"critical": [], "warning": [], "niceToHave": []}
+    severities = list(findings)
+    n = 0
+    for item in items:
+        for idx, bullet in enumerate(item.get("bullets", [])):
+            findings[severities[n % 3]].append({
+                "section": section, "id": item.get("id", ""), "quote": bullet, "bulletIndex": idx,
+                "question": "What measurable result did this produce?", "issue": "Add a concrete metric.",
+            })
+            n += 1
+    return json.dumps(findings)
+
+
+def chat_reply(state, messages):
+    kind, system, user = _classify_prompt(messages)
+    replayed = state.replay(kind)
+    if replayed is not None:
+        return replayed
+    if kind == "rewrite":
+        if user.startswith("<resume_json>"):
+            return user[len("<resume_json>"):user.find("</resume_json>")].strip()
+        return user[len("Resume JSON:"):].strip()
+    if kind == "rewrite_compact":
+        payload, _ = json.JSONDecoder().raw_decode(user[len("Resume entries:"):].strip())
+        bullets = {eid: entry["bullets"] for eid, entry in payload.get("entries", {}).items() if entry.get("bullets")}
+        return json.dumps({"bullets": bullets, "summary": payload.get("summary", "")})
+    if kind == "rewrite_bullets":
+        payload = json.loads(user[len("Rewrite bullets:"):].strip())
+        return json.dumps({item_id: item["bullet"] for item_id, item in payload.items()})
+    if kind == "analyze":
+        return _analysis_findings(system)
+    if kind == "intro":
+        return "A results-driven profile with strong hands-on delivery experience."
+    return "{}"
+
+
+def _usage(messages, content):
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+# --- Pinecone ---
+
+def _matches_filter(metadata, query_filter):
+    for field, condition in (query_filter or {}).items():
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, target in condition.items():
+            if op == "$eq" and value != target:
+                return False
+            if op == "$ne" and value == target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+    return True
+
+
+def pinecone_query(state, body):
+    import numpy as np
+    namespace = body.get("namespace", "")
+    with state.lock:
+        rows = list(state.vectors.get(namespace, {}).items())
+    rows = [(vid, values, meta) for vid, (values, meta) in rows if _matches_filter(meta, body.get("filter"))]
+    if not rows:
+        return {"matches": [], "namespace": namespace, "usage": {"readUnits": 1}}
+
+    query = np.asarray(body["vector"], dtype=np.float32)
+    matrix = np.asarray([values for _, values, _ in rows], dtype=np.float32)
+    scores = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+    top = np.argsort(-scores, kind="stable")[:int(body.get("topK", 10))]
+    matches = []
+    for i in top:
+        match = {"id": rows[i][0], "score": float(scores[i])}
+        if body.get("includeMetadata"):
+            match["metadata"] = rows[i][2]
+        if body.get("includeValues"):
+            match["values"] = rows[i][1]
+        matches.append(match)
+    return {"matches": matches, "namespace": namespace, "usage": {"readUnits": 1}}
+
+
+def index_description(state, name, dimension=EMBEDDING_DIM):
+    return {
+        "name": name,
+        "dimension": dimension,
+        "metric": "cosine",
+        "host": state.host,
+        "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+        "status": {"ready": True, "state": "Ready"},
+        "deletion_protection": "disabled",
+    }
+
+
+def seed_corpus(state):
+    """Load the bullet corpus into the default and per-domain namespaces, like vector_db.py --layout both."""
+    from corpus_store import open_corpus
+    store = open_corpus()
+    rows = list(store.iter_bullets())
+    store.close()
+    vectors = state.embed([r["text"] for r in rows])
+    for row, values in zip(rows, vectors):
+        meta = {"text": row["text"], "domain": row["domain"], "type": row["type"]}
+        if row["quality_score"] is not None:
+            meta["quality_score"] = row["quality_score"]
+        for namespace in ("", row["domain"]):
+            state.vectors.setdefault(namespace, {})[f"bullet-{row['id']}"] = (values, meta)
+    state.indexes["resume-bullets"] = index_description(state, "resume-bullets")
+    print(f"Seeded {len(rows)} bullets into mock Pinecone", file=sys.stderr)
+
+
+# --- HTTP ---
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _service(self):
+        path = self.path.split("?")[0]
+        if path.startswith("/openai/"):
+            return "groq"
+        if path.startswith("/v1beta/") or path.startswith("/v1/models"):
+            return "gemini"
+        if path.startswith("/_mock"):
+            return None
+        return "pinecone"
+
+    def _fault(self, service):
+        fault = self.state.injected_fault(service)
+        if fault is None:
+            return False
+        self.state.count(f"{service}:{fault}")
+        if fault == 429:
+            self._send(429, {"error": {"code": 429, "message": "Rate limit exceeded (mock)", "status": "RESOURCE_EXHAUSTED"}},
+                       {"Retry-After": "1"})
+        else:
+            self._send(500, {"error": {"code": 500, "message": "Internal error (mock)", "status": "INTERNAL"}})
+        return True
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/_mock/stats":
+            with self.state.lock:
+                self._send(200, {"counts": dict(self.state.stats),
+                                 "namespaces": {ns: len(v) for ns, v in self.state.vectors.items()}})
+            return
+        service = self._service()
+        self.state.delay(service)
+        if self._fault(service):
+            return
+        self.state.count(f"{service}:ok")
+        if path == "/indexes":
+            self._send(200, {"indexes": list(self.state.indexes.values())})
+        elif path.startswith("/indexes/"):
+            name = path[len("/indexes/"):]
+            if name in self.state.indexes:
+                self._send(200, self.state.indexes[name])
+            else:
+                self._send(404, {"error": {"code": "NOT_FOUND", "message": f"Index {name} not found"}})
+        else:
+            self._send(404, {"error": f"Unknown path: {path}"})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        service = self._service()
+        body = self._read_json()
+        self.state.delay(service)
+        if self._fault(service):
+            return
+        self.state.count(f"{service}:ok")
+
+        if path.endswith("/chat/completions"):
+            self._chat(body)
+        elif path.endswith(":batchEmbedContents"):
+            texts = [" ".join(p.get("text", "") for p in r["content"]["parts"]) for r in body.get("requests", [])]
+            self._send(200, {"embeddings": [{"values": v} for v in self.state.embed(texts)]})
+        elif path.endswith(":embedContent"):
+            text = " ".join(p.get("text", "") for p in body["content"]["parts"])
+            self._send(200, {"embedding": {"values": self.state.embed([text])[0]}})
+        elif path == "/indexes":
+            description = index_description(self.state, body["name"], body.get("dimension", EMBEDDING_DIM))
+            self.state.indexes[body["name"]] = description
+            self._send(201, description)
+        elif path == "/vectors/upsert":
+            namespace = body.get("namespace", "")
+            with self.state.lock:
+                bucket = self.state.vectors.setdefault(namespace, {})
+                for v in body.get("vectors", []):
+                    bucket[v["id"]] = (v["values"], v.get("metadata", {}))
+            self._send(200, {"upsertedCount": len(body.get("vectors", []))})
+        elif path == "/query":
+            self._send(200, pinecone_query(self.state, body))
+        elif path == "/describe_index_stats":
+            with self.state.lock:
+                namespaces = {ns: {"vectorCount": len(v)} for ns, v in self.state.vectors.items()}
+            self._send(200, {"namespaces": namespaces, "dimension": EMBEDDING_DIM, "indexFullness": 0.0,
+                             "totalVectorCount": sum(n["vectorCount"] for n in namespaces.values())})
+        else:
+            self._send(404, {"error": f"Unknown path: {path}"})
+
+    def _chat(self, body):
+        messages = body.get("messages", [])
+        content = chat_reply(self.state, messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+        usage = _usage(messages, content)
+
+        if not body.get("stream"):
+            time.sleep(usage["completion_tokens"] * self.state.decode_ms_per_token / 1000)
+            self._send(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "logprobs": None, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        # Server-sent events, one chunk per few words, paced like a token stream
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        words = re.findall(r'\S+\s*', content) or [""]
+        for start in range(0, len(words), STREAM_CHUNK_WORDS):
+            piece = "".join(words[start:start + STREAM_CHUNK_WORDS])
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": piece}, "logprobs": None, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(STREAM_CHUNK_MS / 1000)
+        final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "logprobs": None, "finish_reason": "stop"}],
+                 "x_groq": {"usage": usage}}
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def _args(name):
+    return [sys.argv[i + 1] for i, a in enumerate(sys.argv[:-1]) if a == name]
+
+
+def main():
+    port = int((_args("--port") or [DEFAULT_PORT])[0])
+    latency = dict(DEFAULT_LATENCY)
+    latency.update(_service_map(_args("--latency"), str))
+    state = MockState(
+        latency=latency,
+        errors=_service_map(_args("--errors"), float),
+        rate_limits=_service_map(_args("--rate-limit"), float),
+        replay_dir=(_args("--replay-dir") or [None])[0],
+        seed=int((_args("--seed") or [0])[0]),
+        decode_ms_per_token=float((_args("--decode-ms-per-token") or [0])[0]),
+    )
+    state.host = f"http://127.0.0.1:{port}"
+    if "--seed-corpus" in sys.argv:
+        seed_corpus(state)
+
+    MockHandler.state = state
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+    server.daemon_threads = True
+    print(f"Mock services on {state.host} (latency: {latency})", file=sys.stderr)
+    print(f"export GROQ_BASE_URL={state.host} GEMINI_BASE_URL={state.host} PINECONE_HOST={state.host}")
+    print("export GROQ_API_KEY=mock GEMINI_API_KEY=mock PINECONE_API_KEY=mock")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
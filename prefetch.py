@@ -0,0 +1,133 @@
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+from metrics import record_cache
+
+# Speculative retrieval prefetch.
+# parse -> analyze -> rewrite leaves seconds of user think time before the
+# rewrite is requested. With PREFETCH_ON_PARSE=1, parser.py tags the parsed
+# resume with a "_session_id" and starts this script in the background:
+#
+#   python prefetch.py <session_id> < parsed_resume.json
+#
+# It runs the same retrieval rewriter_rag.py would (retrieve_examples per
+# bullet) and stores the ranked results in PREFETCH_DIR/<session_id>.json.
+# When the rewrite arrives with the same _session_id, warm bullets skip
+# retrieval entirely; the response reports hit rate and time saved.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+PREFETCH_DIR = os.path.join(script_dir, ".cache", "prefetch")
+PREFETCH_TTL_SECONDS = int(os.getenv("PREFETCH_TTL_SECONDS", "3600"))
+MAX_PREFETCH_BULLETS = 5  # same cap as rewrite_with_rag
+
+_SESSION_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def session_path(session_id):
+    if not _SESSION_PATTERN.match(session_id or ""):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return os.path.join(PREFETCH_DIR, f"{session_id}.json")
+
+
+def _write_session(session_id, entry):
+    os.makedirs(PREFETCH_DIR, exist_ok=True)
+    path = session_path(session_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_session(session_id):
+    """Cached entry for a session, or None if missing, invalid or expired."""
+    try:
+        with open(session_path(session_id), 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created_at", 0) > PREFETCH_TTL_SECONDS:
+        return None
+    return entry
+
+
+def resume_bullets(resume):
+    bullets = []
+    for section in ("experience", "projects"):
+        for entry in resume.get(section, []):
+            bullets.extend(entry.get("bullets", []))
+    return bullets
+
+
+def prefetch_session(session_id, resume):
+    """Run retrieval for the resume's bullets, persisting after each one so a partial warm-up still helps."""
+    from domain_classifier import domain_weights
+    from rewriter_rag import retrieve_examples, EXAMPLE_OVERFETCH
+
+    domains = domain_weights(resume)
+    entry = {"created_at": time.time(), "domains": domains, "top_k": EXAMPLE_OVERFETCH, "results": {}}
+    for bullet in resume_bullets(resume)[:MAX_PREFETCH_BULLETS]:
+        start = time.perf_counter()
+        try:
+            examples = retrieve_examples(bullet, top_k=EXAMPLE_OVERFETCH, domains=domains, raise_errors=True)
+        except Exception:
+            continue  # leave it to the rewrite's own retrieval
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        entry["results"][bullet] = {"examples": examples, "ms": round(elapsed_ms, 2)}
+        _write_session(session_id, entry)
+    print(f"Prefetched {len(entry['results'])} bullets for session {session_id}", file=sys.stderr)
+
+
+def start_background_prefetch(session_id, resume):
+    """Spawn a detached prefetch process; returns immediately."""
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), session_id],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **kwargs
+    )
+    process.stdin.write(json.dumps(resume).encode("utf-8"))
+    process.stdin.close()
+
+
+class PrefetchLookup:
+    """Per-request view of a session's cache that counts hits/misses and retrieval time saved."""
+
+    def __init__(self, session_id, domains):
+        entry = load_session(session_id) if session_id else None
+        # Results are only valid for the same domain mix
+        self.results = entry["results"] if entry and entry.get("domains") == domains else {}
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def get(self, bullet):
+        cached = self.results.get(bullet)
+        record_cache("prefetch", cached is not None)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_ms += cached["ms"]
+        return cached["examples"]
+
+    def report(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+        }
+
+
+if __name__ == "__main__":
+    prefetch_session(sys.argv[1], json.loads(sys.stdin.read()))
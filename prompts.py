@@ -0,0 +1,244 @@
+import os
+import re
+import sys
+import json
+from string import Template
+from functools import lru_cache
+from collections import namedtuple
+
+# Prompt registry.
+# System/user prompts live in prompts/<name>.txt as string.Template text
+# ($field placeholders). Each template is read once per process, dedented and
+# minified (trailing spaces, blank-line runs, deep indentation); user data is
+# serialised compactly. compile_prompt() estimates tokens locally and, when a
+# call site's budget is exceeded, trims the lowest-priority Section items first.
+#
+#   p = compile_prompt("analyze_section", site="analyze", section_name="experience", items=items)
+#   p.text, p.tokens, p.baseline_tokens, p.trimmed
+#
+# Per-site tokens and savings go to metrics.py (prompt_tokens_total,
+# prompt_tokens_saved_total, prompt_items_trimmed_total).
+#
+#   python prompts.py    # savings report on the fixture resumes -> bench_results/prompt_savings.json
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+PROMPTS_DIR = os.path.join(script_dir, "prompts")
+
+# Input-token budget per call site (system + user); PROMPT_BUDGET_<SITE> overrides
+PROMPT_BUDGETS = {
+    "parse": 12000,
+    "analyze": 6000,
+    "intro": 1000,
+    "rewrite": 8000,
+    "rewrite_basic": 8000,
+    "rewrite_bullets": 6000,
+}
+# Indentation of the inline prompts these templates replaced (their JSON was
+# serialised with indent=2); the savings baseline reproduces that layout.
+LEGACY_INDENT = {
+    "parse_system": 8,
+    "analyze_section": 12,
+    "analyze_intro": 12,
+    "rewrite_system": 8,
+    "rewrite_rag_system": 8,
+}
+
+Prompt = namedtuple("Prompt", ["text", "tokens", "baseline_tokens", "trimmed"])
+
+
+class Section:
+    """Trimmable list field: items are dropped from the end, highest priority number first."""
+
+    def __init__(self, items, priority=1, fmt=str, sep="\n", header="", empty=""):
+        self.items = list(items)
+        self.priority = priority
+        self.fmt = fmt
+        self.sep = sep
+        self.header = header
+        self.empty = empty
+
+    def render(self, count=None):
+        items = self.items[:count] if count is not None else self.items
+        if not items:
+            return self.empty
+        return self.header + self.sep.join(self.fmt(i) for i in items)
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+def compact_json(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def compact_text(text):
+    """Collapse runs of spaces/tabs and blank lines (PDF extraction produces plenty)."""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def minify(text):
+    """Dedent and shrink template whitespace: one space per indent level, single blank lines."""
+    lines = []
+    for line in text.strip().split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        lines.append(" " * ((indent + 3) // 4) + stripped)
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def load_template(name):
+    """(minified Template, raw text) for prompts/<name>.txt, read once per process."""
+    with open(os.path.join(PROMPTS_DIR, f"{name}.txt"), 'r', encoding='utf-8') as f:
+        raw = f.read()
+    return Template(minify(raw)), raw
+
+
+def budget_for(site):
+    env = os.getenv(f"PROMPT_BUDGET_{site.upper()}") if site else None
+    return int(env) if env else PROMPT_BUDGETS.get(site)
+
+
+def _render(template, fields, counts):
+    values = {}
+    for key, value in fields.items():
+        if isinstance(value, Section):
+            values[key] = value.render(counts.get(key))
+        elif isinstance(value, (dict, list)):
+            values[key] = compact_json(value)
+        else:
+            values[key] = str(value)
+    return template.substitute(values)
+
+
+def _baseline(name, raw, fields):
+    values = {}
+    for key, value in fields.items():
+        if isinstance(value, Section):
+            values[key] = value.render()
+        elif isinstance(value, (dict, list)):
+            values[key] = json.dumps(value, indent=2)
+        else:
+            values[key] = str(value)
+    indent = " " * LEGACY_INDENT.get(name, 0)
+    indented = "\n".join(indent + line for line in raw.split("\n"))
+    return Template(indented).substitute(values)
+
+
+def compile_prompt(name, site=None, budget=None, reserved_tokens=0, **fields):
+    """
+    Render prompts/<name>.txt with `fields`. Sections are trimmed (lowest
+    priority first) until the prompt plus `reserved_tokens` (other messages
+    of the same call) fits the site's budget.
+    """
+    template, raw = load_template(name)
+    budget = budget if budget is not None else budget_for(site)
+    counts = {}
+    text = _render(template, fields, counts)
+    tokens = estimate_tokens(text)
+
+    trimmed = 0
+    if budget is not None:
+        sections = sorted(
+            (k for k, v in fields.items() if isinstance(v, Section)),
+            key=lambda k: -fields[k].priority,
+        )
+        for key in sections:
+            counts[key] = len(fields[key].items)
+            while tokens + reserved_tokens > budget and counts[key] > 0:
+                counts[key] -= 1
+                trimmed += 1
+                text = _render(template, fields, counts)
+                tokens = estimate_tokens(text)
+            if tokens + reserved_tokens <= budget:
+                break
+
+    baseline_tokens = estimate_tokens(_baseline(name, raw, fields))
+    if site:
+        from metrics import inc
+        inc("prompt_tokens_total", tokens, site=site)
+        inc("prompt_tokens_saved_total", max(0, baseline_tokens - tokens), site=site)
+        if trimmed:
+            inc("prompt_items_trimmed_total", trimmed, site=site)
+        if budget is not None and tokens + reserved_tokens > budget:
+            inc("prompt_over_budget_total", site=site)
+    if trimmed:
+        print(f"Prompt {name}: trimmed {trimmed} items to fit {budget} tokens", file=sys.stderr)
+    return Prompt(text, tokens, baseline_tokens, trimmed)
+
+
+def _fixture_prompts():
+    """(site, [Prompt, ...]) for each call site, rendered from the repo fixtures."""
+    def load_json(name):
+        with open(os.path.join(script_dir, name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    resumes = [load_json(name) for name in ("temp_test.json", "temp_test6.json", "test_output.json")]
+    with open(os.path.join(script_dir, "debug_extracted_text.txt"), 'r', encoding='utf-8') as f:
+        resume_text = f.read()
+    examples = [b for bullets in load_json("resume_bullets.json").values() for b in bullets[:3]][:10]
+
+    sites = {"parse": [], "analyze": [], "intro": [], "rewrite": [], "rewrite_basic": []}
+    system = compile_prompt("parse_system")
+    user = compile_prompt("parse_user", text=compact_text(resume_text), links="")
+    # Legacy user message: the raw extracted text
+    sites["parse"].append(Prompt(None, system.tokens + user.tokens,
+                                 system.baseline_tokens + estimate_tokens(f"Resume Text:\n{resume_text}"), 0))
+    for resume in resumes:
+        for name, key in (("experience", "experience"), ("project", "projects"), ("responsibility", "responsibilities")):
+            if resume.get(key):
+                sites["analyze"].append(compile_prompt("analyze_section", section_name=name, items=resume[key]))
+        sites["intro"].append(compile_prompt(
+            "analyze_intro",
+            profile=resume.get("profile", {}),
+            titles=[e.get("role") for e in resume.get("experience", [])],
+        ))
+        user_tokens = estimate_tokens(compact_json(resume))
+        legacy_user_tokens = estimate_tokens(json.dumps(resume))
+        for site, name, fields in (
+            ("rewrite", "rewrite_rag_system", {"examples": Section(examples, fmt=lambda b: f"- {b}")}),
+            ("rewrite_basic", "rewrite_system", {}),
+        ):
+            p = compile_prompt(name, **fields)
+            sites[site].append(Prompt(None, p.tokens + user_tokens, p.baseline_tokens + legacy_user_tokens, 0))
+    return sites
+
+
+def main():
+    # 1. Render every call site's prompts from the fixtures
+    report = {}
+    print(f"{'site':<14} | {'calls':<5} | {'baseline':<9} | {'compiled':<9} | {'saved/call':<10} | saved %")
+    print("-" * 70)
+    for site, prompts in _fixture_prompts().items():
+        if not prompts:
+            continue
+        baseline = sum(p.baseline_tokens for p in prompts) / len(prompts)
+        compiled = sum(p.tokens for p in prompts) / len(prompts)
+        report[site] = {
+            "calls": len(prompts),
+            "baseline_tokens": round(baseline, 1),
+            "compiled_tokens": round(compiled, 1),
+            "saved_tokens_per_call": round(baseline - compiled, 1),
+            "saved_pct": round(100 * (baseline - compiled) / baseline, 1) if baseline else 0.0,
+        }
+        r = report[site]
+        print(f"{site:<14} | {r['calls']:<5} | {r['baseline_tokens']:<9} | {r['compiled_tokens']:<9} | {r['saved_tokens_per_call']:<10} | {r['saved_pct']}")
+
+    # 2. Save
+    os.makedirs("bench_results", exist_ok=True)
+    out_path = os.path.join("bench_results", "prompt_savings.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({"token_estimate": "chars/4", "sites": report}, f, indent=2)
+    print(f"\nSaved report to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import re
+import sys
+import numpy as np
+from corpus_store import open_corpus
+
+# Batch quality scoring for the bullet corpus.
+# Features are extracted once per bullet into NumPy columns and the score is
+# computed for the whole corpus in one pass. Scores + features are stored on
+# each row (corpus_store) and copied into Pinecone metadata by vector_db.py so
+# retrieval can filter on quality_score server-side.
+
+FEATURE_COLUMNS = ("length", "metric_density", "verb_strength", "has_currency", "has_percent", "latex_residue")
+
+STRONG_VERBS = {
+    "spearheaded", "engineered", "orchestrated", "architected", "architecting", "led", "launched",
+    "built", "designed", "developed", "optimized", "streamlined", "automated", "deployed",
+    "implemented", "reduced", "increased", "grew", "drove", "delivered", "scaled", "migrated",
+    "redesigned", "operationalized", "expanded", "mentored", "cofounded", "founded", "established",
+    "accelerated", "benchmarked", "debugged", "tuned", "configured", "authored", "translated",
+    "analyzed", "created", "enhanced", "administered", "negotiated", "pioneered", "transformed",
+}
+WEAK_OPENERS = ("responsible for", "worked on", "worked with", "helped", "assisted", "participated",
+                "involved in", "tasked with", "used", "utilized", "was ", "did ")
+
+METRIC_PATTERN = re.compile(r'\d+(?:[.,]\d+)?\s*(?:\\?%|x\b|k\b|\+)?', re.IGNORECASE)
+CURRENCY_PATTERN = re.compile(r'\\?\$|₹|\bRs\.?|\bINR\b|\bUSD\b|\bLakhs?\b|\bCr\b|\bcrores?\b|\bmillion\b', re.IGNORECASE)
+PERCENT_PATTERN = re.compile(r'\d\s*\\?%')
+# Escaped \% \$ \& are intentional (clean.py); residue means unrendered commands or braces
+LATEX_PATTERN = re.compile(r'\\(?![%$&_#])[a-zA-Z]+|[{}]|\\\\')
+
+# Ideal bullet length band (chars)
+LENGTH_MIN, LENGTH_MAX = 80, 220
+
+WEIGHTS = {
+    "length": 0.25,
+    "metric_density": 0.30,
+    "verb_strength": 0.25,
+    "has_currency": 0.10,
+    "has_percent": 0.10,
+}
+LATEX_PENALTY = 0.3
+
+
+def _verb_strength(text):
+    lowered = text.strip().lower()
+    if lowered.startswith(WEAK_OPENERS):
+        return 0.0
+    first = re.split(r'[\s,]+', lowered, maxsplit=1)[0]
+    return 1.0 if first in STRONG_VERBS else 0.5
+
+
+def extract_features(texts):
+    """Feature matrix for a list of bullets, as a dict of NumPy columns."""
+    n = len(texts)
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.float32, count=n)
+    words = np.fromiter((len(t.split()) for t in texts), dtype=np.float32, count=n)
+    metrics = np.fromiter((len(METRIC_PATTERN.findall(t)) for t in texts), dtype=np.float32, count=n)
+    return {
+        "length": lengths,
+        "metric_density": metrics / np.maximum(words, 1.0),
+        "verb_strength": np.fromiter((_verb_strength(t) for t in texts), dtype=np.float32, count=n),
+        "has_currency": np.fromiter((bool(CURRENCY_PATTERN.search(t)) for t in texts), dtype=np.float32, count=n),
+        "has_percent": np.fromiter((bool(PERCENT_PATTERN.search(t)) for t in texts), dtype=np.float32, count=n),
+        "latex_residue": np.fromiter((len(LATEX_PATTERN.findall(t)) for t in texts), dtype=np.float32, count=n),
+    }
+
+
+def score_features(features):
+    """Combine feature columns into a 0-1 quality score per bullet."""
+    lengths = features["length"]
+    # 1.0 inside the ideal band, linear fall-off outside it
+    length_score = np.where(
+        lengths < LENGTH_MIN, lengths / LENGTH_MIN,
+        np.where(lengths > LENGTH_MAX, np.maximum(0.0, 1.0 - (lengths - LENGTH_MAX) / LENGTH_MAX), 1.0)
+    )
+    # ~1 metric every 8 words is plenty
+    metric_score = np.minimum(features["metric_density"] * 8.0, 1.0)
+
+    score = (
+        WEIGHTS["length"] * length_score
+        + WEIGHTS["metric_density"] * metric_score
+        + WEIGHTS["verb_strength"] * features["verb_strength"]
+        + WEIGHTS["has_currency"] * features["has_currency"]
+        + WEIGHTS["has_percent"] * features["has_percent"]
+        - LATEX_PENALTY * np.minimum(features["latex_residue"], 1.0)
+    )
+    return np.clip(score, 0.0, 1.0).round(4)
+
+
+def score_texts(texts):
+    """Returns (scores, features) for a list of bullets."""
+    features = extract_features(texts)
+    return score_features(features), features
+
+
+def feature_row(features, i):
+    """Plain-Python feature dict for row i (for SQLite / Pinecone metadata)."""
+    row = {}
+    for name in FEATURE_COLUMNS:
+        value = float(features[name][i])
+        row[name] = bool(value) if name.startswith("has_") else round(value, 4)
+    return row
+
+
+def score_store(store, only_missing=False):
+    """Score every bullet in the corpus store and write scores + features back. Returns rows scored."""
+    rows = [
+        r for r in store.iter_bullets()
+        if not only_missing or r["quality_score"] is None
+    ]
+    if not rows:
+        return 0
+    scores, features = score_texts([r["text"] for r in rows])
+    store.set_quality(
+        (r["id"], float(scores[i]), feature_row(features, i)) for i, r in enumerate(rows)
+    )
+    return len(rows)
+
+
+def main():
+    store = open_corpus()
+    count = score_store(store)
+    print(f"Scored {count} bullets.\n")
+
+    print(f"{'DOMAIN':<20} | {'COUNT':<6} | {'MEAN':<6} | {'>= 0.6':<6}")
+    print("-" * 47)
+    for domain in store.domains():
+        scores = np.array([r["quality_score"] for r in store.iter_bullets(domain)], dtype=np.float32)
+        if not len(scores):
+            continue
+        print(f"{domain:<20} | {len(scores):<6} | {scores.mean():<6.2f} | {int((scores >= 0.6).sum()):<6}")
+
+    if "--show" in sys.argv:
+        rows = sorted(store.iter_bullets(), key=lambda r: r["quality_score"])
+        print("\nLowest scored:")
+        for r in rows[:5]:
+            print(f"  {r['quality_score']:.2f}  {r['text'][:100]}")
+        print("\nHighest scored:")
+        for r in rows[-5:]:
+            print(f"  {r['quality_score']:.2f}  {r['text'][:100]}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,31 @@
 import os
 import sys
 import json
-import google.generativeai as genai
-from pinecone import Pinecone
+import time
+import threading
+import socketserver
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dotenv import load_dotenv
+from retrieval import query_partitions
+from embeddings import get_provider
+from clients import INDEX_NAME
+import metrics as registry
+
+# Similar-bullet search.
+#
+#   python rag_search.py "query" [IT,Product]                  # one-shot CLI
+#   python rag_search.py --serve [--port 8765] [--socket PATH]  # resident service
+#
+# Service mode keeps the embedding provider and index client warm and speaks
+# HTTP/1.1 with keep-alive, on localhost TCP or a Unix socket:
+#   POST /search        {"query": "...", "top_k": 5, "domains": ["IT"]}
+#   POST /search/batch  {"queries": ["...", ...], "top_k": 5, "domains": {"IT": 1.0}}
+#                       (all queries embedded in one call)
+#   GET  /metrics       request counts, errors, latency percentiles (+ metrics.py series)
+#   GET  /metrics/prometheus  the same series in Prometheus text format
+#   GET  /health
 
 # Load Env
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,49 +35,215 @@ load_dotenv(dotenv_path=env_path)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 
-if not GEMINI_API_KEY or not PINECONE_API_KEY:
-    print(json.dumps({"error": "Missing API Keys"}))
-    sys.exit(1)
+# "pinecone" (remote) or "local" (resident vector_index.py index)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "pinecone")
+
+DEFAULT_PORT = 8765
+MAX_BATCH_QUERIES = 256
+LATENCY_WINDOW = 1000
+
+
+def missing_keys():
+    """Error message if the configured backends lack credentials, else None."""
+    if RETRIEVAL_BACKEND == "pinecone" and not PINECONE_API_KEY:
+        return "Missing API Keys"
+    if os.getenv("EMBEDDING_BACKEND", "gemini") == "gemini" and not GEMINI_API_KEY:
+        return "Missing API Keys"
+    return None
+
+
+def parse_domains(domains):
+    """Accept {"IT": 1.0}, ["IT", "Product"] or "IT,Product"."""
+    if not domains:
+        return None
+    if isinstance(domains, str):
+        domains = domains.split(",")
+    if isinstance(domains, list):
+        return {d: 1.0 for d in domains}
+    return {d: float(w) for d, w in domains.items()}
+
+
+class SearchService:
+    """Embedding provider + index client created once and reused for every query."""
+
+    def __init__(self):
+        if RETRIEVAL_BACKEND == "local":
+            from vector_index import get_vector_index
+            self.local_index = get_vector_index()
+            self.provider = get_provider(self.local_index.provider)
+            self.index = None
+        else:
+            from clients import get_pinecone_index
+            self.local_index = None
+            self.provider = get_provider()
+            self.index = get_pinecone_index(INDEX_NAME)
+        self._pool = ThreadPoolExecutor(max_workers=8)
+
+    def _query(self, vector, top_k, domains):
+        if self.local_index is not None:
+            results = self.local_index.search(vector, top_k, domains)
+        else:
+            results = query_partitions(self.index, vector, top_k, domains)
+        return [{"text": m["text"], "score": m["score"], "domain": m["domain"]} for m in results]
+
+    def search(self, query, top_k=5, domains=None):
+        vector = self.provider.embed_one(query, "retrieval_query")
+        return self._query(vector, top_k, domains)
+
+    def search_batch(self, queries, top_k=5, domains=None):
+        # 1. One embedding call for the whole batch
+        vectors = self.provider.embed(list(queries), "retrieval_query")
+        # 2. Index queries in parallel (network-bound for Pinecone)
+        return list(self._pool.map(lambda v: self._query(v, top_k, domains), vectors))
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = {}
+        self.errors = {}
+        self.queries = 0
+        self.latencies = {}
+
+    def record(self, endpoint, ms, queries=0, error=False):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if error:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            self.queries += queries
+            self.latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(ms)
+
+    def snapshot(self):
+        with self._lock:
+            latency = {}
+            for endpoint, values in self.latencies.items():
+                ordered = sorted(values)
+                pick = lambda pct: ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+                latency[endpoint] = {"p50_ms": round(pick(50), 2), "p95_ms": round(pick(95), 2), "p99_ms": round(pick(99), 2)}
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "queries": self.queries,
+                "latency": latency,
+            }
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    service = None
+    metrics = None
 
-genai.configure(api_key=GEMINI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-INDEX_NAME = "resume-bullets"
+    def log_message(self, format, *args):
+        pass  # metrics instead of per-request access logs
 
-def search(query, top_k=5):
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "backend": RETRIEVAL_BACKEND, "embedding": self.service.provider.name})
+        elif self.path == "/metrics":
+            self._send(200, dict(self.metrics.snapshot(), registry=registry.snapshot()))
+        elif self.path == "/metrics/prometheus":
+            self._send(200, registry.render_prometheus(), "text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        endpoint, queries, status = self.path, 0, 200
+        try:
+            body = self._read_json()
+            top_k = int(body.get("top_k", 5))
+            domains = parse_domains(body.get("domains"))
+            if self.path == "/search":
+                if not body.get("query"):
+                    status, payload = 400, {"error": "No query provided"}
+                else:
+                    queries = 1
+                    payload = self.service.search(body["query"], top_k, domains)
+            elif self.path == "/search/batch":
+                batch = body.get("queries") or []
+                if not batch or len(batch) > MAX_BATCH_QUERIES:
+                    status, payload = 400, {"error": f"Provide 1-{MAX_BATCH_QUERIES} queries"}
+                else:
+                    queries = len(batch)
+                    payload = {"results": self.service.search_batch(batch, top_k, domains)}
+            else:
+                status, payload = 404, {"error": f"Unknown path: {self.path}"}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        self._send(status, payload)
+        elapsed = time.perf_counter() - start
+        self.metrics.record(endpoint, elapsed * 1000, queries, error=status >= 400)
+        registry.inc("search_requests_total", endpoint=endpoint, status=status)
+        registry.observe("search_latency_seconds", elapsed, endpoint=endpoint)
+
+
+class UnixSearchHandler(SearchHandler):
+    def address_string(self):
+        return "unix"
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+    SearchHandler.service = SearchService()
+    SearchHandler.metrics = Metrics()
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, UnixSearchHandler)
+        where = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), SearchHandler)
+        where = f"http://{host}:{port}"
+    print(f"RAG search service ({RETRIEVAL_BACKEND}, {SearchHandler.service.provider.name}) listening on {where}", file=sys.stderr)
     try:
-        # 1. Embed Query
-        embedding_result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=query,
-            task_type="retrieval_query"
-        )
-        vector = embedding_result['embedding']
-
-        # 2. Query Pinecone
-        index = pc.Index(INDEX_NAME)
-        results = index.query(
-            vector=vector,
-            top_k=top_k,
-            include_metadata=True
-        )
-
-        # 3. Format Results
-        matches = []
-        for match in results.matches:
-            matches.append({
-                "text": match.metadata.get("text", ""),
-                "score": match.score,
-                "domain": match.metadata.get("domain", "general")
-            })
-
-        print(json.dumps(matches))
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
+
+def search(query, top_k=5, domains=None):
+    try:
+        print(json.dumps(SearchService().search(query, top_k, domains)))
     except Exception as e:
         print(json.dumps({"error": str(e)}))
 
+
+def _arg(name, default):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    error = missing_keys()
+    if error:
+        print(json.dumps({"error": error}))
+        sys.exit(1)
+
+    if "--serve" in sys.argv:
+        serve(_arg("--host", "127.0.0.1"), int(_arg("--port", DEFAULT_PORT)), _arg("--socket", None))
+    elif len(sys.argv) < 2:
         print(json.dumps({"error": "No query provided"}))
     else:
         query_text = sys.argv[1]
-        search(query_text)
+        # Optional comma-separated domains, e.g. "IT,Product"
+        domains = parse_domains(sys.argv[2]) if len(sys.argv) > 2 else None
+        search(query_text, domains=domains)
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import queue
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Latency guards for remote calls (embeddings, Pinecone).
+#
+# run_with_deadline: runs one call per item on daemon threads and returns
+# whatever finished by the deadline. Stragglers are abandoned, not joined, so
+# they can't hold the process open after the response is written.
+#
+# CircuitBreaker: after N consecutive bad requests (errors or deadline misses)
+# it stays open for a cool-down and callers skip the remote path entirely.
+# After the cool-down it is half-open: exactly one caller claims the probe,
+# everyone else keeps skipping until the probe is recorded (or its claim
+# expires after another cool-down). Each rewrite is its own process, so the
+# state lives in a small JSON file, read and written under a file lock.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+BREAKER_STATE_PATH = os.path.join(script_dir, ".cache", "rag_breaker.json")
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("RAG_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("RAG_BREAKER_COOLDOWN", "60"))
+
+
+def run_with_deadline(fn, items, deadline_seconds):
+    """
+    Call fn(item) for every item concurrently.
+    Returns (results, errors, timed_out): results[i] is None unless item i finished in time without raising.
+    """
+    done = queue.Queue()
+
+    def worker(i, item):
+        try:
+            done.put((i, fn(item), None))
+        except Exception as e:
+            done.put((i, None, e))
+
+    for i, item in enumerate(items):
+        threading.Thread(target=worker, args=(i, item), daemon=True).start()
+
+    results = [None] * len(items)
+    errors = 0
+    received = 0
+    deadline = time.monotonic() + deadline_seconds
+    while received < len(items):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            i, result, error = done.get(timeout=remaining)
+        except queue.Empty:
+            break
+        received += 1
+        if error is not None:
+            errors += 1
+        else:
+            results[i] = result
+    return results, errors, len(items) - received
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock across processes, held for the body of the with block."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CircuitBreaker:
+    def __init__(self, path=BREAKER_STATE_PATH, threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"failures": 0, "open_until": 0, "probe_until": 0}
+
+    def _save(self, state):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def allow(self):
+        """True while closed; once the cool-down passes, True for the single caller that claims the probe."""
+        with _file_lock(self.lock_path):
+            state = self._load()
+            if state.get("failures", 0) < self.threshold:
+                return True
+            now = time.time()
+            if now < state.get("open_until", 0) or now < state.get("probe_until", 0):
+                return False
+            state["probe_until"] = now + self.cooldown
+            self._save(state)
+            return True
+
+    def record(self, ok):
+        with _file_lock(self.lock_path):
+            state = self._load()
+            if ok:
+                state = {"failures": 0, "open_until": 0, "probe_until": 0}
+            else:
+                state["failures"] = state.get("failures", 0) + 1
+                if state["failures"] >= self.threshold:
+                    state["open_until"] = time.time() + self.cooldown
+                    state["probe_until"] = 0
+            self._save(state)
+            return state
@@ -0,0 +1,64 @@
+# Shared Pinecone query helpers for rewriter_rag.py and rag_search.py.
+# vector_db.py writes each domain into its own namespace, so a query can hit
+# only the partition(s) that match the resume instead of the whole index.
+
+from domain_classifier import DOMAIN_KEYWORDS
+
+DEFAULT_NAMESPACE = ""
+
+
+def _format_matches(results, weight=1.0):
+    return [
+        {
+            "id": match.id,
+            "text": match.metadata.get("text", ""),
+            "score": match.score * weight,
+            "domain": match.metadata.get("domain", "general"),
+        }
+        for match in results.matches
+    ]
+
+
+def query_index(index, vector, top_k, query_filter=None, namespace=DEFAULT_NAMESPACE):
+    """Single-namespace query, returned as plain match dicts."""
+    results = index.query(
+        vector=vector,
+        top_k=top_k,
+        include_metadata=True,
+        filter=query_filter,
+        namespace=namespace
+    )
+    return _format_matches(results)
+
+
+def query_partitions(index, vector, top_k, domains=None, query_filter=None):
+    """
+    Query the per-domain namespaces and merge the results.
+    domains: {"IT": 0.7, "Product": 0.3} weights (e.g. from domain_classifier.domain_weights);
+    scores are scaled by weight / max weight before merging. None searches the whole
+    (unpartitioned) index, or every domain namespace when the index was ingested
+    partitioned-only (vector_db.py's default layout).
+    """
+    if not domains:
+        matches = query_index(index, vector, top_k, query_filter)
+        if matches:
+            return matches
+        domains = dict.fromkeys(DOMAIN_KEYWORDS, 1.0)
+
+    top_weight = max(domains.values())
+    matches = []
+    for domain, weight in domains.items():
+        found = query_index(index, vector, top_k, query_filter, namespace=domain)
+        for m in found:
+            m["score"] *= weight / top_weight
+        matches.extend(found)
+
+    # Index ingested before partitioning: fall back to a metadata filter on the default namespace
+    if not matches:
+        domain_filter = {"domain": {"$in": list(domains)}}
+        if query_filter:
+            domain_filter = {"$and": [query_filter, domain_filter]}
+        return query_index(index, vector, top_k, domain_filter)
+
+    matches.sort(key=lambda m: -m["score"])
+    return matches[:top_k]
@@ -2,10 +2,22 @@ import os
 import sys
 import json
 import traceback
-from groq import Groq
 from dotenv import load_dotenv
-import google.generativeai as genai
-from pinecone import Pinecone
+from clients import get_groq_client, get_pinecone_index, INDEX_NAME
+from domain_classifier import domain_weights
+from retrieval import query_partitions
+from bm25 import get_index, lexical_confidence, rrf_fuse
+from embeddings import get_provider
+from example_selector import select_examples
+from prefetch import PrefetchLookup
+from resilience import CircuitBreaker, run_with_deadline
+from tracing import start_trace, span, capture
+from metrics import instrumented_completion
+from prompts import Section, compile_prompt, compact_json, estimate_tokens
+from compact_rewrite import REWRITE_SCHEMA, compact_payload, merge_rewrite, parse_reply
+from semantic_cache import SEMANTIC_CACHE, reuse_similar_entries, remember_similar_entries
+from session_store import (HASH_REUSE, STORE_ERRORS, open_session_store, open_optional_store, is_patch_request,
+                           resolve_patch_request, changed_entries, patch_response, reuse_rewrites, remember_rewrites)
 
 # Load environment variables
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,129 +31,288 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 
-# Configure APIs
-genai.configure(api_key=GEMINI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-INDEX_NAME = "resume-bullets"
+# SDK clients are created on first use (clients.py); embeddings go through embeddings.get_provider
 
-def search_similar_bullets(query_text, top_k=3):
-    """Search Pinecone for similar high-quality bullet examples."""
+# Only retrieve exemplars at or above this quality score (see quality.py)
+MIN_EXAMPLE_QUALITY = float(os.getenv("RAG_MIN_QUALITY", "0.6"))
+
+# "pinecone" (remote) or "local" (resident vector_index.py index, possibly compressed)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "pinecone")
+
+# Skip the embedding call when BM25 results cover this much of the query's IDF mass
+LEXICAL_CONFIDENCE = float(os.getenv("RAG_LEXICAL_CONFIDENCE", "0.5"))
+
+# Candidates fetched per bullet before MMR selection (see example_selector.py)
+EXAMPLE_OVERFETCH = int(os.getenv("RAG_EXAMPLE_OVERFETCH", "4"))
+
+# "rag" (live retrieval per bullet) or "fast" (precomputed exemplar_packs.py, no retrieval)
+REWRITE_MODE = os.getenv("REWRITE_MODE", "rag")
+
+# Retrieval budget per rewrite request; bullets still searching after it are dropped
+RAG_DEADLINE_SECONDS = float(os.getenv("RAG_DEADLINE_MS", "2500")) / 1000
+
+breaker = CircuitBreaker()
+
+def search_similar_bullets(query_text, top_k=3, min_quality=MIN_EXAMPLE_QUALITY, domains=None, raise_errors=False):
+    """
+    Search Pinecone for similar high-quality bullet examples.
+    domains: optional {domain: weight} mix to search only those partitions.
+    raise_errors: propagate failures (for the circuit breaker) instead of returning [].
+    """
     try:
-        embedding_result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=query_text,
-            task_type="retrieval_query"
-        )
-        vector = embedding_result['embedding']
-        
-        index = pc.Index(INDEX_NAME)
-        results = index.query(
-            vector=vector,
-            top_k=top_k,
-            include_metadata=True
-        )
+        if RETRIEVAL_BACKEND == "local":
+            from vector_index import get_vector_index
+            local_index = get_vector_index()
+            # Query with the same embedding backend that built the index
+            vector = get_provider(local_index.provider).embed_one(query_text, "retrieval_query")
+            matches = local_index.search(vector, top_k, domains, min_quality)
+            return [m["text"] for m in matches]
+
+        vector = get_provider().embed_one(query_text, "retrieval_query")
+        index = get_pinecone_index(INDEX_NAME)
+        query_filter = {"quality_score": {"$gte": min_quality}} if min_quality else None
+        matches = query_partitions(index, vector, top_k, domains, query_filter)
+
+        # Index built before quality scoring has no quality_score metadata
+        if not matches and query_filter:
+            print("RAG Search: no scored exemplars, retrying without quality filter", file=sys.stderr)
+            matches = query_partitions(index, vector, top_k, domains)
         
-        return [match.metadata.get("text", "") for match in results.matches]
+        return [m["text"] for m in matches]
     except Exception as e:
         print(f"RAG Search Error: {e}", file=sys.stderr)
+        if raise_errors:
+            raise
+        return []
+
+def lexical_search(query_text, top_k, domains=None, min_quality=MIN_EXAMPLE_QUALITY):
+    """BM25 results from the in-process index ([] if it can't be loaded)."""
+    try:
+        return get_index().search(query_text, top_k, domains, min_quality)
+    except Exception as e:
+        print(f"Lexical Search Error: {e}", file=sys.stderr)
         return []
 
+def retrieve_examples(query_text, top_k=2, domains=None, raise_errors=False):
+    """
+    Hybrid retrieval: BM25 + dense, fused with reciprocal-rank fusion.
+    Lexical-only fast path when BM25 is confident (no embedding call).
+    """
+    lexical = lexical_search(query_text, top_k * 2, domains)
+    if lexical_confidence(lexical, top_k) >= LEXICAL_CONFIDENCE:
+        return [r["text"] for r in lexical[:top_k]]
+
+    dense = search_similar_bullets(query_text, top_k=top_k * 2, domains=domains, raise_errors=raise_errors)
+    return rrf_fuse([dense, [r["text"] for r in lexical]])[:top_k]
+
 def rewrite_with_rag(json_str):
+    trace = start_trace("rewrite")
+    store = None
     try:
         if not json_str:
-            print(json.dumps({"error": "No JSON provided"}))
-            return
+            return {"error": "No JSON provided"}
 
         resume_data = json.loads(json_str)
+        # Set by parser.py when a background prefetch was started (see prefetch.py)
+        session_id = resume_data.pop("_session_id", None)
+        # "fresh": true skips every cache and rewrites from scratch (the new rewrites are still stored)
+        fresh = resume_data.pop("fresh", False) is True
 
         if not GROQ_API_KEY:
-            print(json.dumps({"error": "GROQ_API_KEY missing"}))
-            return
-        if not GEMINI_API_KEY or not PINECONE_API_KEY:
-            print(json.dumps({"error": "GEMINI/PINECONE keys missing - falling back to basic rewrite"}))
-            # Fall back to basic rewriting without RAG
-            pass
+            return {"error": "GROQ_API_KEY missing"}
+        if RETRIEVAL_BACKEND == "pinecone" and (not GEMINI_API_KEY or not PINECONE_API_KEY):
+            # Fall back to basic rewriting without RAG (stdout must stay a single JSON object)
+            print("GEMINI/PINECONE keys missing - falling back to basic rewrite", file=sys.stderr)
+
+        # Patch request: rebuild from the session store and rewrite only the changed entries
+        patch_session, only = None, None
+        if is_patch_request(resume_data):
+            with span("session_resolve") as sp:
+                store = open_session_store()
+                patch_session, version, resume_data, base_doc = resolve_patch_request(store, resume_data)
+                only = changed_entries(base_doc, resume_data)
+                sp.set(version=version, changed=None if only is None else sorted(only))
+            if only == set():
+                return patch_response(patch_session, version, version, resume_data, resume_data)
+
+        def respond(parsed_json, meta):
+            if patch_session:
+                # Metadata rides on the response, not in the stored document
+                new_version = store.append(patch_session, parsed_json, version) if parsed_json != resume_data else version
+                return patch_response(patch_session, version, new_version, resume_data, parsed_json, **meta)
+            parsed_json.update(meta)
+            return parsed_json
 
-        client = Groq(api_key=GROQ_API_KEY)
+        # Entries already rewritten (this or any session) are reused by content hash (session_store.py)
+        cached, send = {}, only
+        if HASH_REUSE and REWRITE_SCHEMA == "compact":
+            with span("hash_reuse", fresh=fresh) as sp:
+                store = store or open_optional_store()
+                if store is not None and not fresh:
+                    try:
+                        cached, send = reuse_rewrites(store, resume_data, "rewrite", only)
+                    except STORE_ERRORS as e:
+                        print(f"Rewrite cache lookup failed ({e}) - rewriting every entry", file=sys.stderr)
+                sp.set(reused=len(cached))
+        if SEMANTIC_CACHE and REWRITE_SCHEMA == "compact" and not fresh:
+            # Near-identical bullets rewritten for other users (semantic_cache.py)
+            with span("semantic_cache") as sp:
+                try:
+                    similar, send = reuse_similar_entries(resume_data, send)
+                    cached.update(similar)
+                    sp.set(reused=len(similar))
+                except Exception as e:
+                    print(f"Semantic cache lookup failed ({e}) - treating as misses", file=sys.stderr)
+        if send is not None and not send:
+            parsed_json, _ = merge_rewrite(resume_data, {"bullets": cached}, only)
+            return respond(parsed_json, {"_rag_status": "reused", "_reused_entries": len(cached), "_rewrite_schema": REWRITE_SCHEMA})
+
+        client = get_groq_client(GROQ_API_KEY)
 
         # 1. Collect all bullets and find similar examples
         all_bullets = []
-        for exp in resume_data.get("experience", []):
-            for bullet in exp.get("bullets", []):
-                all_bullets.append(bullet)
-        for proj in resume_data.get("projects", []):
-            for bullet in proj.get("bullets", []):
-                all_bullets.append(bullet)
-
-        # 2. For each weak bullet, find 2 similar high-quality examples
-        example_bullets = []
-        for bullet in all_bullets[:5]:  # Limit to first 5 to avoid API overload
-            similar = search_similar_bullets(bullet, top_k=2)
-            example_bullets.extend(similar)
-        
-        # Deduplicate
-        example_bullets = list(set(example_bullets))[:10]
+        for i, exp in enumerate(resume_data.get("experience", [])):
+            if send is None or f"e{i}" in send:
+                all_bullets.extend(exp.get("bullets", []))
+        for i, proj in enumerate(resume_data.get("projects", [])):
+            if send is None or f"p{i}" in send:
+                all_bullets.extend(proj.get("bullets", []))
 
-        # 3. Build enhanced prompt with examples
-        examples_text = "\n".join([f"- {b}" for b in example_bullets]) if example_bullets else "No examples available."
+        # 2. Detect the resume's domain(s) so we only search matching partitions
+        domains = domain_weights(resume_data)
+        print(f"RAG domains: {domains}", file=sys.stderr)
 
-        system_prompt = f"""
-        You are a World-Class Resume Writer & Career Coach.
-        Your goal is to REWRITE the provided resume data to be "Perfect".
+        # 3. For each weak bullet, over-fetch similar high-quality examples
+        mode = REWRITE_MODE
+        candidate_lists = []
+        if mode == "fast":
+            try:
+                from exemplar_packs import fast_examples
+                candidate_lists = fast_examples(all_bullets, domains)
+            except Exception as e:
+                print(f"Fast mode unavailable ({e}) - using live retrieval", file=sys.stderr)
+                mode = "rag"
+        prefetched = PrefetchLookup(session_id, domains)
+        rag_status = "full" if candidate_lists else "none"
+        if mode != "fast":
+            query_bullets = all_bullets[:5]  # Limit to first 5 to avoid API overload
+            found = [prefetched.get(bullet) for bullet in query_bullets]
+            pending = [i for i, similar in enumerate(found) if similar is None]
+
+            if pending and not breaker.allow():
+                print("RAG circuit open - skipping retrieval", file=sys.stderr)
+            elif pending:
+                # Search the remaining bullets in parallel; keep whatever is back by the deadline
+                with span("retrieval", bullets=len(pending), prefetched=len(query_bullets) - len(pending)) as sp:
+                    results, errors, timed_out = run_with_deadline(
+                        lambda b: retrieve_examples(b, top_k=EXAMPLE_OVERFETCH, domains=domains, raise_errors=True),
+                        [query_bullets[i] for i in pending],
+                        RAG_DEADLINE_SECONDS,
+                    )
+                    sp.set(errors=errors, timed_out=timed_out)
+                for i, similar in zip(pending, results):
+                    found[i] = similar
+                if errors or timed_out:
+                    print(f"RAG retrieval: {errors} errors, {timed_out} past deadline", file=sys.stderr)
+                breaker.record(ok=not errors and not timed_out)
+
+            candidate_lists = [similar for similar in found if similar is not None]
+            if query_bullets and len(candidate_lists) == len(query_bullets):
+                rag_status = "full"
+            else:
+                rag_status = "partial" if candidate_lists else "none"
+
+        # Stable dedupe + MMR under a token budget (deterministic order)
+        with span("select_examples", candidates=sum(len(c) for c in candidate_lists)) as sp:
+            example_bullets = select_examples(candidate_lists)
+            sp.set(selected=len(example_bullets))
+
+        # 4. Build enhanced prompt with examples (trimmed first if over the token budget)
+        with span("prompt_build") as sp:
+            if REWRITE_SCHEMA == "compact":
+                # Only bullets/summary/soft skills go out; the reply is merged locally (compact_rewrite.py)
+                user_content = f"Resume entries:\n{compact_json(compact_payload(resume_data, send))}"
+                system = compile_prompt(
+                    "rewrite_compact_system", site="rewrite", reserved_tokens=estimate_tokens(user_content),
+                    examples=Section(
+                        example_bullets, fmt=lambda b: f"- {b}",
+                        header="\nREFERENCE EXAMPLES - high-quality bullets from similar roles; match their verbs, metrics and concise phrasing:\n",
+                    ),
+                )
+            else:
+                user_content = f"Resume JSON:\n{compact_json(resume_data)}"
+                system = compile_prompt(
+                    "rewrite_rag_system", site="rewrite", reserved_tokens=estimate_tokens(user_content),
+                    examples=Section(example_bullets, fmt=lambda b: f"- {b}", empty="No examples available."),
+                )
+            messages = [
+                {"role": "system", "content": system.text},
+                {"role": "user", "content": user_content}
+            ]
+            sp.set(prompt_tokens_est=system.tokens + estimate_tokens(user_content), trimmed=system.trimmed)
+        capture("prompt", messages)
+
+        with span("llm_call", model="llama-3.3-70b-versatile") as sp:
+            completion = instrumented_completion(
+                client, "rewrite",
+                messages=messages,
+                model="llama-3.3-70b-versatile",
+                temperature=0.2,
+                stream=False,
+            )
+            result = completion.choices[0].message.content
+            sp.set(response_chars=len(result))
+        capture("llm_response", result)
+
+        with span("decode") as sp:
+            if REWRITE_SCHEMA == "compact":
+                reply = parse_reply(result)
+                if store is not None and HASH_REUSE:
+                    try:
+                        remember_rewrites(store, resume_data, "rewrite", reply)
+                    except STORE_ERRORS as e:
+                        print(f"Rewrites not cached: {e}", file=sys.stderr)
+                if SEMANTIC_CACHE:
+                    try:
+                        remember_similar_entries(resume_data, reply, send)
+                    except Exception as e:
+                        print(f"Semantic cache store failed: {e}", file=sys.stderr)
+                if cached:
+                    bullets = reply.get("bullets") if isinstance(reply.get("bullets"), dict) else {}
+                    reply["bullets"] = {**cached, **bullets}
+                parsed_json, merge_stats = merge_rewrite(resume_data, reply, only)
+                sp.set(**{k: len(v) if isinstance(v, list) else v for k, v in merge_stats.items()})
+            else:
+                result = result.replace("```json", "").replace("```", "").strip()
+                parsed_json = json.loads(result)
 
-        REFERENCE EXAMPLES - These are high-quality bullet points from similar roles:
-        {examples_text}
-        
-        Use these as stylistic inspiration. Match their:
-        - Strong action verbs
-        - Metric-driven results
-        - Concise, impactful phrasing
-        
-        OBJECTIVES:
-        1. **Impactful Bullets**: Rewrite every experience and project bullet using the **STAR Method**.
-        2. **Strong Verbs**: Start every bullet with a power verb (Led, Engineered, Orchestrated, etc.).
-        3. **Optimization**: Remove fluff, filler words, and weak phrasing.
-        
-        CRITICAL RULES:
-        1. **NO HALLUCINATIONS**: Do NOT invent numbers, metrics, companies, or degrees.
-        2. **KEEP STRUCTURE**: Return the EXACT same JSON structure.
-        3. **PROFESSIONAL TONE**: Use formal, punchy professional English.
-        4. **SUMMARY**: Rewrite "profile.summary" to be a compelling 2-sentence elevator pitch.
-        5. **DEDUPLICATION**: If the same role/organization appears in BOTH "experience" AND "responsibilities", REMOVE IT from one section:
-           - Keep PAID work, internships, and jobs in "experience" only.
-           - Keep UNPAID roles, volunteer positions, club activities, and student organizations in "responsibilities" only.
-           - Never output the same role twice.
-        
-        OUTPUT: Strict valid JSON only.
-        """
-
-        completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Resume JSON:\n{json.dumps(resume_data)}"}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.2,
-            stream=False,
-        )
-
-        result = completion.choices[0].message.content
-        result = result.replace("```json", "").replace("```", "").strip()
-        
-        parsed_json = json.loads(result)
-        
         # Add metadata to show RAG was used
-        parsed_json["_rag_enhanced"] = True
-        parsed_json["_examples_used"] = len(example_bullets)
-        
-        print(json.dumps(parsed_json))
+        meta = {
+            "_rag_enhanced": bool(example_bullets),
+            "_examples_used": len(example_bullets),
+            "_rag_status": rag_status,
+            "_rewrite_mode": mode,
+            "_rewrite_schema": REWRITE_SCHEMA,
+        }
+        if cached:
+            meta["_reused_entries"] = len(cached)
+        if session_id:
+            meta["_session_id"] = session_id
+            meta["_prefetch"] = prefetched.report()
+
+        return respond(parsed_json, meta)
 
     except Exception as e:
+        trace.fail(e)
         error_info = {
             "error": str(e),
             "trace": traceback.format_exc()
         }
-        print(json.dumps(error_info))
+        return error_info
+    finally:
+        if store:
+            store.close()
+        trace.finish()
 
 if __name__ == "__main__":
     # Read JSON from stdin to avoid Windows shell escaping issues
@@ -149,4 +320,4 @@ if __name__ == "__main__":
     if not json_input.strip():
         print(json.dumps({"error": "No JSON input provided via stdin"}))
     else:
-        rewrite_with_rag(json_input)
+        print(json.dumps(rewrite_with_rag(json_input)))
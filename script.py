@@ -3,6 +3,7 @@ import re
 import time
 import base64
 import json
+from dedup import MinHashLSH
 
 # CONFIGURATION
 # GITHUB_TOKEN = os.getenv('GITHUB_TOKEN') # Use env var in production
@@ -63,7 +64,9 @@ def clean_bullet(text):
 def scrape_domain(domain_name, roles, companies):
     print(f"\n--- SCRAPING DOMAIN: {domain_name} ---")
     
-    unique_bullets = set()
+    unique_bullets = []
+    lsh = MinHashLSH()
+    duplicates = 0
     
     # SIMPLE STRATEGY: 
     # Query 1 Role + 1 Company at a time to avoid GitHub 256 char limit and 422 errors.
@@ -103,7 +106,11 @@ def scrape_domain(domain_name, roles, companies):
                     for match in found_matches:
                         clean = clean_bullet(match)
                         if is_high_quality(clean):
-                            unique_bullets.add(clean)
+                            # Near-duplicate check (catches reworded copies, not just exact ones)
+                            if lsh.add(len(unique_bullets) + duplicates, clean) is None:
+                                unique_bullets.append(clean)
+                            else:
+                                duplicates += 1
                 
                 time.sleep(0.5) 
             except Exception as e:
@@ -111,7 +118,8 @@ def scrape_domain(domain_name, roles, companies):
                 
         time.sleep(2) # Be kind to API
         
-    return list(unique_bullets)
+    print(f"    Skipped {duplicates} near-duplicate bullets.")
+    return unique_bullets
 
 # MAIN EXECUTION
 all_results = {}
@@ -0,0 +1,351 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import difflib
+import importlib.util
+import threading
+from metrics import record_cache, observe, inc
+from embeddings import get_provider
+from domain_classifier import detect_domain
+from compact_rewrite import entry_ids
+
+# Semantic rewrite cache shared across users.
+# Boilerplate bullets ("Developed REST APIs using Node.js") arrive again and
+# again with small variations; each used to cost a full 70B rewrite. Rewritten
+# bullets are stored per domain with their embedding; a new bullet whose
+# nearest stored neighbour is at least SEMANTIC_CACHE_THRESHOLD similar
+# reuses that rewrite. Reuse is limited to a normalized-exact match or a
+# bullet that differs only in fact tokens (numbers, names, technologies) that
+# the rewrite also contains, which are swapped in. Any other difference - a
+# different verb, a negation, an extra phrase - counts as a miss and falls
+# through to the LLM.
+#
+# Index: local embeddings (SEMANTIC_CACHE_BACKEND, default "hashing": no
+# network, sub-millisecond) bucketed by random-hyperplane LSH, so a lookup
+# scores a few hundred candidates instead of the whole domain. Entries live
+# in SQLite (WAL) so every worker shares them; each process keeps the index
+# in memory and reloads when another process has written.
+# Eviction: least recently hit beyond SEMANTIC_CACHE_MAX_ENTRIES per domain,
+# and anything not hit for SEMANTIC_CACHE_TTL_DAYS.
+# Metrics: cache_requests_total{cache="semantic_rewrite"}, semantic_cache_similarity,
+# semantic_cache_adapted_total, semantic_cache_evictions_total.
+#
+#   python semantic_cache.py [stats|cleanup]
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Off when numpy is missing (embeddings and the LSH index need it); checked without importing it
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "1") == "1" and importlib.util.find_spec("numpy") is not None
+SEMANTIC_CACHE_DB = os.getenv("SEMANTIC_CACHE_DB", os.path.join(script_dir, ".cache", "semantic_cache.db"))
+SEMANTIC_CACHE_BACKEND = os.getenv("SEMANTIC_CACHE_BACKEND", "hashing")
+# Cosine scales differ per backend: one swapped technology in a short bullet
+# scores ~0.78 with the lexical hashing vectors. The threshold only nominates
+# a candidate; adapt() decides whether it can be reused.
+DEFAULT_THRESHOLDS = {"hashing": 0.78, "onnx": 0.92, "gemini": 0.92}
+SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or DEFAULT_THRESHOLDS.get(SEMANTIC_CACHE_BACKEND, 0.92))
+MAX_ENTRIES_PER_DOMAIN = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_DAYS", "14")) * 86400
+LSH_TABLES = 12
+LSH_BITS = 6  # P(same bucket in some table) ~0.96 at cosine 0.78, ~1.0 at 0.9
+LSH_SEED = 1234
+# Articles are the only words adapt() lets differ; "not", "no" and "never" are content
+STOPWORDS = {"a", "an", "the"}
+SIMILARITY_BUCKETS = (0.5, 0.7, 0.8, 0.85, 0.9, 0.92, 0.95, 0.98, 1.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    domain TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    source TEXT NOT NULL,
+    rewrite TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (domain, backend, source)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_domain ON entries(domain, backend, last_hit);
+"""
+
+
+def normalize(text):
+    return re.sub(r'\s+', ' ', text.strip().rstrip(".")).lower()
+
+
+def _words(text):
+    return re.findall(r"[A-Za-z0-9][A-Za-z0-9+#./%$-]*", text)
+
+
+def _is_fact(word, position):
+    """Numbers, names and technologies (Node.js, AWS, GraphQL) - not plain phrasing like "built" or "successfully"."""
+    if not word.isalpha():
+        return True
+    return not word.islower() and not (position == 0 and word[1:].islower())
+
+
+def adapt(source, rewrite, query):
+    """
+    Carry the differences between two near-identical source bullets over to
+    `rewrite`. Only fact-for-fact swaps (Node.js -> Django, 40% -> 25%) whose
+    old term appears in the rewrite are carried; any other difference, such as
+    a different verb, a negation or an extra phrase, returns None.
+    """
+    if normalize(source) == normalize(query):
+        return rewrite
+    src, qry = _words(source), _words(query)
+    adapted = rewrite
+    matcher = difflib.SequenceMatcher(a=[w.lower() for w in src], b=[w.lower() for w in qry], autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        old_words = [(i, w) for i, w in enumerate(src[i1:i2], start=i1) if w.lower() not in STOPWORDS]
+        new_words = [(j, w) for j, w in enumerate(qry[j1:j2], start=j1) if w.lower() not in STOPWORDS]
+        if not old_words and not new_words:
+            continue  # "a" vs "the"
+        if op != "replace" or not old_words or not new_words:
+            return None  # a content word was added or dropped
+        if not all(_is_fact(w, i) for i, w in old_words) or not all(_is_fact(w, j) for j, w in new_words):
+            return None  # phrasing changed, not just a fact
+        old, new = " ".join(src[i1:i2]), " ".join(qry[j1:j2])
+        pattern = re.compile(rf'(?<![A-Za-z0-9]){re.escape(old)}(?![A-Za-z0-9])', re.IGNORECASE)
+        if not pattern.search(adapted):
+            return None  # the rewrite paraphrased the fact; it can't be swapped
+        adapted = pattern.sub(lambda _: new, adapted)
+
+    # Never reuse a number the user didn't write
+    query_numbers = set(re.findall(r'\d+(?:[.,]\d+)?', query))
+    if any(n not in query_numbers for n in re.findall(r'\d+(?:[.,]\d+)?', adapted)):
+        return None
+    return adapted
+
+
+class _DomainIndex:
+    """In-memory LSH index over the cached bullets of one domain."""
+
+    def __init__(self, planes, rows):
+        import numpy as np
+        self.planes = planes
+        self.ids = [r[0] for r in rows]
+        self.sources = [r[1] for r in rows]
+        self.rewrites = [r[2] for r in rows]
+        self.exact = {normalize(s): i for i, s in enumerate(self.sources)}
+        dim = planes.shape[0]
+        self.vectors = np.array([np.frombuffer(r[3], dtype=np.float16) for r in rows], dtype=np.float32).reshape(-1, dim)
+        self.buckets = [dict() for _ in range(LSH_TABLES)]
+        for i, keys in enumerate(self._keys(self.vectors)):
+            for table, key in enumerate(keys):
+                self.buckets[table].setdefault(key, []).append(i)
+
+    def _keys(self, vectors):
+        import numpy as np
+        bits = (vectors @ self.planes > 0).reshape(len(vectors), LSH_TABLES, LSH_BITS)
+        return (bits * (1 << np.arange(LSH_BITS))).sum(axis=2).tolist()
+
+    def add(self, entry_id, source, rewrite, vector):
+        import numpy as np
+        i = len(self.ids)
+        self.ids.append(entry_id)
+        self.sources.append(source)
+        self.rewrites.append(rewrite)
+        self.exact[normalize(source)] = i
+        self.vectors = np.vstack([self.vectors, vector[None, :]])
+        for table, key in enumerate(self._keys(vector[None, :])[0]):
+            self.buckets[table].setdefault(key, []).append(i)
+
+    def nearest(self, text, vector):
+        """(row, similarity) of the closest cached bullet, or (None, 0.0)."""
+        import numpy as np
+        if normalize(text) in self.exact:
+            return self.exact[normalize(text)], 1.0
+        candidates = set()
+        for table, key in enumerate(self._keys(vector[None, :])[0]):
+            candidates.update(self.buckets[table].get(key, ()))
+        if not candidates:
+            return None, 0.0
+        rows = np.fromiter(candidates, dtype=np.int64)
+        scores = self.vectors[rows] @ vector
+        best = int(np.argmax(scores))
+        return int(rows[best]), float(scores[best])
+
+
+class SemanticCache:
+    def __init__(self, path=SEMANTIC_CACHE_DB, backend=SEMANTIC_CACHE_BACKEND, threshold=SIMILARITY_THRESHOLD):
+        import numpy as np
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.backend = backend
+        self.threshold = threshold
+        self.provider = get_provider(backend)
+        self.planes = np.random.default_rng(LSH_SEED).standard_normal(
+            (self.provider.dimension, LSH_TABLES * LSH_BITS)).astype(np.float32)
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()  # bullet_rewriter.py serves from several threads
+        self._indexes = {}
+        self._data_version = None
+
+    def close(self):
+        self.conn.close()
+
+    def _embed(self, texts):
+        import numpy as np
+        vectors = np.asarray(self.provider.embed(texts, "retrieval_query"), dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _index(self, domain):
+        # data_version changes whenever another connection commits: reload lazily
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._indexes, self._data_version = {}, version
+        if domain not in self._indexes:
+            rows = self.conn.execute(
+                "SELECT id, source, rewrite, vector FROM entries WHERE domain = ? AND backend = ? AND last_hit >= ?",
+                (domain, self.backend, time.time() - TTL_SECONDS),
+            ).fetchall()
+            self._indexes[domain] = _DomainIndex(self.planes, rows)
+        return self._indexes[domain]
+
+    def lookup(self, texts, domain):
+        """Cached (adapted) rewrite for each text, None on a miss."""
+        if not texts:
+            return []
+        vectors = self._embed(texts)
+        results, hit_ids = [], []
+        with self._lock:
+            index = self._index(domain)
+            for text, vector in zip(texts, vectors):
+                row, score = index.nearest(text, vector) if index.ids else (None, 0.0)
+                rewrite = None
+                if row is not None:
+                    observe("semantic_cache_similarity", score, buckets=SIMILARITY_BUCKETS)
+                    if score >= self.threshold:
+                        rewrite = adapt(index.sources[row], index.rewrites[row], text)
+                        if rewrite is not None and rewrite != index.rewrites[row]:
+                            inc("semantic_cache_adapted_total")
+                record_cache("semantic_rewrite", rewrite is not None)
+                if rewrite is not None:
+                    hit_ids.append(index.ids[row])
+                results.append(rewrite)
+            if hit_ids:
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE entries SET hits = hits + 1, last_hit = ? WHERE id = ?",
+                        [(time.time(), i) for i in hit_ids],
+                    )
+                self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        return results
+
+    def store(self, pairs, domain):
+        """Remember (source bullet, rewrite) pairs; unchanged bullets are skipped."""
+        pairs = [(s.strip(), r.strip()) for s, r in pairs if s.strip() and r.strip() and normalize(s) != normalize(r)]
+        if not pairs:
+            return
+        vectors = self._embed([s for s, _ in pairs])
+        now = time.time()
+        with self._lock:
+            index = self._index(domain)
+            with self.conn:
+                for (source, rewrite), vector in zip(pairs, vectors):
+                    cursor = self.conn.execute(
+                        "INSERT OR IGNORE INTO entries (domain, backend, source, rewrite, vector, created_at, last_hit) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (domain, self.backend, source, rewrite, vector.astype("float16").tobytes(), now, now),
+                    )
+                    if cursor.rowcount:
+                        index.add(cursor.lastrowid, source, rewrite, vector)
+                evicted = self._evict(domain)
+            if evicted:
+                inc("semantic_cache_evictions_total", evicted)
+                self._indexes.pop(domain, None)
+            self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _evict(self, domain):
+        """Least recently hit entries beyond MAX_ENTRIES_PER_DOMAIN."""
+        return self.conn.execute(
+            "DELETE FROM entries WHERE id IN (SELECT id FROM entries WHERE domain = ? AND backend = ? "
+            "ORDER BY last_hit DESC LIMIT -1 OFFSET ?)",
+            (domain, self.backend, MAX_ENTRIES_PER_DOMAIN),
+        ).rowcount
+
+    def cleanup(self):
+        """Drop entries not hit within the TTL. Returns rows deleted."""
+        with self._lock, self.conn:
+            deleted = self.conn.execute("DELETE FROM entries WHERE last_hit < ?", (time.time() - TTL_SECONDS,)).rowcount
+            self._indexes = {}
+        return deleted
+
+    def stats(self):
+        return [
+            {"domain": r[0], "backend": r[1], "entries": r[2], "hits": r[3]}
+            for r in self.conn.execute(
+                "SELECT domain, backend, COUNT(*), SUM(hits) FROM entries GROUP BY domain, backend ORDER BY domain")
+        ]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """Process-wide cache instance (opened on first use)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache()
+        return _cache
+
+
+def reuse_similar_entries(resume, only=None):
+    """
+    Compact-rewrite entries (see compact_rewrite.py) whose every bullet has a
+    cached rewrite: returns ({entry_id: bullets}, the `only` set still to send).
+    """
+    wanted = [eid for eid in entry_ids(resume) if only is None or eid in only]
+    remaining = set(only) if only is not None else set(wanted) | {"summary"}
+    sections = entry_ids(resume)
+    bullets = {eid: resume[sections[eid][0]][sections[eid][1]].get("bullets") or [] for eid in wanted}
+    texts = [b for eid in wanted for b in bullets[eid] if isinstance(b, str)]
+    if not texts:
+        return {}, remaining
+    found = dict(zip(texts, get_semantic_cache().lookup(texts, detect_domain(resume))))
+    reused = {}
+    for eid in wanted:
+        if bullets[eid] and all(isinstance(b, str) and found.get(b) for b in bullets[eid]):
+            reused[eid] = [found[b] for b in bullets[eid]]
+            remaining.discard(eid)
+    return reused, remaining
+
+
+def remember_similar_entries(resume, reply, only=None):
+    """Cache bullet pairs from a compact rewrite reply where the entry kept its bullet count (1:1 by position)."""
+    sections = entry_ids(resume)
+    pairs = []
+    for eid, rewritten in ((reply.get("bullets") or {}) if isinstance(reply.get("bullets"), dict) else {}).items():
+        if eid not in sections or (only is not None and eid not in only) or not isinstance(rewritten, list):
+            continue
+        original = resume[sections[eid][0]][sections[eid][1]].get("bullets") or []
+        if len(original) == len(rewritten):
+            pairs.extend((o, r) for o, r in zip(original, rewritten) if isinstance(o, str) and isinstance(r, str))
+    if pairs:
+        get_semantic_cache().store(pairs, detect_domain(resume))
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = SemanticCache()
+    if command == "cleanup":
+        print(f"Deleted {cache.cleanup()} entries from {SEMANTIC_CACHE_DB}")
+    elif command == "stats":
+        print(f"{'DOMAIN':<20} | {'BACKEND':<8} | {'ENTRIES':<7} | HITS")
+        print("-" * 50)
+        for row in cache.stats():
+            print(f"{row['domain']:<20} | {row['backend']:<8} | {row['entries']:<7} | {row['hits']}")
+    else:
+        print(f"Unknown command: {command} (use stats or cleanup)")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
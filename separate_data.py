@@ -1,43 +1,46 @@
 import json
-import os
+from dedup import MinHashLSH, dedupe_bullets, print_report
+from corpus_store import open_corpus
 
 def main():
     # Load Real Data
     with open('cleaned_resumes.json', 'r', encoding='utf-8') as f:
         real_data = json.load(f)
 
-    # Load Mixed Data (Real + Synthetic)
-    if os.path.exists('augmented_resumes.json'):
-        with open('augmented_resumes.json', 'r', encoding='utf-8') as f:
-            mixed_data = json.load(f)
-    else:
-        mixed_data = real_data # Fallback if no specific augmented file yet
+    # Load Mixed Data (Real + Synthetic) from the corpus store
+    store = open_corpus()
+    existing_domains = set(store.domains())
 
-    structured_data = {}
+    dedup_report = {}
 
     for domain in real_data.keys():
         real_points = real_data.get(domain, [])
-        mixed_points = mixed_data.get(domain, [])
+        if domain in existing_domains:
+            mixed_points = store.texts(domain, 'real') + store.texts(domain, 'synthetic')
+        else:
+            mixed_points = real_points # Fallback if no augmented data for this domain yet
         
         # Identify Synthetic (points in Mixed but not in Real)
         # Using sets for easy subtraction, but need to be careful with exact string matching
         real_set = set(real_points)
         synthetic_points = [p for p in mixed_points if p not in real_set]
-        
-        structured_data[domain] = {
-            "real": real_points,
-            "synthetic": synthetic_points
-        }
 
-    # Save new structure
-    with open('augmented_resumes.json', 'w', encoding='utf-8') as f:
-        json.dump(structured_data, f, indent=2, ensure_ascii=False)
+        # Drop near-duplicates (jittered/humanized variants) against real + earlier synthetic
+        lsh = MinHashLSH()
+        real_points, real_removed = dedupe_bullets(real_points, lsh, key_prefix="real_")
+        synthetic_points, synth_removed = dedupe_bullets(synthetic_points, lsh, key_prefix="synthetic_")
+        dedup_report[domain] = {"real": len(real_removed), "synthetic": len(synth_removed)}
+        
+        # Save new structure (per-domain transaction)
+        store.replace_domain(domain, real_points, synthetic_points)
 
-    print("Successfully separated Real vs Synthetic data in augmented_resumes.json")
+    print("Successfully separated Real vs Synthetic data in the corpus store")
+    print_report(dedup_report)
     
     # Stats
-    for d, counts in structured_data.items():
-        print(f"{d}: {len(counts['real'])} Real, {len(counts['synthetic'])} Synthetic")
+    for d in real_data.keys():
+        print(f"{d}: {store.count(d, 'real')} Real, {store.count(d, 'synthetic')} Synthetic")
+    store.close()
 
 if __name__ == "__main__":
     main()
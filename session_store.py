@@ -0,0 +1,406 @@
+import os
+import sys
+import json
+import random
+import time
+import uuid
+import sqlite3
+import hashlib
+from json_patch import apply_patch, make_patch
+from compact_rewrite import ENTRY_SECTIONS
+
+# Server-side resume sessions for patch-based requests.
+# Instead of posting the whole resume on every step, the browser sends
+#
+#   {"document": {...}}                                          # first request
+#   {"session_id": "...", "base_version": 3, "patch": [ops]}     # later edits
+#
+# The store rebuilds the document from the base version plus the JSON Patch,
+# records it as a new version, and the entry points process only the entries
+# that changed and answer with a patch of their own.
+#
+# Besides sessions it keeps work keyed by content hash, shared by every session
+# and worker process (WAL: readers never block each other or the writer):
+#   parses    extracted PDF text hash -> parsed resume      (parser.py)
+#   findings  entry hash + section    -> analysis findings  (analyzer.py)
+#   rewrites  entry hash + site       -> rewritten bullets  (rewriter*.py)
+# so an entry that was already analysed or rewritten, in any session, is not
+# sent to the model again. Rows older than the TTLs are removed by cleanup()
+# (run occasionally on open, or `python session_store.py cleanup`). A request
+# with "fresh": true bypasses the rewrite cache (the rewriters still store the
+# new result).
+#
+#   python session_store.py [stats|cleanup]
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SESSION_DB = os.getenv("SESSION_DB", os.path.join(script_dir, ".cache", "sessions.db"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_HOURS", "24")) * 3600
+HASH_TTL_SECONDS = float(os.getenv("SESSION_HASH_TTL_DAYS", "30")) * 86400
+CLEANUP_PROBABILITY = 0.02  # per open; keeps the DB bounded without a cron job
+HASH_REUSE = os.getenv("SESSION_HASH_REUSE", "1") == "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    session_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    doc TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, version)
+);
+CREATE TABLE IF NOT EXISTS results (
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, kind)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    session_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    entry_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (session_id, version, entry_id)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_hash ON entries(hash);
+CREATE TABLE IF NOT EXISTS parses (
+    hash TEXT PRIMARY KEY,
+    doc TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    hash TEXT NOT NULL,
+    section TEXT NOT NULL,
+    findings TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (hash, section)
+);
+CREATE TABLE IF NOT EXISTS rewrites (
+    hash TEXT NOT NULL,
+    site TEXT NOT NULL,
+    bullets TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (hash, site)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_created ON documents(created_at);
+"""
+
+# Tables keyed by content hash, cleaned up after HASH_TTL_SECONDS
+HASH_TABLES = ("parses", "findings", "rewrites")
+
+
+# Hash reuse only saves model calls: outside patch requests these errors mean
+# "recompute / don't save", never a failed request
+STORE_ERRORS = (sqlite3.Error, OSError)
+
+
+class VersionConflict(Exception):
+    pass
+
+
+def entry_hash(entry):
+    """Content hash of an entry; the per-document "id" is left out so identical entries match across sessions."""
+    if isinstance(entry, dict):
+        entry = {k: v for k, v in entry.items() if k != "id"}
+    return hashlib.sha1(json.dumps(entry, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def entry_hashes(doc):
+    """{entry_id: hash} for every entry, ids as in compact_rewrite.py (e0, p1, r0)."""
+    hashes = {}
+    for section, prefix, _, _ in ENTRY_SECTIONS:
+        for i, entry in enumerate(doc.get(section) or []):
+            if isinstance(entry, dict):
+                hashes[f"{prefix}{i}"] = entry_hash(entry)
+    return hashes
+
+
+class SessionStore:
+    def __init__(self, path=SESSION_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; only the last commits can be lost on power failure
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Sessions ---
+
+    def _insert_version(self, session_id, version, doc):
+        self.conn.execute(
+            "INSERT INTO documents (session_id, version, doc, created_at) VALUES (?, ?, ?, ?)",
+            (session_id, version, json.dumps(doc), time.time()),
+        )
+        self.conn.executemany(
+            "INSERT INTO entries (session_id, version, entry_id, hash) VALUES (?, ?, ?, ?)",
+            [(session_id, version, eid, h) for eid, h in entry_hashes(doc).items()],
+        )
+
+    def create(self, doc):
+        """New session holding `doc` as version 1."""
+        session_id = uuid.uuid4().hex
+        with self.conn:
+            self._insert_version(session_id, 1, doc)
+        return session_id, 1
+
+    def get(self, session_id, version=None):
+        """(version, doc) - latest when version is None - or None if unknown."""
+        if version is None:
+            row = self.conn.execute(
+                "SELECT version, doc FROM documents WHERE session_id = ? ORDER BY version DESC LIMIT 1",
+                (session_id,),
+            ).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT version, doc FROM documents WHERE session_id = ? AND version = ?",
+                (session_id, version),
+            ).fetchone()
+        return (row["version"], json.loads(row["doc"])) if row else None
+
+    def append(self, session_id, doc, base_version):
+        """Store `doc` as the version after `base_version`; VersionConflict if that is no longer the latest."""
+        try:
+            with self.conn:
+                # Take the write lock before reading, so two appends can't both see the same latest
+                self.conn.execute("BEGIN IMMEDIATE")
+                latest = self.conn.execute(
+                    "SELECT MAX(version) FROM documents WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                if latest != base_version:
+                    raise VersionConflict(f"Base version {base_version} is stale (latest is {latest})")
+                self._insert_version(session_id, base_version + 1, doc)
+        except sqlite3.IntegrityError:
+            raise VersionConflict(f"Base version {base_version} is stale (version {base_version + 1} exists)")
+        return base_version + 1
+
+    def versions(self, session_id):
+        return [r[0] for r in self.conn.execute(
+            "SELECT version FROM documents WHERE session_id = ? ORDER BY version", (session_id,))]
+
+    def hashes(self, session_id, version):
+        """{entry_id: hash} of a stored version, without loading the document."""
+        return {r["entry_id"]: r["hash"] for r in self.conn.execute(
+            "SELECT entry_id, hash FROM entries WHERE session_id = ? AND version = ?", (session_id, version))}
+
+    def save_result(self, session_id, kind, version, result):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (session_id, kind, version, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, kind, version, json.dumps(result), time.time()),
+            )
+
+    def get_result(self, session_id, kind):
+        """(version, result) of the latest stored result of `kind`, or None."""
+        row = self.conn.execute(
+            "SELECT version, result FROM results WHERE session_id = ? AND kind = ?", (session_id, kind)
+        ).fetchone()
+        return (row["version"], json.loads(row["result"])) if row else None
+
+    # --- Work keyed by content hash ---
+
+    def get_parse(self, hash):
+        row = self.conn.execute("SELECT doc FROM parses WHERE hash = ?", (hash,)).fetchone()
+        return json.loads(row["doc"]) if row else None
+
+    def save_parse(self, hash, doc):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parses (hash, doc, created_at) VALUES (?, ?, ?)",
+                (hash, json.dumps(doc), time.time()),
+            )
+
+    def _lookup(self, table, key_column, value_column, hashes, key):
+        if not hashes:
+            return {}
+        hashes = list(set(hashes))
+        found = {}
+        for start in range(0, len(hashes), 500):  # stay under SQLite's bound-parameter limit
+            chunk = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, {value_column} FROM {table} WHERE {key_column} = ? AND hash IN ({','.join('?' * len(chunk))})",
+                [key] + chunk,
+            )
+            found.update((r[0], json.loads(r[1])) for r in rows)
+        return found
+
+    def get_findings(self, hashes, section):
+        """{hash: findings} for the entry hashes already analysed in `section`."""
+        return self._lookup("findings", "section", "findings", hashes, section)
+
+    def save_findings(self, section, findings_by_hash):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO findings (hash, section, findings, created_at) VALUES (?, ?, ?, ?)",
+                [(h, section, json.dumps(f), now) for h, f in findings_by_hash.items()],
+            )
+
+    def get_rewrites(self, hashes, site):
+        """{hash: bullets} for the entry hashes already rewritten at `site`."""
+        return self._lookup("rewrites", "site", "bullets", hashes, site)
+
+    def save_rewrites(self, site, bullets_by_hash):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rewrites (hash, site, bullets, created_at) VALUES (?, ?, ?, ?)",
+                [(h, site, json.dumps(b), now) for h, b in bullets_by_hash.items()],
+            )
+
+    # --- Maintenance ---
+
+    def cleanup(self, session_ttl=SESSION_TTL_SECONDS, hash_ttl=HASH_TTL_SECONDS):
+        """Drop sessions idle longer than session_ttl and hash-keyed work older than hash_ttl. Returns rows deleted."""
+        now = time.time()
+        deleted = 0
+        with self.conn:
+            expired = [r[0] for r in self.conn.execute(
+                "SELECT session_id FROM documents GROUP BY session_id HAVING MAX(created_at) < ?", (now - session_ttl,))]
+            for start in range(0, len(expired), 500):
+                chunk = expired[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for table in ("documents", "entries", "results"):
+                    deleted += self.conn.execute(f"DELETE FROM {table} WHERE session_id IN ({marks})", chunk).rowcount
+            for table in HASH_TABLES:
+                deleted += self.conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (now - hash_ttl,)).rowcount
+        return deleted
+
+    def stats(self):
+        counts = {table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("documents", "entries", "results") + HASH_TABLES}
+        counts["sessions"] = self.conn.execute("SELECT COUNT(DISTINCT session_id) FROM documents").fetchone()[0]
+        return counts
+
+
+def open_session_store(path=SESSION_DB):
+    store = SessionStore(path)
+    if random.random() < CLEANUP_PROBABILITY:
+        try:
+            store.cleanup()
+        except sqlite3.OperationalError as e:  # another worker holds the write lock; try next time
+            print(f"Session store cleanup skipped: {e}", file=sys.stderr)
+    return store
+
+
+def open_optional_store(path=SESSION_DB):
+    """open_session_store(), or None (logged) when the store can't be opened."""
+    try:
+        return open_session_store(path)
+    except STORE_ERRORS as e:
+        print(f"Session store unavailable ({e}) - continuing without hash reuse", file=sys.stderr)
+        return None
+
+
+def is_patch_request(body):
+    if not isinstance(body, dict) or "profile" in body:
+        return False
+    return "document" in body or "patch" in body or ("session_id" in body and "base_version" in body)
+
+
+def resolve_patch_request(store, body):
+    """
+    (session_id, version, doc, base_doc) for a patch request. base_doc is the
+    document before the patch (None for a new session); the patched document
+    is stored as a new version.
+    """
+    if "document" in body and not body.get("session_id"):
+        session_id, version = store.create(body["document"])
+        return session_id, version, body["document"], None
+
+    session_id, base_version = body.get("session_id"), body.get("base_version")
+    if "patch" in body and not isinstance(base_version, int):
+        # Without it the patch would silently apply to whatever version is latest
+        raise ValueError("base_version (an integer) is required with a patch")
+    found = store.get(session_id, base_version) if session_id else None
+    if found is None:
+        raise KeyError(f"Unknown session/version: {session_id}@{base_version}")
+    base_version, base_doc = found
+    ops = body.get("patch") or []
+    if not ops:
+        return session_id, base_version, base_doc, base_doc
+    doc = apply_patch(base_doc, ops)
+    return session_id, store.append(session_id, doc, base_version), doc, base_doc
+
+
+def changed_entries(base_doc, doc):
+    """
+    Compact entry ids (e0, p1, r0 - see compact_rewrite.py) of entries in `doc`
+    whose content is not in `base_doc`, plus "summary" if the profile summary
+    changed. None when there is no base (everything is new).
+    """
+    if base_doc is None:
+        return None
+    changed = set()
+    for section, prefix, _, _ in ENTRY_SECTIONS:
+        before = {entry_hash(e) for e in base_doc.get(section) or []}
+        for i, entry in enumerate(doc.get(section) or []):
+            if entry_hash(entry) not in before:
+                changed.add(f"{prefix}{i}")
+    if (base_doc.get("profile") or {}).get("summary") != (doc.get("profile") or {}).get("summary"):
+        changed.add("summary")
+    return changed
+
+
+def patch_response(session_id, base_version, version, before, after, **meta):
+    """Response body: the patch from `before` (the client's copy) to `after`."""
+    response = {"session_id": session_id, "base_version": base_version, "version": version,
+                "patch": make_patch(before, after)}
+    response.update(meta)
+    return response
+
+
+def reuse_rewrites(store, resume, site, only=None):
+    """
+    Bullets already rewritten at `site` for entries identical to ones in
+    `resume`: returns ({entry_id: bullets}, the `only` set still to send).
+    """
+    hashes = entry_hashes(resume)
+    wanted = {eid: h for eid, h in hashes.items() if only is None or eid in only}
+    found = store.get_rewrites(wanted.values(), site)
+    cached = {eid: found[h] for eid, h in wanted.items() if h in found}
+    remaining = set(wanted) - set(cached)
+    if only is None or "summary" in only:
+        remaining.add("summary")
+    return cached, remaining
+
+
+def remember_rewrites(store, resume, site, reply):
+    """Store the bullets of a compact rewrite reply under the hashes of the original entries."""
+    hashes = entry_hashes(resume)
+    bullets = reply.get("bullets") if isinstance(reply, dict) else None
+    if not isinstance(bullets, dict):
+        return
+    store.save_rewrites(site, {
+        hashes[eid]: value for eid, value in bullets.items()
+        if eid in hashes and isinstance(value, list) and value and all(isinstance(b, str) for b in value)
+    })
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    with SessionStore(SESSION_DB) as store:
+        if command == "cleanup":
+            print(f"Deleted {store.cleanup()} rows from {SESSION_DB}")
+        elif command == "stats":
+            for table, count in store.stats().items():
+                print(f"{table:<10} {count}")
+        else:
+            print(f"Unknown command: {command} (use stats or cleanup)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,22 @@
 import os
-import google.generativeai as genai
+import sys
 from dotenv import load_dotenv
+from embeddings import get_provider
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, "web", ".env")
 load_dotenv(dotenv_path=env_path)
 
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
+# Optional backend override: python test_embedding.py hashing
+backend = sys.argv[1] if len(sys.argv) > 1 else os.getenv("EMBEDDING_BACKEND", "gemini")
+
+if backend == "gemini" and not os.getenv("GEMINI_API_KEY"):
     print("Error: GEMINI_API_KEY missing")
     exit(1)
 
-genai.configure(api_key=api_key)
-
 try:
-    print("Testing Embedding Generation...")
-    result = genai.embed_content(
-        model="models/text-embedding-004",
-        content="Hello world",
-        task_type="retrieval_query"
-    )
-    print("Success! Embedding length:", len(result['embedding']))
+    print(f"Testing Embedding Generation ({backend})...")
+    embedding = get_provider(backend).embed_one("Hello world", "retrieval_query")
+    print("Success! Embedding length:", len(embedding))
 except Exception as e:
     print("Error:", e)
@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Lightweight per-request tracing.
+#
+#   trace = start_trace("parse")
+#   with span("extract") as s:
+#       ...
+#       s.set(chars=len(text))
+#   capture("extracted_text", text)     # kept only with TRACE_CAPTURE_PAYLOADS=1
+#   trace.finish()
+#
+# Finished traces go to an in-memory ring buffer (recent_traces()). A sampled
+# share is appended to TRACE_EXPORT_PATH as JSONL, errored traces always are
+# when export is on. Nothing touches disk on the request path by default.
+#
+#   TRACE_SAMPLE_RATE       0..1 share of traces exported (default 0 = off)
+#   TRACE_EXPORT_PATH       JSONL file (default .cache/traces.jsonl)
+#   TRACE_CAPTURE_PAYLOADS  "1" to keep payloads (prompts, raw LLM text) on traces
+#   TRACE_STDERR            "1" to print a one-line timing summary per trace
+#   REQUEST_ID              request id to adopt (e.g. passed down by the web route)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", os.path.join(script_dir, ".cache", "traces.jsonl"))
+TRACE_CAPTURE_PAYLOADS = os.getenv("TRACE_CAPTURE_PAYLOADS") == "1"
+TRACE_STDERR = os.getenv("TRACE_STDERR") == "1"
+TRACE_BUFFER_SIZE = 256
+
+_buffer = deque(maxlen=TRACE_BUFFER_SIZE)
+_export_lock = threading.Lock()
+_current = contextvars.ContextVar("current_trace", default=None)
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, trace_start):
+        out = {
+            "name": self.name,
+            "offset_ms": round((self.start - trace_start) * 1000, 2),
+            "duration_ms": self.duration_ms,
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class Trace:
+    def __init__(self, name, request_id=None):
+        self.name = name
+        self.request_id = request_id or os.getenv("REQUEST_ID") or uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.payloads = {}
+        self.error = None
+        self.duration_ms = None
+        self._token = None
+
+    @contextmanager
+    def span(self, name, **attrs):
+        s = Span(name, attrs)
+        try:
+            yield s
+        except Exception as e:
+            s.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            s.duration_ms = round((time.perf_counter() - s.start) * 1000, 2)
+            self.spans.append(s)
+
+    def capture(self, name, payload):
+        if TRACE_CAPTURE_PAYLOADS:
+            self.payloads[name] = payload
+
+    def fail(self, error):
+        self.error = str(error)
+
+    def to_dict(self):
+        out = {
+            "request_id": self.request_id,
+            "name": self.name,
+            "started_at": round(self.started_at, 3),
+            "duration_ms": self.duration_ms,
+            "spans": [s.to_dict(self.start) for s in self.spans],
+        }
+        if self.error:
+            out["error"] = self.error
+        if self.payloads:
+            out["payloads"] = self.payloads
+        return out
+
+    def finish(self):
+        if self.duration_ms is not None:
+            return self
+        self.duration_ms = round((time.perf_counter() - self.start) * 1000, 2)
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        _buffer.append(self)
+
+        if TRACE_STDERR:
+            parts = " ".join(f"{s.name}={s.duration_ms}ms" for s in self.spans)
+            print(f"[trace {self.request_id}] {self.name} {self.duration_ms}ms {parts}", file=sys.stderr)
+        if TRACE_SAMPLE_RATE > 0 and (self.error or random.random() < TRACE_SAMPLE_RATE):
+            _export(self)
+        return self
+
+
+def _export(trace):
+    line = json.dumps(trace.to_dict(), ensure_ascii=False)
+    try:
+        with _export_lock:
+            os.makedirs(os.path.dirname(TRACE_EXPORT_PATH) or ".", exist_ok=True)
+            with open(TRACE_EXPORT_PATH, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"Trace export failed: {e}", file=sys.stderr)
+
+
+def start_trace(name, request_id=None):
+    """Start a trace and make it current for span()/capture() in this thread/context."""
+    trace = Trace(name, request_id)
+    trace._token = _current.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    """Span on the current trace; a no-op recorder when no trace is active."""
+    trace = _current.get()
+    if trace is None:
+        yield Span(name, attrs)
+        return
+    with trace.span(name, **attrs) as s:
+        yield s
+
+
+def capture(name, payload):
+    trace = _current.get()
+    if trace is not None:
+        trace.capture(name, payload)
+
+
+def recent_traces(limit=None):
+    traces = [t.to_dict() for t in list(_buffer)]
+    return traces[-limit:] if limit else traces
+
+
+if __name__ == "__main__":
+    # Usage: python tracing.py [N]  -> summary of the last N exported traces
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    if not os.path.exists(TRACE_EXPORT_PATH):
+        print(f"No exported traces at {TRACE_EXPORT_PATH} (set TRACE_SAMPLE_RATE)")
+        sys.exit(0)
+    with open(TRACE_EXPORT_PATH, 'r', encoding='utf-8') as f:
+        lines = f.readlines()[-limit:]
+    for line in lines:
+        t = json.loads(line)
+        spans = ", ".join(f"{s['name']} {s['duration_ms']}ms" for s in t["spans"])
+        status = f" ERROR {t['error']}" if t.get("error") else ""
+        print(f"{t['request_id']} {t['name']:<8} {t['duration_ms']:>9}ms  {spans}{status}")
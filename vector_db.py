@@ -1,48 +1,49 @@
 import os
-import json
+import sys
 import time
-import google.generativeai as genai
-from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
+from clients import get_pinecone_client, INDEX_NAME
+from corpus_store import open_corpus
+from quality import FEATURE_COLUMNS, score_store
+from bm25 import build_from_store
+from embeddings import get_provider
 
 # Load Env
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 
-if not GEMINI_API_KEY:
-    print("Error: GEMINI_API_KEY missing.")
-    exit(1)
-if not PINECONE_API_KEY:
-    print("Error: PINECONE_API_KEY missing. Please add it to .env")
-    exit(1)
+BATCH_SIZE = 50
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-
-# Configure Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-INDEX_NAME = "resume-bullets"
-
-def get_embedding(text):
-    # Use Gemini's text-embedding-004
+def get_embeddings(texts):
+    # Embedding backend from EMBEDDING_BACKEND (Gemini text-embedding-004 by default), one call per batch
     try:
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text,
-            task_type="retrieval_document",
-            title="Resume Bullet Point"
-        )
-        return result['embedding']
+        return get_provider().embed(texts, "retrieval_document", title="Resume Bullet Point")
     except Exception as e:
-        print(f"Error embedding text: {e}")
+        print(f"Error embedding batch: {e}")
         return None
 
 import traceback
 
+def check_keys():
+    if os.getenv("EMBEDDING_BACKEND", "gemini") == "gemini" and not GEMINI_API_KEY:
+        print("Error: GEMINI_API_KEY missing.")
+        return False
+    if not PINECONE_API_KEY:
+        print("Error: PINECONE_API_KEY missing. Please add it to .env")
+        return False
+    return True
+
 def main():
+    # Bulk ingest: embedding calls yield to live requests (llm_scheduler.py)
+    os.environ.setdefault("LLM_PRIORITY", "batch")
+    if not check_keys():
+        sys.exit(1)
+
     try:
         # 1. Setup Index
+        from pinecone import ServerlessSpec
+        pc = get_pinecone_client(PINECONE_API_KEY)
         print(f"Using Key: {PINECONE_API_KEY[:10]}...") 
         
         # Get index names safely for V5
@@ -78,52 +79,65 @@ def main():
         
         index = pc.Index(INDEX_NAME)
         
-        # 2. Load Data
-        with open('augmented_resumes.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # 2. Load Data (streamed from the corpus store)
+        store = open_corpus()
 
-        vectors_to_upsert = []
-        
-        print("Generating Embeddings...")
+        # Make sure every bullet has a quality score for the metadata filter
+        scored = score_store(store, only_missing=True)
+        if scored:
+            print(f"Scored {scored} bullets for quality metadata.")
+
+        # Per-domain namespaces (partitioned) and/or the default namespace (flat)
+        layout = sys.argv[sys.argv.index("--layout") + 1] if "--layout" in sys.argv else "partitioned"
+        namespaces = {
+            "partitioned": lambda d: [d],
+            "flat": lambda d: [""],
+            "both": lambda d: [d, ""],
+        }[layout]
+
+        def flush(vectors, domain):
+            for namespace in namespaces(domain):
+                index.upsert(vectors=vectors, namespace=namespace)
+
+        print(f"Generating Embeddings... (layout: {layout})")
         
         # Process Domains
-        for domain, content in data.items():
-            # Combine Real + Synthetic
-            real_pts = content.get("real", [])
-            synth_pts = content.get("synthetic", [])
-            all_pts = real_pts + synth_pts
+        for domain in store.domains():
+            # Combine Real + Synthetic (real rows stream first, keeping ids stable)
+            print(f"  > {domain}: {store.count(domain)} points")
             
-            print(f"  > {domain}: {len(all_pts)} points")
-            
-            for i, text in enumerate(all_pts):
-                # Generate ID
-                vector_id = f"{domain}_{i}"
-                
-                # Embed
-                embedding = get_embedding(text)
-                if not embedding:
+            rows = list(store.iter_bullets(domain))
+            for start in range(0, len(rows), BATCH_SIZE):
+                batch = rows[start:start + BATCH_SIZE]
+
+                # Embed (whole batch in one call)
+                embeddings = get_embeddings([row["text"] for row in batch])
+                if not embeddings:
                     continue
-                    
-                # Metadata
-                metadata = {
-                    "text": text,
-                    "domain": domain,
-                    "type": "real" if i < len(real_pts) else "synthetic"
-                }
-                
-                vectors_to_upsert.append((vector_id, embedding, metadata))
+
+                vectors_to_upsert = []
+                for offset, (row, embedding) in enumerate(zip(batch, embeddings)):
+                    # Generate ID
+                    vector_id = f"{domain}_{start + offset}"
+
+                    # Metadata
+                    metadata = {
+                        "text": row["text"],
+                        "domain": domain,
+                        "type": row["type"],
+                        "quality_score": row["quality_score"],
+                        **{name: (bool(row[name]) if name.startswith("has_") else row[name]) for name in FEATURE_COLUMNS}
+                    }
+                    vectors_to_upsert.append((vector_id, embedding, metadata))
                 
-                # Batch Upsert (every 50)
-                if len(vectors_to_upsert) >= 50:
-                    index.upsert(vectors=vectors_to_upsert)
-                    vectors_to_upsert = []
-                    print(f"    Upserted batch for {domain}...")
-                    time.sleep(1) # Rate limit nice-ness
-
-        # Final Batch
-        if vectors_to_upsert:
-            index.upsert(vectors=vectors_to_upsert)
-            print("    Upserted final batch.")
+                # Batch Upsert (every 50, batches never mix namespaces)
+                flush(vectors_to_upsert, domain)
+                print(f"    Upserted batch for {domain}...")
+                time.sleep(1) # Rate limit nice-ness
+
+        # Keep the in-process lexical index in sync with what was embedded
+        build_from_store(store).save()
+        print("    Rebuilt BM25 index.")
 
         print("\nSUCCESS: All data stored in Pinecone!")
         stats = index.describe_index_stats()
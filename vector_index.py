@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from corpus_store import open_corpus
+from embeddings import get_provider
+
+# In-process vector index over the bullet corpus with compressed storage.
+# Keeps the whole index resident in each worker instead of querying Pinecone.
+#
+# Storage formats (searched directly, scored in fixed-size blocks so the
+# full float32 matrix is never materialised):
+#   float32  - baseline, 4 bytes/dim
+#   float16  - 2 bytes/dim
+#   int8     - 1 byte/dim + one float32 scale per vector
+# plus optional dimension reduction: "truncate" (keep the first N dims,
+# text-embedding-004 is Matryoshka-trained) or "pca" (project onto the top N
+# principal components of the corpus).
+#
+#   python vector_index.py embed [backend]          # corpus -> EMBEDDINGS_PATH (float32)
+#   python vector_index.py build int8 [256] [pca]   # EMBEDDINGS_PATH -> VECTOR_INDEX_PATH
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(dotenv_path=os.path.join(script_dir, "web", ".env"))
+load_dotenv(dotenv_path=os.path.join(script_dir, ".env"))
+
+EMBEDDINGS_PATH = os.path.join(script_dir, 'corpus_embeddings.npz')
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", os.path.join(script_dir, 'vector_index.npz'))
+FORMATS = ("float32", "float16", "int8")
+SEARCH_BLOCK_ROWS = 4096
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    def __init__(self, data, scales, meta, fmt="float32", projection=None, mean=None, dims=None, provider=None):
+        self.data = data              # (n, d) in fmt
+        self.scales = scales          # (n,) float32 for int8, else None
+        self.meta = meta              # {"texts", "domains", "quality"} numpy arrays
+        self.fmt = fmt
+        self.projection = projection  # (d_in, d) float32 for PCA, else None
+        self.mean = mean              # (d_in,) float32 for PCA, else None
+        self.dims = dims              # truncation width, else None
+        self.provider = provider      # embedding backend that produced the vectors
+
+    @classmethod
+    def from_float32(cls, vectors, meta, fmt="float32", dims=None, reduction="truncate", provider=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt}")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        projection = mean = None
+
+        # 1. Dimension reduction
+        if dims and reduction == "pca":
+            mean = vectors.mean(axis=0)
+            _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+            projection = vt[:dims].T.astype(np.float32)
+            vectors = (vectors - mean) @ projection
+        elif dims:
+            vectors = vectors[:, :dims]
+        vectors = _normalize(vectors).astype(np.float32)
+
+        # 2. Quantization
+        scales = None
+        if fmt == "float16":
+            data = vectors.astype(np.float16)
+        elif fmt == "int8":
+            scales = (np.abs(vectors).max(axis=1) / 127.0).astype(np.float32)
+            data = np.round(vectors / np.maximum(scales[:, None], 1e-12)).astype(np.int8)
+        else:
+            data = vectors
+
+        truncate_dims = dims if dims and reduction != "pca" else None
+        return cls(data, scales, meta, fmt, projection, mean, truncate_dims, provider)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def nbytes(self):
+        total = self.data.nbytes
+        for arr in (self.scales, self.projection, self.mean):
+            if arr is not None:
+                total += arr.nbytes
+        return total
+
+    def prepare_query(self, vector):
+        q = np.asarray(vector, dtype=np.float32)
+        if self.projection is not None:
+            q = (q - self.mean) @ self.projection
+        elif self.dims:
+            q = q[:self.dims]
+        return _normalize(q)
+
+    def scores(self, vector):
+        """Cosine scores against every stored vector, computed block by block on the compressed data."""
+        q = self.prepare_query(vector)
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SEARCH_BLOCK_ROWS):
+            block = self.data[start:start + SEARCH_BLOCK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32, copy=False) @ q
+        if self.scales is not None:
+            out *= self.scales
+        return out
+
+    def search(self, vector, top_k=5, domains=None, min_quality=None):
+        """Same result shape as retrieval.query_partitions: [{"id", "text", "score", "domain"}]."""
+        scores = self.scores(vector)
+        if domains:
+            top_weight = max(domains.values())
+            weights = np.array([domains.get(d, 0.0) / top_weight for d in self.meta["domains"]], dtype=np.float32)
+            scores = np.where(weights > 0, scores * weights, -np.inf)
+        if min_quality:
+            quality = self.meta["quality"]
+            scores = np.where(np.isnan(quality) | (quality >= min_quality), scores, -np.inf)
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k else []
+        top = sorted(top, key=lambda i: (-scores[i], i))
+        return [
+            {
+                "id": int(i),
+                "text": str(self.meta["texts"][i]),
+                "score": float(scores[i]),
+                "domain": str(self.meta["domains"][i]),
+            }
+            for i in top if np.isfinite(scores[i])
+        ]
+
+    def save(self, path=VECTOR_INDEX_PATH):
+        arrays = {
+            "data": self.data,
+            "fmt": np.array(self.fmt),
+            "dims": np.array(self.dims or 0),
+            "provider": np.array(self.provider or ""),
+        }
+        arrays.update({f"meta_{k}": v for k, v in self.meta.items()})
+        for name in ("scales", "projection", "mean"):
+            value = getattr(self, name)
+            if value is not None:
+                arrays[name] = value
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=VECTOR_INDEX_PATH):
+        with np.load(path, allow_pickle=False) as f:
+            meta = {k[len("meta_"):]: f[k] for k in f.files if k.startswith("meta_")}
+            return cls(
+                f["data"],
+                f["scales"] if "scales" in f.files else None,
+                meta,
+                str(f["fmt"]),
+                f["projection"] if "projection" in f.files else None,
+                f["mean"] if "mean" in f.files else None,
+                int(f["dims"]) or None,
+                (str(f["provider"]) or None) if "provider" in f.files else None,
+            )
+
+
+def load_embeddings(path=EMBEDDINGS_PATH):
+    """Float32 corpus embeddings + metadata written by `embed`. Returns (vectors, meta, provider)."""
+    with np.load(path, allow_pickle=False) as f:
+        meta = {"texts": f["texts"], "domains": f["domains"], "quality": f["quality"]}
+        return f["vectors"], meta, str(f["provider"])
+
+
+def embed_corpus(path=EMBEDDINGS_PATH, backend=None):
+    provider = get_provider(backend)
+    store = open_corpus()
+    rows = list(store.iter_bullets())
+    store.close()
+
+    vectors = []
+    for start in range(0, len(rows), provider.batch_size):
+        batch = [r["text"] for r in rows[start:start + provider.batch_size]]
+        vectors.extend(provider.embed(batch, "retrieval_document", title="Resume Bullet Point"))
+        print(f"  Embedded {len(vectors)}/{len(rows)} ({provider.name})")
+        if provider.name == "gemini":
+            time.sleep(1) # Rate limit nice-ness
+
+    np.savez(
+        path,
+        provider=np.array(provider.name),
+        vectors=np.asarray(vectors, dtype=np.float32),
+        texts=np.array([r["text"] for r in rows]),
+        domains=np.array([r["domain"] for r in rows]),
+        quality=np.array([np.nan if r["quality_score"] is None else r["quality_score"] for r in rows], dtype=np.float32),
+    )
+    print(f"Saved {len(vectors)} embeddings to {path}")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index(path=VECTOR_INDEX_PATH):
+    """Load the index once per process and keep it resident."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex.load(path)
+    return _index
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "embed":
+        os.environ.setdefault("LLM_PRIORITY", "batch")  # yields to live requests (llm_scheduler.py)
+        embed_corpus(backend=sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command == "build":
+        fmt = sys.argv[2] if len(sys.argv) > 2 else "float32"
+        dims = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        reduction = sys.argv[4] if len(sys.argv) > 4 else "truncate"
+        vectors, meta, provider = load_embeddings()
+        index = VectorIndex.from_float32(vectors, meta, fmt=fmt, dims=dims, reduction=reduction, provider=provider)
+        index.save()
+        print(f"Built {fmt} index ({index.data.shape[1]} dims, {index.nbytes / 1024:.1f} KiB) -> {VECTOR_INDEX_PATH}")
+    else:
+        print(f"Unknown command: {command} (use embed or build)")
+
+
+if __name__ == "__main__":
+    main()